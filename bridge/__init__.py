@@ -0,0 +1,7 @@
+"""
+BRIDGE - WooCommerce & Capital ERP sync package.
+
+bridge.core holds the data model, API clients, matching and storage,
+bridge.sync the fetch/refresh/price update workflows. Neither imports
+the GUI toolkit, so they can run headless: python -m bridge sync --help
+"""
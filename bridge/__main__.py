@@ -0,0 +1,313 @@
+"""
+BRIDGE command line
+===================
+Headless sync for scheduled runs (cron, Windows Task Scheduler):
+
+    python -m bridge sync --delta --apply-capital-prices --report sync_report.json
+
+Works on the same local database and snapshot as the desktop app. The
+run report is written as JSON (to --report, or stdout); log lines go
+to stderr.
+
+Memory diagnostics (approximate bytes per collection, record type and
+field, and peak RSS per fetch phase):
+
+    python -m bridge memory --fetch --variations --json memory.json
+
+Exit status of sync:
+    0  sync complete
+    1  sync complete, but some price updates failed or are still pending
+    2  sync failed
+    3  another sync, or a fetch or price update of the desktop app, is running
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+EXIT_OK = 0
+EXIT_PARTIAL = 1
+EXIT_ERROR = 2
+EXIT_LOCKED = 3
+
+
+# ============================================================================
+# SYNC COMMAND
+# ============================================================================
+
+def run_sync(args, report, log):
+    """
+    Refresh the local data (delta from the last snapshot, or full), finish
+    interrupted price jobs (not those paused by a user in the app, nor
+    those another process is still sending) and optionally move mismatched WooCommerce
+    prices to Capital. Fills in report; returns the exit status.
+    """
+    # Imported here so --help and argument errors don't pay for the clients
+    from bridge.core import (
+        WOOCOMMERCE_CONFIG, CAPITAL_CONFIG, data_store,
+        WooCommerceClient, CapitalClient, LocalDatabase, DataStoreSnapshot
+    )
+    from bridge.sync import SyncEngine
+    
+    db = LocalDatabase(args.db)
+    snapshot = DataStoreSnapshot(args.snapshot)
+    engine = SyncEngine(
+        WooCommerceClient(WOOCOMMERCE_CONFIG, log=log), CapitalClient(CAPITAL_CONFIG),
+        db, snapshot, log=log
+    )
+    
+    # Refresh: a delta needs the snapshot of an earlier fetch to build on
+    started = time.perf_counter()
+    mode = 'full'
+    if args.delta:
+        meta = snapshot.load(data_store)
+        if meta and data_store.last_fetch_time:
+            mode = 'delta'
+            log(f"Loaded snapshot from {meta.get('saved_at')}")
+            report['refresh'] = engine.delta_refresh(data_store.last_fetch_time)
+        else:
+            log("No usable snapshot - running a full fetch instead of a delta")
+    if mode == 'full':
+        report['refresh'] = engine.full_fetch(fetch_variations=args.variations)
+    report['mode'] = mode
+    report['timings']['refresh'] = round(time.perf_counter() - started, 3)
+    
+    woo_count, capital_count = data_store.product_counts()
+    matched = data_store.matched_products
+    report['catalog'] = {
+        'woo_products': woo_count,
+        'capital_products': capital_count,
+        'matched': len(matched),
+        'unmatched_woo': len(data_store.unmatched_woo),
+        'unmatched_capital': len(data_store.unmatched_capital),
+        'price_mismatches': sum(1 for p in matched if not p.get('price_match')),
+    }
+    
+    if args.dry_run:
+        if args.apply_capital_prices:
+            updates = engine.capital_price_mismatches()
+            updates, skipped_fields = data_store.drop_unchanged_prices(updates)
+            report['price_updates'] = {'planned': len(updates), 'skipped_fields': skipped_fields, 'updates': updates}
+            log(f"Dry run: {len(updates)} products would be updated to Capital prices")
+        return EXIT_OK
+    
+    # Price update jobs interrupted earlier go out before any new ones
+    started = time.perf_counter()
+    jobs = engine.resume_price_jobs()
+    
+    if args.apply_capital_prices:
+        updates = engine.capital_price_mismatches()
+        log(f"Updating {len(updates)} mismatched products to Capital prices")
+        result = engine.apply_price_updates(updates)
+        report['price_updates'] = result
+        if result['job_id'] is not None:
+            jobs.append(result)
+    report['price_jobs'] = jobs
+    report['timings']['price_updates'] = round(time.perf_counter() - started, 3)
+    if jobs:
+        # The written prices are in the store now; keep the snapshot in step
+        engine.save_snapshot()
+    
+    if any(job['failed'] or job['pending'] for job in jobs):
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def sync_command(args):
+    """python -m bridge sync"""
+    def log(message):
+        if not args.quiet:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}", file=sys.stderr, flush=True)
+    
+    report = {
+        'command': 'sync',
+        'started_at': datetime.now().isoformat(),
+        'options': {
+            'delta': args.delta,
+            'variations': args.variations,
+            'apply_capital_prices': args.apply_capital_prices,
+            'dry_run': args.dry_run,
+        },
+        'timings': {},
+    }
+    started = time.perf_counter()
+    
+    # stdout carries only the report: anything else printed during the run goes to stderr
+    with redirect_stdout(sys.stderr):
+        if args.profile:
+            from bridge.core import PROFILING_CONFIG
+            from bridge.profiling import profiler
+            profiler.start(PROFILING_CONFIG['output_dir'], sample_interval_ms=PROFILING_CONFIG['sample_interval_ms'])
+        
+        from bridge.sync import SyncLock
+        lock = SyncLock(args.lock_file)
+        if not lock.acquire():
+            log(f"Another sync or a fetch/price update of the app is running (lock file {args.lock_file})")
+            status = EXIT_LOCKED
+            report['error'] = "another sync is running"
+        else:
+            try:
+                status = run_sync(args, report, log)
+            except Exception as e:
+                log(f"Sync failed: {str(e)}")
+                status = EXIT_ERROR
+                report['error'] = str(e)
+            finally:
+                lock.release()
+            if args.http_stats:
+                try:
+                    from bridge.core import http_stats
+                    if args.http_stats.lower().endswith('.csv'):
+                        http_stats.export_csv(args.http_stats)
+                    else:
+                        http_stats.export_json(args.http_stats)
+                except Exception as e:
+                    log(f"Could not write HTTP statistics: {str(e)}")
+        if args.profile:
+            try:
+                report['profile'] = profiler.stop()
+                log(f"Profile written to {report['profile']}")
+            except Exception as e:
+                log(f"Could not write the profile: {str(e)}")
+    
+    report['status'] = {EXIT_OK: 'ok', EXIT_PARTIAL: 'partial', EXIT_ERROR: 'error', EXIT_LOCKED: 'locked'}[status]
+    report['exit_code'] = status
+    report['finished_at'] = datetime.now().isoformat()
+    report['timings']['total'] = round(time.perf_counter() - started, 3)
+    
+    text = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+    if args.report and args.report != '-':
+        tmp_path = f"{args.report}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        os.replace(tmp_path, args.report)
+    else:
+        print(text)
+    return status
+
+
+# ============================================================================
+# MEMORY COMMAND
+# ============================================================================
+
+def memory_command(args):
+    """python -m bridge memory"""
+    def log(message):
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}", file=sys.stderr, flush=True)
+    
+    from bridge.core import (
+        WOOCOMMERCE_CONFIG, CAPITAL_CONFIG, data_store, products_table_rows, prices_table_rows,
+        memory_report, format_memory_report, process_rss,
+        WooCommerceClient, CapitalClient, LocalDatabase, DataStoreSnapshot
+    )
+    
+    fetch_run = None
+    try:
+        if args.fetch:
+            from bridge.sync import SyncEngine
+            db = LocalDatabase(args.db)
+            engine = SyncEngine(
+                WooCommerceClient(WOOCOMMERCE_CONFIG, log=log), CapitalClient(CAPITAL_CONFIG),
+                db, DataStoreSnapshot(args.snapshot), log=log
+            )
+            engine.full_fetch(fetch_variations=args.variations)
+            runs = db.get_perf_runs('full_fetch', limit=1)
+            fetch_run = runs[0] if runs else None
+        elif not DataStoreSnapshot(args.snapshot).load(data_store):
+            log(f"No usable snapshot at {args.snapshot} - use --fetch")
+            return EXIT_ERROR
+    except Exception as e:
+        log(f"Could not load data: {str(e)}")
+        return EXIT_ERROR
+    
+    # The table models as the app first shows them (no filters)
+    matched = data_store.matched_products
+    tables = {
+        'products_table': products_table_rows(matched),
+        'prices_table': prices_table_rows(matched),
+    }
+    report = memory_report(data_store, tables, sample=args.sample or None)
+    text = format_memory_report(report, fields=args.fields)
+    
+    if fetch_run:
+        report['fetch_phases'] = [
+            {'name': span['name'], 'seconds': span['seconds'], 'items': span['items'], 'peak_rss': span['peak_rss']}
+            for span in fetch_run['spans']
+        ]
+        if process_rss() is None:
+            text += "\n\nPeak RSS per phase: not available (install psutil)"
+        else:
+            lines = ["", "", f"{'Fetch phase':<22} {'Seconds':>9} {'Items':>9} {'Peak RSS':>12}"]
+            for phase in report['fetch_phases'] + [{'name': 'total', 'seconds': fetch_run['seconds'],
+                                                   'items': None, 'peak_rss': fetch_run['peak_rss']}]:
+                seconds = f"{phase['seconds']:.2f}" if phase['seconds'] is not None else "-"
+                items = phase['items'] if phase['items'] is not None else ""
+                peak = f"{phase['peak_rss'] / 1_000_000:.1f} MB" if phase['peak_rss'] else "-"
+                lines.append(f"{phase['name']:<22} {seconds:>9} {items:>9} {peak:>12}")
+            text += "\n".join(lines)
+            
+    print(text)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        log(f"Report written to {args.json}")
+    return EXIT_OK
+
+
+# ============================================================================
+# ARGUMENTS
+# ============================================================================
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m bridge", description="BRIDGE headless tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    sync = commands.add_parser("sync", help="refresh data and optionally apply Capital prices")
+    refresh = sync.add_mutually_exclusive_group()
+    refresh.add_argument("--delta", action="store_true",
+                         help="refresh only what changed since the last snapshot (default: full fetch)")
+    refresh.add_argument("--full", dest="delta", action="store_false",
+                         help="fetch everything (the default)")
+    sync.add_argument("--variations", action="store_true",
+                      help="include product variations in a full fetch")
+    sync.add_argument("--apply-capital-prices", action="store_true",
+                      help="update mismatched WooCommerce prices to Capital (discounts are kept)")
+    sync.add_argument("--dry-run", action="store_true",
+                      help="report the price updates without sending them")
+    sync.add_argument("--report", metavar="PATH",
+                      help="write the JSON run report here instead of stdout")
+    sync.add_argument("--http-stats", metavar="PATH",
+                      help="write per-endpoint HTTP statistics here (.csv for CSV, otherwise JSON)")
+    sync.add_argument("--profile", action="store_true",
+                      help="profile the run (hot path .pstats, stack samples) into a directory under profiles/")
+    sync.add_argument("--db", default="bridge_data.db", help="local database (default: %(default)s)")
+    sync.add_argument("--snapshot", default="bridge_snapshot.json.gz", help="snapshot file (default: %(default)s)")
+    sync.add_argument("--lock-file", default="bridge_sync.lock", help="run lock file, shared with the desktop app (default: %(default)s)")
+    sync.add_argument("-q", "--quiet", action="store_true", help="no log output")
+    sync.set_defaults(func=sync_command)
+    
+    memory = commands.add_parser("memory", help="report approximate memory use of the loaded data")
+    memory.add_argument("--fetch", action="store_true",
+                        help="do a full fetch first and show peak RSS per phase (default: load the snapshot)")
+    memory.add_argument("--variations", action="store_true", help="include product variations in the fetch")
+    memory.add_argument("--sample", type=int, default=5000,
+                        help="size at most this many records per collection and scale up; 0 walks all (default: %(default)s)")
+    memory.add_argument("--fields", type=int, default=8, help="fields listed per record type (default: %(default)s)")
+    memory.add_argument("--json", metavar="PATH", help="also write the full report as JSON")
+    memory.add_argument("--db", default="bridge_data.db", help="local database (default: %(default)s)")
+    memory.add_argument("--snapshot", default="bridge_snapshot.json.gz", help="snapshot file (default: %(default)s)")
+    memory.set_defaults(func=memory_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""
+BRIDGE benchmarks
+=================
+End-to-end timings of every sync stage - WooCommerce page fetch,
+variation fetch, Capital download, matching, table rows/rendering,
+price updates, full fetch and a delta refresh after the catalog changed
+- run against the local mock servers with a synthetic catalog, so runs
+are offline and repeatable.
+
+    python -m bridge.benchmark --size small
+    python -m bridge.benchmark --size medium --catalog realistic
+    python -m bridge.benchmark --size small --save-baseline benchmark_baseline_small.json
+    python -m bridge.benchmark --size small --baseline benchmark_baseline_small.json
+
+Results are written as JSON. With --baseline, each stage is compared with
+the baseline run and the command exits 1 if any stage is slower than the
+tolerance allows.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from bridge.core import (
+    aiohttp, WooProduct, CapitalItem, DataStore, traffic,
+    http_stats, WooCommerceClient, CapitalClient, AsyncIOEngine, AsyncWooCommerceClient, AsyncCapitalClient,
+    ProductMatcher, LocalDatabase, products_table_rows, prices_table_rows
+)
+from bridge.mock_servers import MockCatalog, MockWooCommerceServer, MockCapitalServer, Faults
+from bridge.sync import SyncEngine
+
+FORMAT = "bridge-benchmark"
+VERSION = 1
+
+# Catalog sizes: WooCommerce products and Capital items
+SIZES = {
+    'small': {'products': 3000, 'capital': 40000},
+    'medium': {'products': 30000, 'capital': 120000},
+    'large': {'products': 300000, 'capital': 400000},
+}
+
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+EXIT_ERROR = 2
+
+
+# ============================================================================
+# STAGES
+# ============================================================================
+
+class StageTimer:
+    """Collects per-stage timings (best of repeat runs) and request counts"""
+    
+    def __init__(self, servers, log):
+        self.stages = {}
+        self.servers = servers
+        self.log = log
+    
+    def requests(self):
+        return sum(server.requests for server in self.servers)
+    
+    def run(self, name, func, repeat=1):
+        """
+        Time func() repeat times. func returns the number of items it
+        handled, or (items, details) to add details to the stage.
+        """
+        times = []
+        items, details = None, {}
+        requests_before = self.requests()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            items = func()
+            times.append(time.perf_counter() - start)
+        if isinstance(items, tuple):
+            items, details = items
+        seconds = min(times)
+        stage = {
+            'seconds': round(seconds, 4),
+            'runs': [round(t, 4) for t in times],
+            'items': items,
+            'requests': (self.requests() - requests_before) // repeat,
+            **details,
+        }
+        if items and seconds > 0:
+            stage['items_per_second'] = round(items / seconds, 1)
+        self.stages[name] = stage
+        self.log(f"{name:<22} {seconds:9.3f}s  {items if items is not None else '-':>8} items  "
+                 f"{stage['requests']:>6} requests")
+        return stage
+    
+    def skip(self, name, reason):
+        self.stages[name] = {'skipped': reason}
+        self.log(f"{name:<22} skipped ({reason})")
+
+
+def render_table_rows(rows, columns):
+    """
+    Seconds to insert rows into a ttk.Treeview and lay it out, or None
+    when Tk can't open a display.
+    """
+    try:
+        import tkinter
+        from tkinter import ttk
+        root = tkinter.Tk()
+    except Exception:
+        return None
+    try:
+        root.withdraw()
+        tree = ttk.Treeview(root, columns=columns, show="headings")
+        start = time.perf_counter()
+        for values in rows:
+            tree.insert("", "end", values=values)
+        root.update_idletasks()
+        return time.perf_counter() - start
+    finally:
+        root.destroy()
+
+
+def run_benchmark(size, latency_ms=20, repeat=3, max_updates=1000, use_async=True, seed=1, catalog_kind='plain',
+                  churn=0.02, log=print):
+    """
+    Run every stage for one catalog size; returns the result document.
+    catalog_kind 'realistic' uses CatalogGenerator data (normalization-only
+    matches, unmatched tails...) instead of the plain MockCatalog.generate().
+    """
+    counts = SIZES[size]
+    config = {
+        'size': size, 'catalog': catalog_kind, 'churn': churn,
+        'products': counts['products'], 'capital': counts['capital'],
+        'latency_ms': latency_ms, 'max_updates': max_updates, 'seed': seed,
+        'async_io': bool(use_async and aiohttp), 'requests_per_second': traffic.rate,
+    }
+    log(f"Generating catalog: {counts['products']} products, {counts['capital']} Capital items")
+    start = time.perf_counter()
+    if catalog_kind == 'realistic':
+        catalog = MockCatalog.realistic(products=counts['products'], capital=counts['capital'], seed=seed)
+    else:
+        catalog = MockCatalog.generate(products=counts['products'], capital=counts['capital'], seed=seed)
+    generation_seconds = time.perf_counter() - start
+    
+    http_stats.reset()
+    quiet = open(os.devnull, 'w')
+    with contextlib.ExitStack() as stack:
+        stack.callback(quiet.close)
+        tmp = stack.enter_context(tempfile.TemporaryDirectory())
+        woo = stack.enter_context(MockWooCommerceServer(catalog, Faults(latency_ms=latency_ms, seed=seed)))
+        capital = stack.enter_context(MockCapitalServer(catalog, Faults(latency_ms=latency_ms, seed=seed)))
+        timer = StageTimer([woo, capital], log)
+        
+        def make_engine(name):
+            woo_client = WooCommerceClient(woo_client_config(woo))
+            capital_client = CapitalClient({
+                'base_url': f"{capital.url}/s1services", 'username': 'bench', 'password': 'bench',
+                'company': 1, 'fiscalyear': 2026, 'branch': 1
+            })
+            io_engine = AsyncIOEngine() if config['async_io'] else None
+            if io_engine:
+                stack.callback(io_engine.close)
+            return SyncEngine(
+                woo_client, capital_client, LocalDatabase(os.path.join(tmp, f"{name}.db")),
+                store=DataStore(), log=lambda message: None, io_engine=io_engine,
+                async_woo_client=AsyncWooCommerceClient(woo_client_config(woo), io_engine) if io_engine else None,
+                async_capital_client=AsyncCapitalClient(capital_client.config, io_engine) if io_engine else None
+            )
+        
+        engine = make_engine('stages')
+        data = {}
+        
+        def woo_pages():
+            data['woo'] = [WooProduct.from_api(p) for p in engine.woo_client.get_all_products()]
+            return len(data['woo'])
+        timer.run('woo_pages', woo_pages)
+        
+        def variations():
+            parents = [p for p in data['woo'] if p.get('type') == 'variable']
+            records = []
+            engine.download_variations(
+                parents, lambda parent, items: records.extend(engine.build_variation_products(parent, items)))
+            data['variations'] = records
+            return len(records)
+        timer.run('variations', variations)
+        
+        def capital_download():
+            data['capital'] = [CapitalItem.from_api(row) for row in engine.capital_client.get_products()]
+            return len(data['capital'])
+        timer.run('capital_download', capital_download)
+        
+        woo_products = data['woo'] + data['variations']
+        
+        def match():
+            data['matched'] = ProductMatcher.match_products(woo_products, data['capital'])
+            return len(woo_products)
+        timer.run('match', match, repeat)
+        
+        matched, unmatched_woo, unmatched_capital = data['matched']
+        engine.store.publish(woo_products=woo_products, capital_products=data['capital'],
+                             matched_products=matched, unmatched_woo=unmatched_woo,
+                             unmatched_capital=unmatched_capital, last_fetch_time=datetime.now())
+        products = engine.store.matched_products
+        
+        def products_rows():
+            data['rows'] = products_table_rows(products)
+            return len(products)
+        timer.run('products_table_rows', products_rows, repeat)
+        name_filter = "δίσκος" if catalog_kind == 'realistic' else "product 1"
+        timer.run('products_table_filter',
+                  lambda: len(products_table_rows(products, sku_filter="12", name_filter=name_filter)), repeat)
+        timer.run('prices_table_rows', lambda: len(prices_table_rows(products, show_mismatches=True)), repeat)
+        
+        columns = [str(n) for n in range(len(data['rows'][0]))] if data['rows'] else ['0']
+        elapsed = render_table_rows(data['rows'], columns)
+        if elapsed is None:
+            timer.skip('products_table_render', "no display")
+        else:
+            timer.run('products_table_render', lambda: render_table_rows(data['rows'], columns) and len(data['rows']))
+        
+        def price_updates():
+            updates = engine.capital_price_mismatches()[:max_updates]
+            with contextlib.redirect_stdout(quiet):
+                result = engine.apply_price_updates(updates)
+            details = {key: result[key] for key in ('done', 'failed', 'pending', 'skipped')}
+            return result['requested'], details
+        timer.run('price_updates', price_updates)
+        
+        # The whole fetch as the app runs it (fresh store and database, no caches)
+        def full_fetch():
+            data['full_engine'] = make_engine('full_fetch')
+            summary = data['full_engine'].full_fetch(fetch_variations=True)
+            return summary['woo_products']
+        timer.run('full_fetch', full_fetch)
+        
+        # The next catalog generation, then a delta refresh on top of the full fetch.
+        # Changes are stamped a second after the fetch (the mock compares whole seconds).
+        since = data['full_engine'].store.last_fetch_time
+        changes = catalog.evolve(churn=churn, modified_at=since + timedelta(seconds=1))
+        
+        def delta_refresh():
+            summary = data['full_engine'].delta_refresh(since)
+            details = {'catalog_changes': changes, 'newly_matched': summary['newly_matched'],
+                       'capital_updated': summary['capital_updated'], 'woo_removed': summary['woo_removed'],
+                       'capital_added': summary['capital_added'], 'capital_removed': summary['capital_removed']}
+            return summary['woo_changed'], details
+        timer.run('delta_refresh', delta_refresh)
+    
+    return {
+        'format': FORMAT,
+        'version': VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'config': config,
+        'environment': environment(),
+        'catalog_generation_seconds': round(generation_seconds, 3),
+        'stages': timer.stages,
+        'http': http_stats.summary(),
+    }
+
+
+def woo_client_config(server):
+    return {'store_url': server.url, 'consumer_key': 'ck', 'consumer_secret': 'cs'}
+
+
+def environment():
+    """Where the numbers came from"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'aiohttp': getattr(aiohttp, '__version__', None),
+        'commit': commit or None,
+    }
+
+
+# ============================================================================
+# BASELINE COMPARISON
+# ============================================================================
+
+# Settings that must match for timings to be comparable
+COMPARABLE_CONFIG = ('size', 'catalog', 'churn', 'products', 'capital', 'latency_ms', 'max_updates', 'async_io',
+                     'requests_per_second')
+
+# Settings added later, as baselines recorded before them ran
+CONFIG_DEFAULTS = {'catalog': 'plain', 'churn': 0.02}
+
+
+def compare(result, baseline, tolerance=0.25, min_seconds=0.05):
+    """
+    Stage-by-stage comparison with a baseline result. Returns (rows,
+    regressions): a stage regresses when it is more than tolerance slower
+    and by more than min_seconds (to ignore noise on very short stages).
+    """
+    rows, regressions = [], []
+    for name, stage in result['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if not base or 'seconds' not in base or 'seconds' not in stage:
+            rows.append((name, None, stage.get('seconds'), None, ''))
+            continue
+        change = (stage['seconds'] - base['seconds']) / base['seconds'] if base['seconds'] else 0.0
+        regressed = change > tolerance and stage['seconds'] - base['seconds'] > min_seconds
+        rows.append((name, base['seconds'], stage['seconds'], change, 'REGRESSION' if regressed else ''))
+        if regressed:
+            regressions.append(name)
+    return rows, regressions
+
+
+def config_mismatches(result, baseline):
+    return [
+        key for key in COMPARABLE_CONFIG
+        if result['config'].get(key) != baseline.get('config', {}).get(key, CONFIG_DEFAULTS.get(key))
+    ]
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bridge.benchmark",
+                                     description="Benchmark BRIDGE sync stages against local mock servers")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--latency-ms", type=float, default=20, help="mock server latency (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of the CPU-bound stages; the best counts")
+    parser.add_argument("--max-updates", type=int, default=1000, help="price updates to send (default: %(default)s)")
+    parser.add_argument("--rps", type=float, help="override the client request rate limit")
+    parser.add_argument("--no-async", action="store_true", help="use the thread pool even if aiohttp is installed")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--catalog", choices=("plain", "realistic"), default="plain",
+                        help="realistic: Greek names, normalization-only matches, unmatched tails (default: %(default)s)")
+    parser.add_argument("--churn", type=float, default=0.02,
+                        help="share of the catalog changed before the delta refresh stage (default: %(default)s)")
+    parser.add_argument("--output", help="result JSON (default: benchmark_results/<size>-<time>.json)")
+    parser.add_argument("--baseline", help="compare with this result and exit 1 on regressions")
+    parser.add_argument("--save-baseline", metavar="PATH", help="also write the result here as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (default: 25%%)")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="ignore slowdowns below this")
+    args = parser.parse_args(argv)
+    
+    def log(message):
+        print(message, file=sys.stderr, flush=True)
+    
+    if args.rps:
+        traffic.rate = args.rps
+    
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('format') != FORMAT:
+            log(f"{args.baseline} is not a benchmark result")
+            return EXIT_ERROR
+    
+    result = run_benchmark(args.size, latency_ms=args.latency_ms, repeat=max(1, args.repeat),
+                           max_updates=args.max_updates, use_async=not args.no_async, seed=args.seed,
+                           catalog_kind=args.catalog, churn=args.churn, log=log)
+    
+    output = args.output or os.path.join(
+        "benchmark_results", f"{args.size}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    paths = [output] + ([args.save_baseline] if args.save_baseline else [])
+    for path in paths:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    log(f"Results written to {', '.join(paths)}")
+    
+    if not baseline:
+        return EXIT_OK
+    
+    mismatched = config_mismatches(result, baseline)
+    if mismatched:
+        log(f"Baseline {args.baseline} was recorded with different settings ({', '.join(mismatched)}); not comparable")
+        return EXIT_ERROR
+    
+    rows, regressions = compare(result, baseline, args.tolerance, args.min_seconds)
+    log(f"\n{'stage':<22} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, base, now, change, flag in rows:
+        base_text = f"{base:.3f}s" if base is not None else "-"
+        now_text = f"{now:.3f}s" if now is not None else "-"
+        change_text = f"{change:+.0%}" if change is not None else "-"
+        log(f"{name:<22} {base_text:>10} {now_text:>10} {change_text:>8}  {flag}")
+    
+    if regressions:
+        log(f"\n!!! PERFORMANCE REGRESSION in {len(regressions)} stage(s): {', '.join(regressions)} "
+            f"(more than {args.tolerance:.0%} slower than {args.baseline})")
+        return EXIT_REGRESSION
+    log("\nNo regressions")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
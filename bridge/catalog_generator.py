@@ -0,0 +1,499 @@
+"""
+BRIDGE synthetic catalogs
+=========================
+Seeded generator of realistic test data at any scale: WooCommerce
+products, variations, categories and orders, and Capital STOCKITEMS
+rows, in the JSON layout the mock servers load (MockCatalog.from_file).
+
+What makes it realistic:
+- Greek product names behind brand prefixes ("BOSCH Δίσκος κοπής ...")
+- numeric SKUs with leading zeros next to brand-prefixed codes
+- variable products whose variations carry the SKUs and prices
+- Capital CODEs that only match after normalization (case, padding,
+  leading zeros), long tails of unmatched items on both sides, and
+  products without an SKU
+- controllable match rate and price mismatch rate
+
+evolve() turns one generation into the next (price/stock/content edits,
+new and removed products) for delta sync tests:
+
+    python -m bridge.catalog_generator --products 30000 --capital 120000 --out gen0.json
+    python -m bridge.catalog_generator --evolve gen0.json --churn 0.02 --out gen1.json
+    python -m bridge.mock_servers --catalog gen1.json
+"""
+
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+
+
+# ============================================================================
+# VOCABULARY
+# ============================================================================
+
+# Brand prefix of the product names, and the prefix of its alphanumeric codes
+BRANDS = [
+    ("3M", "3M"), ("ABICOR BINZEL", "ABB"), ("BOSCH", "BOS"), ("MAKITA", "MAK"), ("DEWALT", "DWT"),
+    ("STANLEY", "STN"), ("KNIPEX", "KNP"), ("WURTH", "WUR"), ("ESAB", "ESB"), ("TELWIN", "TLW"),
+    ("METABO", "MTB"), ("BAHCO", "BHC"), ("FACOM", "FAC"), ("FESTOOL", "FST"), ("KRAFT", "KRF"),
+    ("LINCOLN", "LNC"), ("WERA", "WER"), ("GEDORE", "GED"), ("HILTI", "HLT"), ("FISCHER", "FSH"),
+    ("SOUDAL", "SDL"), ("PFERD", "PFD"), ("KLINGSPOR", "KLS"), ("NORTON", "NRT"), ("UVEX", "UVX"),
+    ("ΕΥΡΩΕΡΓΑΛΕΙΑ", "EYR"), ("ΘΕΡΜΟΚΟΛΛΗΣΕΙΣ", "THK"), ("ΠΑΠΑΔΟΠΟΥΛΟΣ", "PAP"),
+]
+
+# Product family -> (category, specs a product picks one of)
+FAMILIES = [
+    ("Δίσκος κοπής", "Λειαντικά", ["Ø115mm", "Ø125mm", "Ø180mm", "Ø230mm", "inox 1.0mm", "μετάλλου 1.6mm"]),
+    ("Δίσκος λείανσης", "Λειαντικά", ["Ø115mm P40", "Ø125mm P60", "Ø125mm P80", "βελκρό Ø150mm P120"]),
+    ("Φύλλο λειαντικό", "Λειαντικά", ["P80 230x280", "P120 230x280", "P240 αδιάβροχο", "ρολό 50m P180"]),
+    ("Ηλεκτρόδια συγκόλλησης", "Συγκόλληση", ["Ø2.5mm 5kg", "Ø3.2mm 5kg", "rutile Ø2.0mm", "inox Ø2.5mm"]),
+    ("Σύρμα συγκόλλησης MIG", "Συγκόλληση", ["Ø0.8mm 15kg", "Ø1.0mm 15kg", "inox Ø0.8mm 5kg", "αλουμινίου Ø1.0mm"]),
+    ("Τσιμπίδα γείωσης", "Συγκόλληση", ["200A", "300A", "500A ορειχάλκινη"]),
+    ("Μάσκα ηλεκτροσυγκόλλησης", "Συγκόλληση", ["αυτόματη DIN 9-13", "κεφαλής", "χειρός", "με ρεσπιράτορα"]),
+    ("Μπεκ συγκόλλησης", "Συγκόλληση", ["M6 Ø0.8mm", "M6 Ø1.0mm", "M8 Ø1.2mm"]),
+    ("Τρυπάνι", "Ηλεκτρικά εργαλεία", ["κρουστικό 18V", "επαναφορτιζόμενο 12V", "SDS-plus 800W", "πυλώνα 16mm"]),
+    ("Γωνιακός τροχός", "Ηλεκτρικά εργαλεία", ["Ø115mm 720W", "Ø125mm 1100W", "Ø230mm 2200W", "μπαταρίας 18V"]),
+    ("Σέγα", "Ηλεκτρικά εργαλεία", ["παλινδρομική 1100W", "ηλεκτρονική 650W", "μπαταρίας 18V"]),
+    ("Αλοιφάδοι", "Ηλεκτρικά εργαλεία", ["Ø100mm", "Ø125mm έκκεντρος", "ταινίας 75x457"]),
+    ("Τρυπάνι HSS", "Αναλώσιμα", ["Ø3mm", "Ø5mm", "Ø6.5mm", "Ø8mm", "Ø10mm", "σετ 19 τεμ."]),
+    ("Μύτες κατσαβιδιού", "Αναλώσιμα", ["PH2 25mm", "PZ2 50mm", "TX25 25mm", "σετ 32 τεμ."]),
+    ("Ποτηροτρύπανο", "Αναλώσιμα", ["Ø32mm", "Ø51mm", "Ø68mm διαμαντέ", "σετ 9 τεμ."]),
+    ("Κατσαβίδι", "Εργαλεία χειρός", ["ίσιο 5.5x125", "σταυρού PH2", "μονωμένο 1000V", "σετ 6 τεμ."]),
+    ("Πένσα", "Εργαλεία χειρός", ["180mm", "μονωμένη 200mm", "μυτοτσίμπιδο 160mm", "κόφτης 160mm"]),
+    ("Κλειδί γερμανοπολύγωνο", "Εργαλεία χειρός", ["10mm", "13mm", "17mm", "19mm", "σετ 12 τεμ."]),
+    ("Καρυδάκια", "Εργαλεία χειρός", ['1/4" σετ 46 τεμ.', '1/2" σετ 24 τεμ.', '3/8" 10mm']),
+    ("Σφυρί", "Εργαλεία χειρός", ["300g", "500g", "ξυλουργού 600g", "βαριοπούλα 1.5kg"]),
+    ("Μέτρο", "Μέτρηση", ["3m", "5m", "8m", "laser 40m"]),
+    ("Αλφάδι", "Μέτρηση", ["40cm", "60cm", "120cm μαγνητικό", "laser σταυρού"]),
+    ("Γάντια εργασίας", "Ασφάλεια", ["νιτριλίου", "δερμάτινα", "αντικοπής", "ηλεκτροσυγκολλητή"]),
+    ("Γυαλιά προστασίας", "Ασφάλεια", ["διάφανα", "φιμέ", "με αφρώδες"]),
+    ("Ωτοασπίδες", "Ασφάλεια", ["SNR 30dB", "SNR 35dB", "κράνους"]),
+    ("Σιλικόνη", "Χημικά", ["διάφανη 280ml", "λευκή 280ml", "θερμοκρασίας 310ml", "ουδέτερη 300ml"]),
+    ("Αφρός πολυουρεθάνης", "Χημικά", ["750ml πιστολιού", "500ml πυράντοχος", "χειρός 750ml"]),
+    ("Σπρέι αντισκωριακό", "Χημικά", ["400ml", "200ml", "γαλβανιζέ 400ml"]),
+    ("Βίδες γυψοσανίδας", "Στερεώσεις", ["3.5x25 1000 τεμ.", "3.5x35 1000 τεμ.", "3.9x45 500 τεμ."]),
+    ("Βύσμα νάιλον", "Στερεώσεις", ["Ø6mm 100 τεμ.", "Ø8mm 100 τεμ.", "Ø10mm 50 τεμ."]),
+]
+
+QUALIFIERS = ["", "", "", "επαγγελματικό", "ενισχυμένο", "ανοξείδωτο", "βιομηχανικό", "σετ", "οικονομικό"]
+
+DESCRIPTION = (
+    "Επαγγελματική ποιότητα για καθημερινή χρήση στο εργοτάξιο και στο συνεργείο. "
+    "Ανθεκτική κατασκευή, εργονομικός σχεδιασμός και σταθερή απόδοση σε κάθε εργασία. "
+    "Κατάλληλο για μέταλλο, ξύλο και δομικά υλικά σύμφωνα με τις οδηγίες του κατασκευαστή."
+)
+
+# Variation attributes: (attribute, [(option shown, SKU suffix)])
+ATTRIBUTES = [
+    ("Μέγεθος", [("S", "S"), ("M", "M"), ("L", "L"), ("XL", "XL"), ("XXL", "XXL"), ("3XL", "3XL")]),
+    ("Χρώμα", [("Μαύρο", "BK"), ("Κόκκινο", "RD"), ("Μπλε", "BL"), ("Κίτρινο", "YL"), ("Γκρι", "GR")]),
+    ("Διάμετρος", [("6mm", "06"), ("8mm", "08"), ("10mm", "10"), ("12mm", "12"), ("14mm", "14")]),
+    ("Συσκευασία", [("1 τεμ.", "1"), ("5 τεμ.", "5"), ("10 τεμ.", "10"), ("50 τεμ.", "50")]),
+]
+
+# Capital-only codes (no WooCommerce product) are numbered from here, clear of the WooCommerce ids
+CAPITAL_ONLY_SERIAL = 5_000_000
+
+
+# ============================================================================
+# GENERATOR
+# ============================================================================
+
+class CatalogGenerator:
+    """
+    Seeded catalog generator. Rates are fractions (0-1):
+    - match_rate: SKUs (simple products and variations) that have a Capital item
+    - normalized_rate: of those, CODEs written differently from the SKU
+      (lower case, padding, extra or missing leading zeros)
+    - price_mismatch_rate: matches whose Capital retail price differs
+    - variable_share: variable products; variations: (min, max) per product
+    - leading_zero_share: numeric SKUs written with leading zeros
+    - alphanumeric_share: brand-prefixed SKUs (BOS-12345) instead of numeric ones
+    - missing_sku_rate: products without an SKU
+    - sale_rate: products on sale; description_rate: products with a long description
+    """
+    
+    def __init__(self, seed=1, match_rate=0.85, normalized_rate=0.1, price_mismatch_rate=0.2,
+                 variable_share=0.08, variations=(2, 6), leading_zero_share=0.4, alphanumeric_share=0.35,
+                 missing_sku_rate=0.01, sale_rate=0.1, description_rate=0.2):
+        self.seed = seed
+        self.match_rate = match_rate
+        self.normalized_rate = normalized_rate
+        self.price_mismatch_rate = price_mismatch_rate
+        self.variable_share = variable_share
+        self.variations = variations
+        self.leading_zero_share = leading_zero_share
+        self.alphanumeric_share = alphanumeric_share
+        self.missing_sku_rate = missing_sku_rate
+        self.sale_rate = sale_rate
+        self.description_rate = description_rate
+    
+    def options(self):
+        return {key: value for key, value in vars(self).items() if not key.startswith('_')}
+    
+    # ------------------------------------------------------------------------
+    # One generation
+    # ------------------------------------------------------------------------
+    
+    def generate(self, products=3000, capital=40000, orders=500, now=None):
+        """
+        A catalog of products WooCommerce products (plus their variations)
+        and at least capital Capital items: the matched ones, topped up with
+        Capital-only codes. Returns the catalog dict with a 'meta' entry of
+        the expected match counts.
+        """
+        rng = random.Random(f"{self.seed}-0")
+        now = (now or datetime.now()).replace(microsecond=0)
+        catalog = {
+            'products': [], 'variations': {}, 'orders': [], 'categories': self.categories(), 'capital': [],
+        }
+        expected = {'matchable': 0, 'matched': 0, 'normalized': 0, 'price_mismatches': 0, 'missing_sku': 0}
+        next_id = 1001
+        for _ in range(products):
+            next_id = self._add_product(rng, catalog, next_id, now, expected)
+        
+        matched_capital = len(catalog['capital'])
+        for n in range(max(0, capital - matched_capital)):
+            catalog['capital'].append(self._capital_only_row(rng, CAPITAL_ONLY_SERIAL + n))
+        rng.shuffle(catalog['capital'])
+        
+        catalog['orders'] = self._orders(rng, catalog, orders, now, first_id=50000)
+        catalog['meta'] = {
+            'generator': 'bridge.catalog_generator', 'generation': 0, 'seed': self.seed,
+            'options': self.options(), 'created_at': now.isoformat(),
+            'expected': dict(expected, unmatched_woo=expected['matchable'] - expected['matched'],
+                             unmatched_capital=len(catalog['capital']) - expected['matched']),
+        }
+        return catalog
+    
+    def categories(self):
+        """Product families as categories, under one parent category each"""
+        parents = sorted({category for _, category, _ in FAMILIES})
+        categories = []
+        ids = {}
+        for n, name in enumerate(parents, 1):
+            ids[name] = n
+            categories.append({'id': n, 'name': name, 'slug': f"cat-{n}", 'parent': 0, 'count': 0})
+        for n, (family, category, _) in enumerate(FAMILIES, len(parents) + 1):
+            categories.append({'id': n, 'name': family, 'slug': f"cat-{n}", 'parent': ids[category], 'count': 0})
+        return categories
+    
+    def _sku(self, rng, serial, brand_code):
+        """SKU of a new product (serial is its unique WooCommerce id)"""
+        if rng.random() < self.alphanumeric_share:
+            return f"{brand_code}-{serial}"
+        if rng.random() < self.leading_zero_share:
+            return f"{serial:0{len(str(serial)) + rng.randint(1, 3)}d}"
+        return str(serial)
+    
+    def _code(self, rng, sku):
+        """Capital CODE for a matched SKU; some only match once normalized"""
+        if rng.random() >= self.normalized_rate:
+            return sku, False
+        variants = [f" {sku} ", f"{sku} "]
+        if sku.lower() != sku:
+            variants.append(sku.lower())
+        if sku[0].isdigit():
+            variants.append("0" + sku)
+            if sku[0] == "0":
+                variants.append(sku.lstrip("0") or "0")
+        return rng.choice(variants), True
+    
+    @staticmethod
+    def _price(rng):
+        """Retail price with the usual .90/.50/.00 endings"""
+        return round(int(rng.lognormvariate(3.2, 1.0)) + rng.choice((0.9, 0.9, 0.5, 0.0)), 2) or 0.9
+    
+    def _capital_price(self, rng, price):
+        """Capital retail price: the shop price, or a different one for a price mismatch"""
+        if rng.random() < self.price_mismatch_rate:
+            capital_price = round(max(0.1, price * rng.uniform(0.8, 1.25)), 2)
+            if abs(capital_price - price) < 0.01:
+                capital_price = round(price + 0.1, 2)
+            return capital_price, True
+        return price, False
+    
+    def _capital_row(self, rng, code, name, price):
+        return {
+            'CODE': code, 'DESCR': name.upper()[:60], 'RTLPRICE': price, 'WHSPRICE': round(price * 0.62, 2),
+            'TRMODE': 1, 'DISCOUNT': 0, 'MAXDISCOUNT': rng.choice((0, 0, 10, 15, 20)),
+            'BALANCEQTY': max(0, int(rng.gauss(20, 30))),
+        }
+    
+    def _capital_only_row(self, rng, serial):
+        brand, brand_code = rng.choice(BRANDS)
+        family, _, specs = rng.choice(FAMILIES)
+        code = f"{brand_code}-{serial}" if rng.random() < self.alphanumeric_share else str(serial)
+        return self._capital_row(rng, code, f"{brand} {family} {rng.choice(specs)}", self._price(rng))
+    
+    def _match(self, rng, catalog, sku, name, price, expected):
+        """Give a sellable SKU its Capital item (or not, at 1 - match_rate); returns the Capital price"""
+        expected['matchable'] += 1
+        if not sku or rng.random() >= self.match_rate:
+            return None
+        code, normalized = self._code(rng, sku)
+        capital_price, mismatched = self._capital_price(rng, price)
+        catalog['capital'].append(self._capital_row(rng, code, name, capital_price))
+        expected['matched'] += 1
+        expected['normalized'] += normalized
+        expected['price_mismatches'] += mismatched
+        return capital_price
+    
+    def _add_product(self, rng, catalog, product_id, now, expected, modified=None):
+        """Add one product (with its variations and Capital items); returns the next free id"""
+        brand, brand_code = rng.choice(BRANDS)
+        family_index = rng.randrange(len(FAMILIES))
+        family, _, specs = FAMILIES[family_index]
+        qualifier = rng.choice(QUALIFIERS)
+        name = " ".join(part for part in (brand, family, qualifier, rng.choice(specs)) if part)
+        if rng.random() < 0.3:
+            name += f" {brand_code}{rng.randint(100, 9999)}"
+        sku = "" if rng.random() < self.missing_sku_rate else self._sku(rng, product_id, brand_code)
+        expected['missing_sku'] += not sku
+        is_variable = bool(sku) and rng.random() < self.variable_share
+        price = self._price(rng)
+        created = now - timedelta(days=rng.randint(30, 1500), seconds=rng.randint(0, 86399))
+        modified = modified or now - timedelta(days=rng.randint(1, 29), seconds=rng.randint(0, 86399))
+        categories = catalog['categories']
+        category = categories[len(categories) - len(FAMILIES) + family_index] if len(categories) >= len(FAMILIES) else None
+        if not category or category['name'] != family:
+            # A catalog with other categories (evolve() of a plain mock catalog)
+            category = rng.choice(categories) if categories else {'id': 0, 'name': '', 'slug': ''}
+        
+        product = {
+            'id': product_id, 'name': name, 'sku': sku,
+            'type': 'variable' if is_variable else 'simple',
+            'regular_price': '' if is_variable else f"{price:.2f}",
+            'sale_price': '', 'price': f"{price:.2f}",
+            'stock_quantity': None if is_variable else max(0, int(rng.gauss(15, 20))),
+            'stock_status': 'instock', 'total_sales': min(5000, int(rng.paretovariate(1.2)) - 1),
+            'description': DESCRIPTION if rng.random() < self.description_rate else '',
+            'short_description': f"{family} {brand}" if rng.random() < 0.3 else '',
+            'categories': [{'id': category['id'], 'name': category['name'], 'slug': category['slug']}],
+            'permalink': f"https://shop.example.gr/product/{product_id}",
+            'date_created': created.isoformat(), 'date_modified': modified.isoformat(), 'attributes': [],
+        }
+        if not is_variable and rng.random() < self.sale_rate:
+            self._set_sale(rng, product, price)
+        if product['stock_quantity'] == 0:
+            product['stock_status'] = 'outofstock'
+        catalog['products'].append(product)
+        next_id = product_id + 1
+        
+        if not is_variable:
+            self._match(rng, catalog, sku, name, price, expected)
+            return next_id
+        
+        attribute, options = rng.choice(ATTRIBUTES)
+        chosen = sorted(rng.sample(range(len(options)), min(len(options), rng.randint(*self.variations))))
+        product['attributes'] = [{'id': 1, 'name': attribute, 'position': 0, 'visible': True, 'variation': True,
+                                  'options': [options[n][0] for n in chosen]}]
+        variations = []
+        for n in chosen:
+            option, suffix = options[n]
+            variation_price = round(price + n * rng.choice((0, 0, 1, 2, 5)), 2)
+            variation = {
+                'id': next_id, 'sku': f"{sku}-{suffix}",
+                'regular_price': f"{variation_price:.2f}", 'sale_price': '', 'price': f"{variation_price:.2f}",
+                'stock_quantity': max(0, int(rng.gauss(8, 10))), 'stock_status': 'instock',
+                'description': '', 'permalink': product['permalink'],
+                'date_created': product['date_created'], 'date_modified': product['date_modified'],
+                'attributes': [{'id': 1, 'name': attribute, 'option': option}],
+            }
+            if variation['stock_quantity'] == 0:
+                variation['stock_status'] = 'outofstock'
+            variations.append(variation)
+            self._match(rng, catalog, variation['sku'], f"{name} {option}", variation_price, expected)
+            next_id += 1
+        catalog['variations'][product_id] = variations
+        return next_id
+    
+    @staticmethod
+    def _set_sale(rng, product, price):
+        sale_price = round(price * (1 - rng.choice((0.1, 0.15, 0.2, 0.25, 0.3))), 2)
+        product['sale_price'] = f"{sale_price:.2f}"
+        product['price'] = f"{sale_price:.2f}"
+    
+    @staticmethod
+    def _orders(rng, catalog, count, now, first_id, max_days=120):
+        """Orders over the last max_days; popular products sell far more often"""
+        skus = [product['sku'] for product in catalog['products'] if product['type'] == 'simple' and product['sku']]
+        skus += [variation['sku'] for items in catalog['variations'].values() for variation in items]
+        skus = skus or ['000000']
+        orders = []
+        for n in range(count):
+            line_items = []
+            for _ in range(rng.randint(1, 4)):
+                # Skewed choice: low indexes are the best sellers
+                sku = skus[min(len(skus) - 1, int(rng.paretovariate(1.0)) - 1)]
+                line_items.append({'sku': sku, 'quantity': rng.randint(1, 5),
+                                   'total': f"{rng.uniform(2, 400):.2f}", 'product_id': 0})
+            orders.append({
+                'id': first_id + n,
+                'status': rng.choice(['completed', 'completed', 'completed', 'processing', 'on-hold', 'cancelled']),
+                'date_created': (now - timedelta(days=rng.uniform(0, max_days))).replace(microsecond=0).isoformat(),
+                'line_items': line_items,
+            })
+        return orders
+    
+    # ------------------------------------------------------------------------
+    # Next generation
+    # ------------------------------------------------------------------------
+    
+    def evolve(self, catalog, churn=0.02, added=0.005, removed=0.002, generation=None, now=None, modified_at=None):
+        """
+        The next generation of catalog (as generated, or any catalog in the
+        same layout): churn of the products get a price, sale, stock or
+        content change, churn of the Capital items a new price or stock,
+        added/removed of the products are new/trashed, and a day of new
+        orders comes in. Changed products get date_modified = modified_at
+        (default now), so a modified_after delta sees exactly them.
+        Unchanged records are shared with the input, which is not modified.
+        """
+        generation = generation if generation is not None else catalog.get('meta', {}).get('generation', 0) + 1
+        rng = random.Random(f"{self.seed}-{generation}")
+        now = (now or datetime.now()).replace(microsecond=0)
+        stamp = (modified_at or now).replace(microsecond=0).isoformat()
+        
+        products = list(catalog['products'])
+        # JSON object keys are strings
+        variations = {int(parent_id): items for parent_id, items in (catalog.get('variations') or {}).items()}
+        capital = list(catalog['capital'])
+        changes = {'modified': 0, 'added': 0, 'removed': 0, 'capital_modified': 0, 'capital_added': 0,
+                   'capital_removed': 0, 'orders_added': 0}
+        
+        # Edits of existing products (trashed ones stay as they were)
+        live = [index for index, product in enumerate(products) if product.get('status', 'publish') != 'trash']
+        for index in rng.sample(live, int(len(live) * churn)):
+            product = dict(products[index])
+            parent_id = product['id']
+            kind = rng.choices(('price', 'sale', 'stock', 'content'), weights=(45, 15, 30, 10))[0]
+            if product.get('type') == 'variable' and variations.get(parent_id) and kind != 'content':
+                # A variation changes; the parent is re-saved with it
+                items = list(variations[parent_id])
+                position = rng.randrange(len(items))
+                items[position] = self._edit(rng, dict(items[position]), kind, stamp)
+                variations[parent_id] = items
+                product['date_modified'] = stamp
+            else:
+                product = self._edit(rng, product, kind, stamp)
+            products[index] = product
+            changes['modified'] += 1
+        
+        # Capital price and stock changes
+        for index in rng.sample(range(len(capital)), int(len(capital) * churn)):
+            row = dict(capital[index])
+            if rng.random() < 0.5:
+                row['RTLPRICE'] = round(float(row.get('RTLPRICE') or 0) * rng.uniform(0.9, 1.15), 2)
+                row['WHSPRICE'] = round(row['RTLPRICE'] * 0.62, 2)
+            else:
+                row['BALANCEQTY'] = max(0, int(float(row.get('BALANCEQTY') or 0) + rng.randint(-10, 25)))
+            capital[index] = row
+            changes['capital_modified'] += 1
+        
+        # Removed products go to the trash, as a delete in wp-admin does, stamped like an edit
+        # (their Capital items stay, as an ERP keeps discontinued codes)
+        for index in rng.sample(live, int(len(live) * removed)):
+            products[index] = dict(products[index], status='trash', date_modified=stamp)
+            changes['removed'] += 1
+        removed_codes = rng.sample(range(len(capital)), int(len(capital) * removed))
+        if removed_codes:
+            dropped = set(removed_codes)
+            capital = [row for index, row in enumerate(capital) if index not in dropped]
+            changes['capital_removed'] = len(dropped)
+        
+        # New products (matched at match_rate) and new Capital-only codes
+        ids = [product['id'] for product in products]
+        ids += [variation['id'] for items in variations.values() for variation in items]
+        next_id = max(ids, default=1000) + 1
+        grown = {'products': products, 'variations': variations, 'capital': capital,
+                 'categories': catalog.get('categories') or self.categories()}
+        expected = {'matchable': 0, 'matched': 0, 'normalized': 0, 'price_mismatches': 0, 'missing_sku': 0}
+        for _ in range(int(len(catalog['products']) * added)):
+            next_id = self._add_product(rng, grown, next_id, now, expected, modified=modified_at or now)
+            changes['added'] += 1
+        serial = CAPITAL_ONLY_SERIAL + generation * 1_000_000
+        for n in range(int(len(catalog['capital']) * added)):
+            capital.append(self._capital_only_row(rng, serial + n))
+            changes['capital_added'] += 1
+        
+        orders = list(catalog.get('orders') or [])
+        new_orders = max(1, len(orders) // 120) if orders else 0
+        first_id = max((order['id'] for order in orders), default=49999) + 1
+        orders += self._orders(rng, grown, new_orders, now, first_id, max_days=1)
+        changes['orders_added'] = new_orders
+        
+        meta = dict(catalog.get('meta') or {})
+        meta.update({'generation': generation, 'created_at': now.isoformat(), 'changes': changes,
+                     'evolve_options': {'churn': churn, 'added': added, 'removed': removed}})
+        meta.pop('expected', None)
+        return {'products': products, 'variations': variations, 'orders': orders,
+                'categories': grown['categories'], 'capital': capital, 'meta': meta}
+    
+    def _edit(self, rng, item, kind, stamp):
+        """Apply one edit to a copied product or variation"""
+        if kind == 'price' and item.get('regular_price'):
+            price = round(float(item['regular_price']) * rng.uniform(0.9, 1.15), 1) + 0.09
+            item['regular_price'] = f"{price:.2f}"
+            item['price'] = item['sale_price'] or item['regular_price']
+        elif kind == 'sale' and item.get('regular_price'):
+            if item.get('sale_price'):
+                item['sale_price'] = ''
+                item['price'] = item['regular_price']
+            else:
+                self._set_sale(rng, item, float(item['regular_price']))
+        elif kind == 'content' and 'name' in item:
+            item['name'] = f"{item['name']} {rng.choice(['ΝΕΟ', 'βελτιωμένο', 'v2', 'PRO'])}"
+            item['short_description'] = rng.choice([DESCRIPTION[:80], item.get('short_description', '')])
+        else:
+            quantity = max(0, int(item.get('stock_quantity') or 0) + rng.randint(-5, 20))
+            item['stock_quantity'] = quantity
+            item['stock_status'] = 'instock' if quantity else 'outofstock'
+        item['date_modified'] = stamp
+        return item
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bridge.catalog_generator",
+                                     description="Generate seeded synthetic WooCommerce/Capital catalogs")
+    parser.add_argument("--out", required=True, help="catalog JSON to write (the mock servers' --catalog format)")
+    parser.add_argument("--evolve", metavar="PATH", help="write the next generation of this catalog instead")
+    parser.add_argument("--products", type=int, default=3000)
+    parser.add_argument("--capital", type=int, default=40000)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--match-rate", type=float, default=0.85)
+    parser.add_argument("--normalized-rate", type=float, default=0.1)
+    parser.add_argument("--price-mismatch-rate", type=float, default=0.2)
+    parser.add_argument("--variable-share", type=float, default=0.08)
+    parser.add_argument("--churn", type=float, default=0.02, help="with --evolve: share of items changed")
+    parser.add_argument("--added", type=float, default=0.005, help="with --evolve: share of products added")
+    parser.add_argument("--removed", type=float, default=0.002, help="with --evolve: share of products removed")
+    args = parser.parse_args(argv)
+    
+    generator = CatalogGenerator(args.seed, match_rate=args.match_rate, normalized_rate=args.normalized_rate,
+                                 price_mismatch_rate=args.price_mismatch_rate, variable_share=args.variable_share)
+    if args.evolve:
+        with open(args.evolve, encoding='utf-8') as f:
+            catalog = generator.evolve(json.load(f), churn=args.churn, added=args.added, removed=args.removed)
+    else:
+        catalog = generator.generate(args.products, args.capital, args.orders)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, ensure_ascii=False)
+    
+    variations = sum(len(items) for items in catalog['variations'].values())
+    print(f"{args.out}: {len(catalog['products'])} products, {variations} variations, "
+          f"{len(catalog['orders'])} orders, {len(catalog['capital'])} Capital items", file=sys.stderr)
+    details = catalog['meta'].get('changes') or catalog['meta'].get('expected')
+    print(", ".join(f"{key} {value}" for key, value in details.items()), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4007 @@
+"""
+BRIDGE core - data model, API clients, matching and storage
+============================================================
+Everything that syncs WooCommerce and SoftOne Capital ERP data without a
+user interface. The desktop app (bridge_app.py) and the headless command
+line (python -m bridge) are both built on this module; it must not import
+customtkinter or tkinter.
+"""
+
+import requests
+from requests.auth import HTTPBasicAuth
+import urllib3
+import threading
+import contextvars
+import itertools
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import json
+import csv
+import gzip
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import sqlite3
+import asyncio
+from collections import defaultdict, namedtuple, deque, Counter
+from contextlib import contextmanager
+
+from bridge.jobs import JobCancelled
+from bridge.profiling import hot_path
+
+try:
+    import aiohttp      # Optional: enables the asyncio I/O engine
+except ImportError:
+    aiohttp = None
+
+try:
+    import psutil       # Optional: process memory on every platform (/proc fallback on Linux)
+except ImportError:
+    psutil = None
+
+# Disable SSL warnings for Capital ERP
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# WooCommerce API Configuration
+WOOCOMMERCE_CONFIG = {
+    "store_url": "https://roussakis.com.gr",
+    "consumer_key": "ck_bb11ea8930c80ab895887236e037ddcfbee003e1",
+    "consumer_secret": "cs_c7cc521fbe93def7c731a920632c0c23c50d0bd7"
+}
+
+# Capital ERP Configuration
+CAPITAL_CONFIG = {
+    "base_url": "https://401003161911.oncloud.gr/s1services",
+    "username": "WEBESHOP",
+    "password": "1975",
+    "company": 1,
+    "fiscalyear": 2025,
+    "branch": 1
+}
+
+# Background refresh schedule (in-app): delta refresh every N minutes
+# (0 = off) and a full reconcile every night at the given local time
+SCHEDULER_CONFIG = {
+    "delta_interval_minutes": 15,
+    "nightly_full_time": "03:00"
+}
+
+# Orders are fetched, and folded into the sales aggregates, for this many
+# days back; the top sellers list covers the same window
+SALES_CONFIG = {
+    "order_window_days": 90
+}
+
+# Interrupted bulk price updates: jobs older than this are expired on the
+# next launch instead of resent (their prices may have been changed since).
+# A job being sent holds a lease renewed every batch; another process only
+# takes it over once the lease is older than lease_seconds
+PRICE_UPDATE_CONFIG = {
+    "resume_max_age_hours": 24,
+    "lease_seconds": 300
+}
+
+# Profiling switch (Performance tab): stack sample interval, Tk stall threshold
+# and where session directories are written
+PROFILING_CONFIG = {
+    "sample_interval_ms": 10,
+    "stall_ms": 200,
+    "output_dir": "profiles"
+}
+
+
+# ============================================================================
+# COMPACT RECORD TYPES
+# ============================================================================
+
+class CompactRecord:
+    """
+    Slotted record with a dict-compatible interface.
+    Code keeps using record.get('key') / record['key'] = value, but each
+    instance stores its fields in __slots__ instead of a per-instance dict.
+    Repeated strings are interned, large text fields are kept
+    zlib-compressed and only decoded when read, and keys outside the
+    schema go to an overflow dict created on first use.
+    """
+    
+    __slots__ = ('_extra',)
+    FIELDS = ()
+    INTERNED = frozenset()     # Low-cardinality string fields (status, type, ...)
+    COMPRESSED = frozenset()   # Large text fields (descriptions)
+    
+    # Texts shorter than this aren't worth compressing
+    COMPRESS_MIN_LENGTH = 128
+    
+    # Small dicts shared between records (categories, attributes)
+    _shared_dicts = {}
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+        
+    def __init__(self, values=None, **kwargs):
+        self._extra = None
+        if values:
+            self.update(values)
+        if kwargs:
+            self.update(kwargs)
+            
+    @classmethod
+    def share(cls, mapping):
+        """Return a shared copy of a small dict of hashable values"""
+        try:
+            key = tuple(mapping.items())
+            return cls._shared_dicts.setdefault(key, dict(mapping))
+        except TypeError:
+            return mapping
+            
+    def __getitem__(self, key):
+        if key in self._field_set:
+            try:
+                value = getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            if key in self.COMPRESSED and isinstance(value, bytes):
+                value = zlib.decompress(value).decode('utf-8')
+            return value
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+        
+    def __setitem__(self, key, value):
+        if key in self._field_set:
+            if isinstance(value, str):
+                if key in self.INTERNED:
+                    value = sys.intern(value)
+                elif key in self.COMPRESSED and len(value) >= self.COMPRESS_MIN_LENGTH:
+                    value = zlib.compress(value.encode('utf-8'))
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+            
+    def __contains__(self, key):
+        if key in self._field_set:
+            return hasattr(self, key)
+        return bool(self._extra) and key in self._extra
+        
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+            
+    def stored(self, key, default=None):
+        """Get a field as stored (compressed fields are not decoded)"""
+        if key in self._field_set:
+            return getattr(self, key, default)
+        return self.get(key, default)
+            
+    def keys(self):
+        keys = [f for f in self.FIELDS if hasattr(self, f)]
+        if self._extra:
+            keys.extend(self._extra)
+        return keys
+        
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+        
+    def copy(self):
+        """Shallow copy (compressed fields are shared, not re-encoded)"""
+        clone = type(self)()
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                setattr(clone, key, getattr(self, key))
+        if self._extra:
+            clone._extra = dict(self._extra)
+        return clone
+        
+    def update(self, values):
+        for key, value in values.items():
+            self[key] = value
+            
+    def __iter__(self):
+        return iter(self.keys())
+        
+    def __len__(self):
+        return len(self.keys())
+        
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+
+class WooProduct(CompactRecord):
+    """WooCommerce product or variation, reduced to the fields Bridge uses"""
+    
+    FIELDS = (
+        'id', 'parent_id', 'type', 'is_variation', 'name', 'sku',
+        'regular_price', 'sale_price', 'stock_quantity', 'stock_status',
+        'total_sales', 'description', 'short_description', 'categories',
+        'permalink', 'date_created', 'date_modified', 'attributes'
+    )
+    __slots__ = FIELDS
+    INTERNED = frozenset({'type', 'stock_status', 'regular_price', 'sale_price'})
+    COMPRESSED = frozenset({'description', 'short_description'})
+    
+    @classmethod
+    def from_api(cls, data):
+        """Build a record from an API payload, dropping everything else in it"""
+        record = cls()
+        for key in cls.FIELDS:
+            if key in data:
+                record[key] = data[key]
+        if 'categories' in data:
+            record['categories'] = tuple(
+                cls.share({'id': cat.get('id'), 'name': sys.intern(cat.get('name', ''))})
+                for cat in data['categories']
+            )
+        if 'attributes' in data:
+            record['attributes'] = tuple(cls.share(attr) for attr in data['attributes'])
+        return record
+
+
+class CapitalItem(CompactRecord):
+    """Capital ERP STOCKITEMS row"""
+    
+    FIELDS = (
+        'CODE', 'DESCR', 'RTLPRICE', 'WHSPRICE', 'TRMODE',
+        'DISCOUNT', 'MAXDISCOUNT', 'BALANCEQTY'
+    )
+    __slots__ = FIELDS
+    INTERNED = frozenset({'TRMODE'})
+    NUMERIC = ('RTLPRICE', 'WHSPRICE', 'DISCOUNT', 'MAXDISCOUNT', 'BALANCEQTY')
+    
+    @classmethod
+    def from_api(cls, data):
+        """Build a record from a getdata row (numeric strings become floats)"""
+        record = cls(data)
+        for key in cls.NUMERIC:
+            value = record.get(key)
+            if isinstance(value, str):
+                try:
+                    record[key] = float(value) if value.strip() else None
+                except ValueError:
+                    pass
+        return record
+
+
+class MatchedProduct(CompactRecord):
+    """A WooCommerce product matched to a Capital item"""
+    
+    FIELDS = (
+        'sku', 'woo_id', 'parent_id', 'woo_name',
+        'woo_regular_price', 'woo_sale_price', 'woo_discount_percent',
+        'woo_stock_quantity', 'woo_stock_status', 'woo_total_sales',
+        'woo_description', 'woo_short_description', 'woo_categories',
+        'woo_permalink', 'woo_date_created', 'woo_date_modified',
+        'capital_code', 'capital_descr', 'capital_rtlprice', 'capital_whsprice',
+        'capital_trmode', 'capital_discount', 'capital_maxdiscount', 'capital_stock',
+        'price_match', 'manually_matched'
+    )
+    __slots__ = FIELDS
+    INTERNED = frozenset({'woo_stock_status', 'capital_trmode'})
+    COMPRESSED = frozenset({'woo_description', 'woo_short_description'})
+
+
+# ============================================================================
+# PROGRESS REPORTING - Throttled progress channel for worker threads
+# ============================================================================
+
+class ProgressChannel:
+    """
+    Collects progress from any number of worker threads into one model
+    and publishes it to listeners at most max_fps times per second.
+    
+    Workers report as often as they like (per page, per variation, per
+    batch); reports only mark the channel dirty. A publish is scheduled
+    when none is pending, so listeners - and the Tk after() calls they
+    make - run at a capped rate and the final state is always delivered.
+    Each phase counts done/total items, from which throughput and ETA
+    are derived. Phases belong to the task() they were begun in, so jobs
+    running side by side can use the same phase names.
+    """
+    
+    def __init__(self, max_fps=10):
+        self.interval = 1.0 / max_fps
+        self._lock = threading.Lock()
+        self._phases = {}             # (task, name) -> [done, total, started]
+        self._task = contextvars.ContextVar('progress_task', default=None)
+        self._task_ids = itertools.count(1)
+        self._listeners = []
+        self._last_publish = 0.0
+        self._pending = False
+    
+    def add_listener(self, callback):
+        """Add a callback run (from a worker or timer thread) on publish"""
+        self._listeners.append(callback)
+    
+    @contextmanager
+    def task(self, name):
+        """
+        Run a block as one task: phases reported inside it (on this thread,
+        its ContextThreadPool workers or the I/O loop it awaits) are its own,
+        and are dropped when it ends
+        """
+        token = self._task.set((next(self._task_ids), name))
+        try:
+            yield
+        finally:
+            self.clear()
+            self._task.reset(token)
+    
+    def _entry(self, phase):
+        """The entry of a phase of the current task, created if missing (lock held)"""
+        key = (self._task.get(), phase)
+        entry = self._phases.get(key)
+        if entry is None:
+            entry = self._phases[key] = [0, None, time.monotonic()]
+        return entry
+    
+    def begin(self, phase, total=None):
+        """Start (or restart) a phase with an optional item total"""
+        with self._lock:
+            self._phases[(self._task.get(), phase)] = [0, total, time.monotonic()]
+        self.changed()
+    
+    def advance(self, phase, count=1):
+        """Add count finished items to a phase"""
+        with self._lock:
+            self._entry(phase)[0] += count
+        self.changed()
+    
+    def report(self, phase, done, total=None):
+        """Set the absolute done/total of a phase"""
+        with self._lock:
+            entry = self._entry(phase)
+            entry[0] = done
+            if total is not None:
+                entry[1] = total
+        self.changed()
+    
+    def end(self, phase):
+        """Drop a finished phase"""
+        with self._lock:
+            self._phases.pop((self._task.get(), phase), None)
+        self.changed()
+    
+    def clear(self):
+        """Drop the phases of the current task"""
+        task = self._task.get()
+        with self._lock:
+            for key in [key for key in self._phases if key[0] == task]:
+                del self._phases[key]
+        self.changed()
+    
+    def phases(self):
+        """Current phases as dicts with task, done, total, rate (items/s) and eta (s)"""
+        now = time.monotonic()
+        with self._lock:
+            entries = [(task, name, list(entry)) for (task, name), entry in self._phases.items()]
+        result = []
+        for task, name, (done, total, started) in entries:
+            elapsed = now - started
+            rate = done / elapsed if done and elapsed >= 0.5 else None
+            eta = None
+            if rate and total:
+                eta = max(0, total - done) / rate
+            result.append({'task': task[1] if task else None, 'phase': name, 'done': done, 'total': total,
+                           'rate': rate, 'eta': eta})
+        return result
+    
+    def summary(self):
+        """One-line description of the running phases for the status bar"""
+        parts = []
+        phases = self.phases()
+        # Name the task when phases of several tasks are shown
+        several = len({p['task'] for p in phases}) > 1
+        for p in phases:
+            name = f"{p['task']}: {p['phase']}" if several and p['task'] else p['phase']
+            text = f"{name} {p['done']}/{p['total']}" if p['total'] else f"{name} {p['done']}"
+            if p['rate']:
+                text += f" · {p['rate']:.1f}/s"
+            if p['eta'] is not None:
+                minutes, seconds = divmod(int(p['eta']), 60)
+                text += f" · ETA {minutes}:{seconds:02d}"
+            parts.append(text)
+        return " | ".join(parts)
+    
+    def changed(self):
+        """Schedule a publish unless one is already pending"""
+        with self._lock:
+            if self._pending:
+                return
+            self._pending = True
+            delay = self._last_publish + self.interval - time.monotonic()
+        if delay <= 0:
+            self._publish()
+        else:
+            timer = threading.Timer(delay, self._publish)
+            timer.daemon = True
+            timer.start()
+    
+    def _publish(self):
+        with self._lock:
+            self._pending = False
+            self._last_publish = time.monotonic()
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in progress listener: {e}")
+
+
+# ============================================================================
+# DATA STORE - Shared data between all panels
+# ============================================================================
+
+StoreState = namedtuple('StoreState', [
+    'version',            # Incremented on every publish
+    'woo_products',       # All WooCommerce products
+    'capital_products',   # All Capital ERP products
+    'woo_orders',         # All WooCommerce orders
+    'woo_categories',     # WooCommerce categories
+    'matched_products',   # Products matched between systems
+    'unmatched_woo',      # WooCommerce products without Capital match
+    'unmatched_capital',  # Capital products without WooCommerce match
+    'last_fetch_time',    # When data was last fetched
+    'snapshot_info',      # Metadata of the warm-start snapshot, if loaded from one
+])
+
+# Collections are published as tuples so a state can't be changed in place
+STATE_COLLECTIONS = (
+    'woo_products', 'capital_products', 'woo_orders', 'woo_categories',
+    'matched_products', 'unmatched_woo', 'unmatched_capital'
+)
+
+
+def _state_property(name):
+    """Read-only DataStore attribute backed by the current state"""
+    return property(lambda self: getattr(self._state, name))
+
+
+class DataStore:
+    """
+    Central data store that holds all fetched data.
+    This prevents repeated API calls and shares data between panels.
+    
+    Data lives in an immutable, versioned StoreState. Readers take the
+    current state (or one of its collections) without locking and always
+    see a consistent view. Writers build a new state and publish it:
+    publish() replaces collections outright, update() does a
+    read-modify-write under the write lock. Records inside a published
+    state are never modified - writers copy the ones they change.
+    """
+    
+    def __init__(self):
+        self._state = StoreState(0, (), (), (), (), (), (), (), None, None)
+        self._write_lock = threading.Lock()
+        self._sku_index = (None, {})      # (state version, SKU -> matched product)
+        
+        self.capital_session_id = None    # Capital ERP session
+        
+        self.is_loading = False           # Loading state flag
+        self.load_progress = 0            # Loading progress (0-100)
+        self.load_status = ""             # Current loading status message
+        
+        # Callbacks for UI updates
+        self.on_data_changed = []
+        self.on_loading_changed = []
+        
+        # Loading updates reach the listeners through the throttled channel
+        self.progress = ProgressChannel()
+        self.progress.add_listener(self.notify_loading_changed)
+
+    woo_products = _state_property('woo_products')
+    capital_products = _state_property('capital_products')
+    woo_orders = _state_property('woo_orders')
+    woo_categories = _state_property('woo_categories')
+    matched_products = _state_property('matched_products')
+    unmatched_woo = _state_property('unmatched_woo')
+    unmatched_capital = _state_property('unmatched_capital')
+    last_fetch_time = _state_property('last_fetch_time')
+    snapshot_info = _state_property('snapshot_info')
+    version = _state_property('version')
+    
+    @property
+    def state(self):
+        """The current consistent snapshot of all data"""
+        return self._state
+        
+    def publish(self, **changes):
+        """Publish a new state with the given fields replaced"""
+        return self.update(lambda state: changes)
+        
+    def update(self, modify):
+        """
+        Read-modify-write: modify(state) is called under the write lock with
+        the current state and returns a dict of fields to replace (or None
+        to leave the state as is). Returns the resulting state.
+        """
+        with self._write_lock:
+            changes = modify(self._state)
+            if changes:
+                for name in STATE_COLLECTIONS:
+                    if name in changes:
+                        changes[name] = tuple(changes[name])
+                self._state = self._state._replace(version=self._state.version + 1, **changes)
+            return self._state
+        
+    def add_data_listener(self, callback):
+        """Add a callback to be notified when data changes"""
+        self.on_data_changed.append(callback)
+        
+    def add_loading_listener(self, callback):
+        """Add a callback to be notified when loading state changes"""
+        self.on_loading_changed.append(callback)
+        
+    def notify_data_changed(self):
+        """Notify all listeners that data has changed"""
+        for callback in self.on_data_changed:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in data listener: {e}")
+                
+    def notify_loading_changed(self):
+        """Notify all listeners that loading state changed"""
+        for callback in self.on_loading_changed:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in loading listener: {e}")
+                
+    def set_loading(self, is_loading, progress=0, status=""):
+        """Update loading state (listeners are notified at a capped rate); done drops the task's phases"""
+        self.is_loading = is_loading
+        self.load_progress = progress
+        self.load_status = status
+        if not is_loading:
+            self.progress.clear()
+        else:
+            self.progress.changed()
+        
+    def get_product_by_sku(self, sku):
+        """Get matched product data by SKU"""
+        state = self._state
+        version, index = self._sku_index
+        if version != state.version:
+            # Rebuild the SKU index once per published state
+            index = {}
+            for product in state.matched_products:
+                index.setdefault(product.get('sku', '').strip().upper(), product)
+            self._sku_index = (state.version, index)
+        return index.get(sku.strip().upper())
+        
+    @staticmethod
+    def _replace_where(items, predicate, transform):
+        """
+        Copy-on-write helper: returns a new list with transform(copy) applied
+        to every item matching predicate, or None if nothing matched.
+        """
+        result = None
+        for i, item in enumerate(items):
+            if predicate(item):
+                if result is None:
+                    result = list(items)
+                result[i] = transform(item.copy())
+        return result
+        
+    def update_woo_product_locally(self, product_id, updates):
+        """Update a WooCommerce product in local cache after API update"""
+        self.update_woo_products_locally([(product_id, updates)])
+        
+    def update_woo_products_locally(self, product_updates):
+        """
+        Update several WooCommerce products in local cache after API updates
+        (one publish and one notification). product_updates: [(product_id, updates)]
+        """
+        updates_by_id = dict(product_updates)
+        
+        def apply_to_woo(product):
+            product.update(updates_by_id[product['id']])
+            return product
+            
+        def apply_to_matched(product):
+            for key, value in updates_by_id[product['woo_id']].items():
+                if key == 'regular_price':
+                    product['woo_regular_price'] = float(value or 0)
+                elif key == 'sale_price':
+                    product['woo_sale_price'] = float(value or 0)
+                elif key == 'description':
+                    product['woo_description'] = value
+                elif key == 'short_description':
+                    product['woo_short_description'] = value
+                elif key == 'name':
+                    product['woo_name'] = value
+            self._recalculate_woo_prices(product)
+            return product
+            
+        def modify(state):
+            changes = {}
+            woo_products = self._replace_where(
+                state.woo_products, lambda p: p['id'] in updates_by_id, apply_to_woo)
+            if woo_products is not None:
+                changes['woo_products'] = woo_products
+            matched = self._replace_where(
+                state.matched_products, lambda p: p.get('woo_id') in updates_by_id, apply_to_matched)
+            if matched is not None:
+                changes['matched_products'] = matched
+            return changes
+            
+        self.update(modify)
+        self.notify_data_changed()
+        
+    def cached_prices(self):
+        """
+        Current WooCommerce prices as {woo_id: {'regular_price', 'sale_price'}}.
+        Matched products win over the raw woo_products list: every refresh
+        path keeps them current, and the raw list is empty after a warm start.
+        """
+        state = self._state
+        prices = {
+            product['id']: {'regular_price': product.get('regular_price'), 'sale_price': product.get('sale_price')}
+            for product in state.woo_products
+        }
+        for product in state.matched_products:
+            prices[product['woo_id']] = {
+                'regular_price': product.get('woo_regular_price'),
+                'sale_price': product.get('woo_sale_price'),
+            }
+        return prices
+        
+    def drop_unchanged_prices(self, updates, current=None):
+        """
+        Diff price updates against the cached WooCommerce prices (at 2-decimal
+        precision, see cached_prices), or against current ({woo_id: product
+        data} just read from WooCommerce). Unchanged price fields are removed
+        and updates left with nothing to write are dropped. Returns (updates
+        to send, skipped field count). Products with no known price are
+        always sent.
+        """
+        products_by_id = self.cached_prices() if current is None else current
+        to_send = []
+        skipped = 0
+        for update in updates:
+            cached = products_by_id.get(update['id'])
+            if cached is None:
+                to_send.append(update)
+                continue
+            changed = {}
+            for key, value in update.items():
+                if key in ('regular_price', 'sale_price') and self._same_price(value, cached.get(key)):
+                    skipped += 1
+                else:
+                    changed[key] = value
+            if any(key not in ('id', 'parent_id') for key in changed):
+                to_send.append(changed)
+        return to_send, skipped
+        
+    @staticmethod
+    def _same_price(new_value, cached_value):
+        """Compare prices as WooCommerce stores them; empty means no price"""
+        try:
+            new_price = round(float(new_value), 2) if new_value not in ('', None) else None
+            cached_price = round(float(cached_value), 2) if cached_value not in ('', None) else None
+        except (TypeError, ValueError):
+            return False
+        # A cleared sale price is cached as 0
+        if not new_price and not cached_price:
+            return True
+        return new_price == cached_price
+    
+    def update_woo_product_from_api(self, product_id, product_data):
+        """Update a WooCommerce product from fresh API data"""
+        self.update_woo_products_from_api({product_id: product_data})
+        self.notify_data_changed()
+        
+    def update_woo_products_from_api(self, products_by_id, prices_only=False):
+        """
+        Update WooCommerce products from fresh API data in one publish.
+        products_by_id: {woo_id: product_data}. With prices_only, matched
+        products only take the prices (not names/descriptions).
+        Returns the number of matched products updated.
+        """
+        updated = 0
+        
+        def apply_to_matched(product):
+            nonlocal updated
+            self._apply_woo_fields(product, products_by_id[product['woo_id']], prices_only)
+            updated += 1
+            return product
+            
+        def modify(state):
+            changes = {}
+            woo_products = list(state.woo_products)
+            replaced = False
+            for i, product in enumerate(woo_products):
+                product_data = products_by_id.get(product['id'])
+                if product_data is None:
+                    continue
+                if prices_only:
+                    product = product.copy()
+                    product['regular_price'] = product_data.get('regular_price', '')
+                    product['sale_price'] = product_data.get('sale_price', '')
+                    woo_products[i] = product
+                else:
+                    woo_products[i] = WooProduct.from_api(product_data)
+                replaced = True
+            if replaced:
+                changes['woo_products'] = woo_products
+            matched = self._replace_where(
+                state.matched_products, lambda p: p.get('woo_id') in products_by_id, apply_to_matched)
+            if matched is not None:
+                changes['matched_products'] = matched
+            return changes
+            
+        self.update(modify)
+        return updated
+        
+    def _apply_woo_fields(self, matched_product, product_data, prices_only=False):
+        """Copy WooCommerce fields from fresh API data onto a (copied) matched product"""
+        # Update all WooCommerce fields from fresh data
+        matched_product['woo_regular_price'] = float(product_data.get('regular_price', 0) or 0)
+        matched_product['woo_sale_price'] = float(product_data.get('sale_price', 0) or 0)
+        if not prices_only:
+            matched_product['woo_description'] = product_data.get('description', '')
+            matched_product['woo_short_description'] = product_data.get('short_description', '')
+            matched_product['woo_name'] = product_data.get('name', '')
+        self._recalculate_woo_prices(matched_product)
+        
+    @staticmethod
+    def _recalculate_woo_prices(matched_product):
+        """Recalculate discount percentage and price match of a matched product"""
+        regular_price = matched_product.get('woo_regular_price', 0)
+        sale_price = matched_product.get('woo_sale_price', 0)
+        if regular_price > 0 and sale_price > 0:
+            discount_percent = round((1 - sale_price / regular_price) * 100, 2)
+            matched_product['woo_discount_percent'] = discount_percent
+        else:
+            matched_product['woo_discount_percent'] = 0
+            
+        # Recalculate price match
+        cap_price = matched_product.get('capital_rtlprice', 0)
+        matched_product['price_match'] = abs(regular_price - cap_price) < 0.01
+        
+    def apply_woo_changes(self, changed_products, removed_ids=()):
+        """
+        Merge changed WooCommerce products (e.g. a modified_after delta) into
+        the catalogs. Their woo_products records are replaced (new products
+        are added while the full catalog is loaded), matched products are
+        updated, and new or unmatched products are matched against the
+        unmatched Capital products. Products in removed_ids (trashed) and
+        their variations are dropped; the Capital items they were matched
+        to become unmatched.
+        Returns: (updated, newly_matched, removed)
+        """
+        records_by_id = {}
+        changed_by_id = {}
+        for product in changed_products:
+            if not isinstance(product, CompactRecord):
+                product = WooProduct.from_api(product)
+            records_by_id[product['id']] = product
+            # Parent variable products are never matched (see ProductMatcher)
+            if product.get('type') == 'variable' and not product.get('is_variation', False):
+                continue
+            changed_by_id[product['id']] = product
+        removed_ids = set(removed_ids)
+        if not records_by_id and not removed_ids:
+            return 0, 0, 0
+            
+        counts = {'updated': 0, 'newly_matched': 0, 'removed': 0}
+        
+        def apply_to_matched(matched_product):
+            product = changed_by_id[matched_product['woo_id']]
+            self._apply_woo_fields(matched_product, product)
+            matched_product['woo_stock_quantity'] = product.get('stock_quantity')
+            matched_product['woo_stock_status'] = product.get('stock_status')
+            matched_product['woo_total_sales'] = product.get('total_sales', 0)
+            matched_product['woo_date_modified'] = product.get('date_modified', '')
+            counts['updated'] += 1
+            return matched_product
+            
+        def is_removed(product):
+            return product.get('id', product.get('woo_id')) in removed_ids or product.get('parent_id') in removed_ids
+            
+        def modify(state):
+            counts['updated'] = counts['newly_matched'] = counts['removed'] = 0
+            changes = {}
+            
+            # Raw records are replaced in place; new ones only join a fully loaded catalog
+            if state.woo_products:
+                new_records = dict(records_by_id)
+                woo_products = [new_records.pop(p['id'], p) for p in state.woo_products if not is_removed(p)]
+                changes['woo_products'] = woo_products + list(new_records.values())
+                
+            matched_products = self._replace_where(
+                state.matched_products, lambda p: p.get('woo_id') in changed_by_id, apply_to_matched)
+            if matched_products is None:
+                matched_products = list(state.matched_products)
+            unmatched_capital = list(state.unmatched_capital)
+            if removed_ids:
+                capital_by_code = {self._code(p.get('CODE')): p for p in state.capital_products}
+                kept = []
+                for product in matched_products:
+                    if is_removed(product):
+                        unmatched_capital.append(capital_by_code.get(self._code(product.get('capital_code')))
+                                                 or self._capital_item_from_matched(product))
+                        counts['removed'] += 1
+                    else:
+                        kept.append(product)
+                matched_products = kept
+            unmatched_woo = []
+            for product in state.unmatched_woo:
+                if is_removed(product):
+                    counts['removed'] += 1
+                elif product.get('id') not in changed_by_id:
+                    unmatched_woo.append(product)
+                    
+            matched_ids = {p.get('woo_id') for p in matched_products}
+            to_match = [p for woo_id, p in changed_by_id.items() if woo_id not in matched_ids and not is_removed(p)]
+            if to_match:
+                matched, new_unmatched_woo, unmatched_capital = ProductMatcher.match_products(to_match, unmatched_capital)
+                matched_products += matched
+                unmatched_woo += new_unmatched_woo
+                counts['newly_matched'] = len(matched)
+            changes.update(matched_products=matched_products, unmatched_woo=unmatched_woo,
+                           unmatched_capital=unmatched_capital)
+            return changes
+            
+        self.update(modify)
+        return counts['updated'], counts['newly_matched'], counts['removed']
+        
+    @staticmethod
+    def _code(code):
+        """Capital CODE as the matcher compares it"""
+        return str(code or '').strip().upper()
+        
+    @staticmethod
+    def _capital_item_from_matched(matched_product):
+        """The Capital item of a matched product, for when the raw Capital catalog isn't loaded"""
+        return CapitalItem(
+            CODE=matched_product.get('capital_code', ''),
+            DESCR=matched_product.get('capital_descr', ''),
+            RTLPRICE=matched_product.get('capital_rtlprice'),
+            WHSPRICE=matched_product.get('capital_whsprice'),
+            TRMODE=matched_product.get('capital_trmode'),
+            DISCOUNT=matched_product.get('capital_discount'),
+            MAXDISCOUNT=matched_product.get('capital_maxdiscount'),
+            BALANCEQTY=matched_product.get('capital_stock'),
+        )
+        
+    @staticmethod
+    def _woo_product_from_matched(matched_product):
+        """The WooCommerce product of a matched product, for when the raw catalog isn't loaded (warm start)"""
+        parent_id = matched_product.get('parent_id')
+        regular_price = matched_product.get('woo_regular_price') or 0
+        sale_price = matched_product.get('woo_sale_price') or 0
+        return WooProduct(
+            id=matched_product['woo_id'],
+            parent_id=parent_id,
+            type='variation' if parent_id else 'simple',
+            is_variation=bool(parent_id),
+            name=matched_product.get('woo_name', ''),
+            sku=matched_product.get('sku', ''),
+            regular_price=f"{regular_price:.2f}" if regular_price else '',
+            sale_price=f"{sale_price:.2f}" if sale_price else '',
+            stock_quantity=matched_product.get('woo_stock_quantity'),
+            stock_status=matched_product.get('woo_stock_status'),
+            total_sales=matched_product.get('woo_total_sales', 0),
+            description=matched_product.stored('woo_description', ''),
+            short_description=matched_product.stored('woo_short_description', ''),
+            categories=tuple(WooProduct.share({'id': None, 'name': name})
+                             for name in matched_product.get('woo_categories') or ()),
+            permalink=matched_product.get('woo_permalink', ''),
+            date_created=matched_product.get('woo_date_created', ''),
+            date_modified=matched_product.get('woo_date_modified', ''),
+        )
+        
+    def new_capital_codes(self, rows):
+        """CODEs of Capital rows that are not in the store yet (matched or not)"""
+        state = self._state
+        known = {self._code(p.get('capital_code')) for p in state.matched_products}
+        known.update(self._code(p.get('CODE')) for p in state.unmatched_capital)
+        known.update(self._code(p.get('CODE')) for p in state.capital_products)
+        return [row.get('CODE') for row in rows if self._code(row.get('CODE')) not in known]
+        
+    def apply_capital_catalog(self, rows, new_items=()):
+        """
+        Merge a complete Capital item list (rows: every current STOCKITEMS
+        row, price/stock fields at least) into the catalogs:
+        - price/stock of matched products and known items are updated;
+        - items missing from rows are removed, and the products matched to
+          them become unmatched;
+        - codes not in the store yet are added (from their full rows in
+          new_items, where given);
+        then unmatched WooCommerce products are matched against the new and
+        unmatched Capital items. Returns counts: updated (matched products
+        whose Capital data changed), added, removed, newly_matched, unmatched.
+        """
+        rows_by_code = {}
+        for row in rows:
+            code = self._code(row.get('CODE'))
+            if code:
+                rows_by_code[code] = row
+        full_rows = {self._code(row.get('CODE')): row for row in new_items}
+        counts = {}
+        
+        def refreshed(item):
+            """item with the price/stock fields of its row, or item itself if unchanged"""
+            fresh = CapitalItem.from_api(rows_by_code[self._code(item.get('CODE'))])
+            if all(item.get(key) == value for key, value in fresh.items()):
+                return item
+            item = item.copy()
+            item.update(fresh)
+            return item
+            
+        def modify(state):
+            counts.update(updated=0, added=0, removed=0, newly_matched=0, unmatched=0)
+            known = set()
+            
+            matched_products = []
+            freed_woo = []
+            woo_by_id = {p['id']: p for p in state.woo_products}
+            for product in state.matched_products:
+                code = self._code(product.get('capital_code'))
+                known.add(code)
+                row = rows_by_code.get(code)
+                if row is None:
+                    freed_woo.append(woo_by_id.get(product['woo_id']) or self._woo_product_from_matched(product))
+                    counts['unmatched'] += 1
+                    continue
+                fresh = CapitalItem.from_api(row)
+                fields = {('capital_stock' if key == 'BALANCEQTY' else f"capital_{key.lower()}"): float(value or 0)
+                          for key, value in fresh.items() if key in CapitalItem.NUMERIC}
+                if any(product.get(key) != value for key, value in fields.items()):
+                    product = product.copy()
+                    product.update(fields)
+                    product['price_match'] = abs(product.get('woo_regular_price', 0) - product['capital_rtlprice']) < 0.01
+                    counts['updated'] += 1
+                matched_products.append(product)
+                
+            unmatched_capital = []
+            for item in state.unmatched_capital:
+                code = self._code(item.get('CODE'))
+                known.add(code)
+                if code in rows_by_code:
+                    unmatched_capital.append(refreshed(item))
+                else:
+                    counts['removed'] += 1
+            capital_products = [refreshed(item) for item in state.capital_products
+                                if self._code(item.get('CODE')) in rows_by_code]
+            counts['removed'] += sum(1 for product in state.matched_products
+                                     if self._code(product.get('capital_code')) not in rows_by_code)
+            known.update(self._code(item.get('CODE')) for item in state.capital_products)
+            
+            new_items = [CapitalItem.from_api(full_rows.get(code, row))
+                         for code, row in rows_by_code.items() if code not in known]
+            counts['added'] = len(new_items)
+            changes = {'matched_products': matched_products, 'unmatched_capital': unmatched_capital + new_items}
+            if state.capital_products:
+                changes['capital_products'] = capital_products + new_items
+                
+            # Without new codes or freed products, nothing unmatched can pair up
+            if new_items or freed_woo:
+                matched, unmatched_woo, unmatched_capital = ProductMatcher.match_products(
+                    list(state.unmatched_woo) + freed_woo, changes['unmatched_capital'])
+                counts['newly_matched'] = len(matched)
+                changes.update(matched_products=matched_products + matched, unmatched_woo=unmatched_woo,
+                               unmatched_capital=unmatched_capital)
+            return changes
+            
+        self.update(modify)
+        return counts
+        
+    def update_capital_prices(self, capital_products):
+        """
+        Update Capital price/stock fields of matched products from Capital rows.
+        Rows are merged through a CODE index. Returns the number of matched
+        products updated.
+        """
+        rows_by_code = {}
+        for cap_product in capital_products:
+            rows_by_code[str(cap_product.get('CODE', '')).strip().upper()] = cap_product
+            
+        updated = 0
+        
+        def apply_to_matched(matched_product):
+            nonlocal updated
+            cap_product = rows_by_code[str(matched_product.get('capital_code', '')).strip().upper()]
+            matched_product['capital_rtlprice'] = float(cap_product.get('RTLPRICE') or 0)
+            matched_product['capital_whsprice'] = float(cap_product.get('WHSPRICE') or 0)
+            matched_product['capital_discount'] = float(cap_product.get('DISCOUNT') or 0)
+            matched_product['capital_maxdiscount'] = float(cap_product.get('MAXDISCOUNT') or 0)
+            matched_product['capital_stock'] = float(cap_product.get('BALANCEQTY') or 0)
+            
+            # Recalculate price match
+            woo_price = matched_product.get('woo_regular_price', 0)
+            matched_product['price_match'] = abs(woo_price - matched_product['capital_rtlprice']) < 0.01
+            updated += 1
+            return matched_product
+            
+        def modify(state):
+            nonlocal updated
+            updated = 0
+            matched = self._replace_where(
+                state.matched_products,
+                lambda p: str(p.get('capital_code', '')).strip().upper() in rows_by_code,
+                apply_to_matched
+            )
+            return {'matched_products': matched} if matched is not None else None
+            
+        self.update(modify)
+        return updated
+        
+    def replace_unmatched_capital(self, old_product, new_product):
+        """Replace an unmatched Capital product (e.g. after a local edit)"""
+        self.update(lambda state: {'unmatched_capital': [
+            new_product if p is old_product else p for p in state.unmatched_capital
+        ]})
+        self.notify_data_changed()
+        
+    def product_counts(self):
+        """
+        WooCommerce and Capital catalog sizes. Raw catalogs are not part of the
+        warm-start snapshot, so their snapshot counts stand in until a full fetch.
+        """
+        state = self._state
+        woo_count = len(state.woo_products)
+        capital_count = len(state.capital_products)
+        if state.snapshot_info and not woo_count and not capital_count:
+            woo_count = state.snapshot_info.get('woo_count', 0)
+            capital_count = state.snapshot_info.get('capital_count', 0)
+        return woo_count, capital_count
+
+
+# Global data store instance
+data_store = DataStore()
+
+
+# ============================================================================
+# TABLE ROWS - Filtering and formatting for the product tables
+# ============================================================================
+
+def products_table_rows(products, sku_filter="", name_filter="", brand="All Brands"):
+    """
+    Value tuples for the Products table. sku_filter is matched upper-case,
+    name_filter lower-case; a brand matches the beginning of the name.
+    """
+    rows = []
+    for product in products:
+        sku = product.get('sku', '')
+        name = product.get('woo_name', '')
+        
+        # Apply filters
+        if sku_filter and sku_filter not in sku.upper():
+            continue
+        if name_filter and name_filter not in name.lower():
+            continue
+        if brand != "All Brands" and not name.startswith(brand):
+            continue
+            
+        rows.append((
+            "☐",  # Unchecked by default
+            sku,
+            name[:50] + "..." if len(name) > 50 else name,
+            f"{product.get('woo_regular_price', 0):.2f}",
+            f"{product.get('capital_rtlprice', 0):.2f}",
+            f"{product.get('woo_sale_price', 0):.2f}" if product.get('woo_sale_price') else "-",
+            f"{product.get('woo_discount_percent', 0):.1f}%" if product.get('woo_discount_percent') is not None else "-",
+            product.get('woo_stock_quantity', '-'),
+            product.get('woo_total_sales', 0),
+            "✅" if product.get('price_match') else "❌"
+        ))
+    return rows
+
+
+def prices_table_rows(products, show_mismatches=False, search_text=""):
+    """Value tuples for the Prices table (search_text lower-case, matched on SKU or name)"""
+    rows = []
+    for product in products:
+        # Filter by mismatch
+        if show_mismatches and product.get('price_match'):
+            continue
+            
+        # Filter by search
+        if search_text:
+            if (search_text not in product.get('sku', '').lower() and
+                    search_text not in product.get('woo_name', '').lower()):
+                continue
+                
+        woo_price = product.get('woo_regular_price', 0)
+        capital_price = product.get('capital_rtlprice', 0)
+        difference = woo_price - capital_price
+        
+        rows.append((
+            "☐",  # Checkbox unchecked by default
+            product.get('sku', ''),
+            product.get('woo_name', '')[:40],
+            f"{woo_price:.2f}",
+            f"{capital_price:.2f}",
+            f"{difference:+.2f}",
+            f"{product.get('woo_sale_price', 0):.2f}" if product.get('woo_sale_price') else "-",
+            f"{product.get('woo_discount_percent', 0):.1f}%" if product.get('woo_discount_percent') is not None else "-"
+        ))
+    return rows
+
+
+# ============================================================================
+# MEMORY FOOTPRINT - Approximate sizes of the data store and table models
+# ============================================================================
+
+_process = None
+
+
+def process_rss():
+    """Resident memory of this process in bytes (None if it can't be read)"""
+    global _process
+    if psutil:
+        if _process is None:
+            _process = psutil.Process()
+        return _process.memory_info().rss
+    try:
+        # Linux without psutil
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def deep_sizeof(obj, seen):
+    """
+    Bytes of obj and everything it references, skipping objects whose id is
+    in seen (seen is updated). Shared objects are counted once per seen set.
+    """
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, CompactRecord):
+            stack.extend(getattr(obj, field) for field in obj.FIELDS if hasattr(obj, field))
+            if obj._extra is not None:
+                stack.append(obj._extra)
+        elif isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return size
+
+
+def _sample(items, limit):
+    """Every n-th item so at most limit are walked, and the factor to scale their sizes by"""
+    if limit is None or len(items) <= limit:
+        return items, 1.0
+    step = len(items) / limit
+    return [items[int(i * step)] for i in range(limit)], len(items) / limit
+
+
+# Record type of the plain dicts in a state collection
+DICT_RECORD_TYPES = {'woo_orders': 'order', 'woo_categories': 'category'}
+
+
+def _record_type(record, collection):
+    if isinstance(record, WooProduct) and record.get('is_variation'):
+        return 'WooProduct (variation)'
+    if isinstance(record, dict):
+        return DICT_RECORD_TYPES.get(collection, 'dict')
+    return type(record).__name__
+
+
+def _fields(record):
+    """(field, stored value) pairs of a record or dict"""
+    if isinstance(record, CompactRecord):
+        pairs = [(field, getattr(record, field)) for field in record.FIELDS if hasattr(record, field)]
+        if record._extra:
+            pairs.extend(record._extra.items())
+        return pairs
+    if isinstance(record, dict):
+        return list(record.items())
+    return []
+
+
+def memory_report(store=None, tables=None, sample=5000):
+    """
+    Approximate memory used by the data store (and, with tables, by table
+    models: {name: rows}). Reports bytes per state collection, per record
+    type and per field of each type. Large collections are sized from a
+    sample of at most sample records and scaled up, so figures are
+    estimates; sample=None walks everything.
+    
+    'bytes' of a collection is everything its records reference; 'unique'
+    leaves out records and objects already counted for a collection listed
+    before it (unmatched products are the same records as in the catalogs).
+    """
+    store = store or data_store
+    state = store.state
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'rss': process_rss(),
+        'sample': sample,
+        'collections': [],
+        'record_types': [],
+        'tables': [],
+    }
+    
+    # Per collection
+    counted_seen = set()
+    counted_ids = set()
+    by_type = defaultdict(dict)           # record type -> {id: record}
+    for name in STATE_COLLECTIONS:
+        records = getattr(state, name)
+        picked, scale = _sample(records, sample)
+        seen = set()
+        size = unique = 0
+        for record in picked:
+            size += deep_sizeof(record, seen)
+            if id(record) not in counted_ids:
+                unique += deep_sizeof(record, counted_seen)
+        container = sys.getsizeof(records)
+        report['collections'].append({
+            'name': name,
+            'records': len(records),
+            'bytes': int(size * scale) + container,
+            'unique_bytes': int(unique * scale) + container,
+            'estimated': scale > 1,
+        })
+        counted_ids.update(map(id, records))
+        for record in records:
+            by_type[_record_type(record, name)][id(record)] = record
+    
+    # Indexes and shared objects outside the collections
+    sku_index = store._sku_index[1]
+    index_size = sys.getsizeof(sku_index) + sum(sys.getsizeof(sku) for sku in sku_index)
+    shared_size = deep_sizeof(CompactRecord._shared_dicts, set())
+    for name, records, size in (('sku_index', len(sku_index), index_size),
+                                ('shared_dicts', len(CompactRecord._shared_dicts), shared_size)):
+        report['collections'].append({
+            'name': name, 'records': records, 'bytes': size, 'unique_bytes': size, 'estimated': False
+        })
+    
+    # Per record type and field
+    for record_type, records_by_id in by_type.items():
+        records = list(records_by_id.values())
+        picked, scale = _sample(records, sample)
+        field_seen = defaultdict(set)
+        field_bytes = Counter()
+        field_count = Counter()
+        shells = 0
+        for record in picked:
+            shells += sys.getsizeof(record)
+            for field, value in _fields(record):
+                field_bytes[field] += deep_sizeof(value, field_seen[field])
+                field_count[field] += 1
+        total = shells + sum(field_bytes.values())
+        report['record_types'].append({
+            'type': record_type,
+            'records': len(records),
+            'bytes': int(total * scale),
+            'bytes_per_record': round(total / len(picked)) if picked else 0,
+            'estimated': scale > 1,
+            'fields': [
+                {'field': '(record)', 'bytes': int(shells * scale), 'present': len(records)}
+            ] + [
+                {'field': field, 'bytes': int(size * scale), 'present': int(field_count[field] * scale)}
+                for field, size in field_bytes.most_common()
+            ],
+        })
+    report['record_types'].sort(key=lambda item: -item['bytes'])
+    
+    # Table models (value tuples of table rows, item -> checkbox state maps...)
+    for name, rows in (tables or {}).items():
+        rows = list(rows.items()) if isinstance(rows, dict) else rows
+        picked, scale = _sample(rows, sample)
+        seen = set()
+        size = sum(deep_sizeof(row, seen) for row in picked)
+        total = int(size * scale) + sys.getsizeof(rows)
+        report['tables'].append({
+            'name': name,
+            'rows': len(rows),
+            'bytes': total,
+            'bytes_per_row': round(total / len(rows)) if rows else 0,
+            'estimated': scale > 1,
+        })
+    
+    report['total_bytes'] = (sum(item['unique_bytes'] for item in report['collections']) +
+                             sum(item['bytes'] for item in report['tables']))
+    return report
+
+
+def _megabytes(size):
+    return f"{size / 1_000_000:.2f} MB" if size is not None else "-"
+
+
+def format_memory_report(report, fields=8):
+    """Plain-text memory report (the top fields of each record type)"""
+    lines = [
+        f"Memory footprint at {report['created_at'].replace('T', ' ')}   "
+        f"process RSS {_megabytes(report['rss'])}   data + tables ≈ {_megabytes(report['total_bytes'])}",
+        "~ marks estimates from a sample of "
+        f"{report['sample']} records" if report['sample'] else "All records walked",
+        "",
+        f"{'Collection':<22} {'Records':>9} {'Size':>12} {'Unique':>12} {'Per record':>11}",
+    ]
+    for item in report['collections']:
+        per_record = item['bytes'] / item['records'] if item['records'] else 0
+        mark = "~" if item['estimated'] else " "
+        lines.append(f"{item['name']:<22} {item['records']:>9} {_megabytes(item['bytes']):>12}"
+                     f"{mark}{_megabytes(item['unique_bytes']):>12} {per_record:>9.0f} B")
+    for record_type in report['record_types']:
+        mark = "~" if record_type['estimated'] else ""
+        lines += ["", f"{record_type['type']}: {record_type['records']} records, "
+                      f"{mark}{_megabytes(record_type['bytes'])}, {record_type['bytes_per_record']} B per record"]
+        for field in record_type['fields'][:fields]:
+            share = field['bytes'] / record_type['bytes'] if record_type['bytes'] else 0
+            lines.append(f"    {field['field']:<24} {_megabytes(field['bytes']):>12} {share:>6.1%}"
+                         f"   in {field['present']} records")
+    if report['tables']:
+        lines += ["", f"{'Table model':<34} {'Rows':>9} {'Size':>12} {'Per row':>9}"]
+        for table in report['tables']:
+            mark = "~" if table['estimated'] else " "
+            lines.append(f"{table['name']:<34} {table['rows']:>9} {_megabytes(table['bytes']):>12}"
+                         f"{mark}{table['bytes_per_row']:>7} B")
+    return "\n".join(lines)
+
+
+# ============================================================================
+# PERFORMANCE SPANS - Per-phase timings of sync runs
+# ============================================================================
+
+class PerfSpan:
+    """Duration, item count, network counters and peak memory of one phase of a run"""
+    
+    __slots__ = ('name', 'offset', 'seconds', 'items', 'count', 'requests', 'bytes', 'retries', 'errors',
+                 'peak_rss', 'started')
+    
+    def __init__(self, name, offset=0.0):
+        self.name = name
+        self.offset = offset            # Seconds after the start of the run
+        self.seconds = None
+        self.items = None
+        self.count = 1                  # Times the phase ran (a repeated phase is one span)
+        self.requests = 0
+        self.bytes = 0
+        self.retries = 0
+        self.errors = 0
+        self.peak_rss = None            # Highest process RSS seen while the phase ran (bytes)
+        self.started = time.perf_counter()
+        
+    def note_rss(self, rss):
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+            
+    def add_request(self, size, retry, error):
+        self.requests += 1
+        self.bytes += size
+        self.retries += retry
+        self.errors += error
+        
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'offset': round(self.offset, 3),
+            'seconds': round(self.seconds, 4) if self.seconds is not None else None,
+            'items': self.items,
+            'count': self.count,
+            'requests': self.requests,
+            'bytes': self.bytes,
+            'retries': self.retries,
+            'errors': self.errors,
+            'peak_rss': self.peak_rss,
+        }
+
+
+class PerfRun:
+    """The spans of one run (full fetch, delta refresh, price update, UI refresh)"""
+    
+    def __init__(self, kind):
+        self.kind = kind
+        self.started_at = datetime.now()
+        self.status = 'running'
+        self.total = PerfSpan(kind)     # The whole run, including requests outside any span
+        self.spans = []
+        self._open = []
+        self._lock = threading.Lock()
+        
+    def begin(self, name):
+        """Open a span; a phase repeated back to back (one per batch) reopens its span"""
+        rss = process_rss()
+        with self._lock:
+            last = self.spans[-1] if self.spans else None
+            if last and last.name == name and last not in self._open:
+                span = last
+                span.count += 1
+                span.started = time.perf_counter()
+            else:
+                span = PerfSpan(name, time.perf_counter() - self.total.started)
+                self.spans.append(span)
+            self._open.append(span)
+            self._note_rss(rss)
+        return span
+        
+    def end(self, name, items=None):
+        """Close the innermost open span called name"""
+        rss = process_rss()
+        with self._lock:
+            self._note_rss(rss)
+            span = next((span for span in reversed(self._open) if span.name == name), None)
+            if span is None:
+                return None
+            self._open.remove(span)
+        span.seconds = (span.seconds or 0.0) + time.perf_counter() - span.started
+        if items is not None:
+            span.items = (span.items or 0) + items
+        return span
+        
+    def note_rss(self, rss):
+        """Record a process memory reading in the run and its open spans"""
+        with self._lock:
+            self._note_rss(rss)
+            
+    def _note_rss(self, rss):
+        self.total.note_rss(rss)
+        for span in self._open:
+            span.note_rss(rss)
+            
+    def add_request(self, size, retry, error):
+        """Count a request in the run and its innermost open span"""
+        with self._lock:
+            self.total.add_request(size, retry, error)
+            if self._open:
+                self._open[-1].add_request(size, retry, error)
+                
+    def finish(self, status):
+        rss = process_rss()
+        now = time.perf_counter()
+        with self._lock:
+            self._note_rss(rss)
+            # Spans left open by an error or cancellation end with the run
+            for span in self._open:
+                span.seconds = (span.seconds or 0.0) + now - span.started
+            self._open = []
+        self.total.seconds = now - self.total.started
+        self.status = status
+        
+    def to_dict(self):
+        total = self.total.to_dict()
+        return {
+            'kind': self.kind,
+            'status': self.status,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'seconds': total['seconds'],
+            'requests': total['requests'],
+            'bytes': total['bytes'],
+            'retries': total['retries'],
+            'errors': total['errors'],
+            'peak_rss': total['peak_rss'],
+            'spans': [span.to_dict() for span in self.spans],
+        }
+
+
+class PerfRecorder:
+    """
+    Records sync runs as spans. A run is started with run() and its phases
+    marked with begin(name) / end(name, items); outside a run these are
+    no-ops. The current run is a context variable, which ContextThreadPool
+    workers and coroutines on the I/O loop inherit from their caller, so
+    requests count towards the innermost open span of the run they were
+    made for, even with several runs going at once. The cost is a lock and
+    a few additions per request, so it is always on.
+    
+    Process memory (RSS) is read when spans open and close and every
+    MEMORY_INTERVAL seconds while a run is going, so each span has the
+    peak RSS seen while it ran.
+    """
+    
+    MEMORY_INTERVAL = 0.1
+    
+    def __init__(self):
+        self._run = contextvars.ContextVar('perf_run', default=None)
+        self._active = []
+        self._running = threading.Event()     # Set while a run counting requests is going
+        self._memory_thread = None
+        
+    def _watch_memory(self):
+        """Sample RSS into the active runs (daemon thread, idle between runs)"""
+        while True:
+            self._running.wait()
+            time.sleep(self.MEMORY_INTERVAL)
+            rss = process_rss()
+            for run in list(self._active):
+                run.note_rss(rss)
+                
+    def _start_memory_watch(self):
+        if self._memory_thread is None and process_rss() is not None:
+            self._memory_thread = threading.Thread(target=self._watch_memory, name="bridge-perf-memory", daemon=True)
+            self._memory_thread.start()
+            
+    def current(self):
+        """The run of the current context, if any"""
+        return self._run.get()
+        
+    @contextmanager
+    def run(self, kind, db=None, count_requests=True):
+        """
+        Record a run; when it ends it is saved to db (a LocalDatabase).
+        A run started inside another run becomes a span of the outer one.
+        count_requests=False (for runs that make no requests, like UI
+        refreshes) leaves the run out of the background memory sampling.
+        """
+        outer = self.current()
+        if outer:
+            outer.begin(kind)
+            try:
+                yield outer
+            finally:
+                outer.end(kind)
+            return
+            
+        run = PerfRun(kind)
+        token = self._run.set(run)
+        if count_requests:
+            self._active.append(run)
+            self._running.set()
+            self._start_memory_watch()
+        status = 'ok'
+        try:
+            yield run
+        except JobCancelled:
+            status = 'cancelled'
+            raise
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            self._run.reset(token)
+            if count_requests:
+                self._active.remove(run)
+                if not self._active:
+                    self._running.clear()
+            run.finish(status)
+            if db:
+                try:
+                    db.save_perf_run(run.to_dict())
+                except Exception as e:
+                    print(f"Warning: Could not save performance run: {str(e)}")
+                    
+    def begin(self, name):
+        run = self.current()
+        if run:
+            run.begin(name)
+            
+    def end(self, name, items=None):
+        run = self.current()
+        if run:
+            run.end(name, items)
+            
+    @contextmanager
+    def span(self, name):
+        """begin/end around a block"""
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+            
+    def add_request(self, trace):
+        """Count one HTTP request attempt (a traffic controller observer)"""
+        run = self.current()
+        if run is None:
+            return
+        run.add_request(trace.size, trace.attempt > 0, trace.error is not None or trace.status >= 400)
+
+
+def perf_trends(runs):
+    """
+    Per-phase timing trend of runs (newest first, as get_perf_runs returns
+    them): {phase: {'history': seconds oldest -> newest, 'last', 'median',
+    'min', 'max'}}. The whole run is the phase 'total'.
+    """
+    history = defaultdict(list)
+    for run in reversed(runs):
+        if run['seconds'] is not None:
+            history['total'].append(run['seconds'])
+        phase_seconds = defaultdict(float)
+        for span in run['spans']:
+            if span['seconds'] is not None:
+                phase_seconds[span['name']] += span['seconds']
+        for name, seconds in phase_seconds.items():
+            history[name].append(seconds)
+            
+    trends = {}
+    for name, values in history.items():
+        ordered = sorted(values)
+        middle = len(ordered) // 2
+        median = ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+        trends[name] = {
+            'history': values,
+            'last': values[-1],
+            'median': median,
+            'min': ordered[0],
+            'max': ordered[-1],
+        }
+    return trends
+
+
+# Global performance recorder instance
+perf = PerfRecorder()
+
+
+# ============================================================================
+# TRAFFIC CONTROL - Adaptive concurrency and rate limits for API calls
+# ============================================================================
+
+class HostLimiter:
+    """Concurrency window and health statistics for one API host"""
+    
+    def __init__(self, initial, maximum):
+        self.limit = float(initial)     # Allowed concurrent requests (AIMD window)
+        self.maximum = maximum
+        self.in_flight = 0
+        self.blocked_until = 0.0        # Retry-After / back-off deadline (monotonic)
+        self.latency = None             # Moving average of request latency
+        self.baseline = None            # Latency when the host is healthy
+        self.last_decrease = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        
+    def stats(self):
+        """Current window and counters"""
+        return {
+            'limit': round(self.limit, 2),
+            'in_flight': self.in_flight,
+            'latency': self.latency,
+            'requests': self.requests,
+            'errors': self.errors,
+            'throttled': self.throttled
+        }
+
+
+class TrafficController:
+    """
+    Shared gate for all outbound WooCommerce and Capital requests.
+    
+    Each host gets an AIMD concurrency window: every healthy response grows
+    it by about one request per window, while errors, 429/5xx responses and
+    latency well above the healthy baseline halve it (at most once per
+    second). Retry-After pauses the host. A global token bucket caps the
+    total request rate across hosts. Thread pools can therefore be sized
+    generously; the controller decides how many requests actually run.
+    """
+    
+    RETRY_STATUSES = (429, 503)
+    SLOW_FACTOR = 3.0           # Latency above baseline * SLOW_FACTOR counts as overload
+    SLOW_MINIMUM = 1.0          # ...but only when it is above this many seconds
+    
+    def __init__(self, requests_per_second=40, initial_concurrency=4, max_concurrency=32, max_retries=3):
+        self.rate = requests_per_second
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        self._hosts = {}
+        self._tokens = float(requests_per_second)
+        self._refilled = time.monotonic()
+        self._observers = []
+        self._connections = weakref.WeakKeyDictionary()  # socket -> requests served
+        self._async_waiters = set()                       # (loop, asyncio.Event) of acquire_async calls
+        
+    def host(self, url):
+        """The limiter for the host of url"""
+        name = urlparse(url).netloc
+        with self._cond:
+            limiter = self._hosts.get(name)
+            if limiter is None:
+                limiter = self._hosts[name] = HostLimiter(self.initial_concurrency, self.max_concurrency)
+            return limiter
+            
+    def stats(self):
+        """Per-host window and counters"""
+        with self._cond:
+            return {name: limiter.stats() for name, limiter in self._hosts.items()}
+            
+    def add_observer(self, callback):
+        """callback(trace) is called with a RequestTrace after every request attempt, on the requesting thread"""
+        self._observers.append(callback)
+        
+    def _trace(self, method, url, kwargs, seconds, attempt, status=None, size=0, error=None, reused=None):
+        """Pass one request attempt to the observers"""
+        if not self._observers:
+            return
+        trace = RequestTrace(
+            method, url, urlparse(url).netloc, endpoint_template(method, url, kwargs.get('json')),
+            status, seconds, size, attempt, error, reused
+        )
+        for callback in self._observers:
+            try:
+                callback(trace)
+            except Exception as e:
+                print(f"Request observer error: {e}")
+                
+    def _mark_connection(self, response, *args, **kwargs):
+        """
+        requests response hook (runs before the body is read, while the
+        connection is attached): notes whether the socket served earlier requests.
+        """
+        sock = getattr(getattr(response.raw, 'connection', None), 'sock', None)
+        response.connection_reused = None
+        if sock is not None:
+            with self._cond:
+                served = self._connections.get(sock, 0)
+                self._connections[sock] = served + 1
+            response.connection_reused = served > 0
+        return response
+        
+    @staticmethod
+    def connection_trace_config():
+        """aiohttp TraceConfig that tells request_async whether a pooled connection was reused"""
+        async def reused(session, context, params):
+            context.trace_request_ctx['reused'] = True
+            
+        async def created(session, context, params):
+            context.trace_request_ctx['reused'] = False
+            
+        config = aiohttp.TraceConfig()
+        config.on_connection_reuseconn.append(reused)
+        config.on_connection_create_end.append(created)
+        return config
+        
+    def _try_acquire(self, limiter):
+        """
+        Take a host slot and a budget token if both are free (lock held).
+        Returns None when acquired, otherwise the seconds to wait.
+        """
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        
+        if now < limiter.blocked_until:
+            return limiter.blocked_until - now
+        if limiter.in_flight >= int(limiter.limit):
+            return 1.0    # woken up earlier by release()
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        self._tokens -= 1
+        limiter.in_flight += 1
+        return None
+        
+    def acquire(self, limiter):
+        """Block until the host has a free slot and the global budget a token"""
+        with self._cond:
+            while True:
+                wait = self._try_acquire(limiter)
+                if wait is None:
+                    return
+                self._cond.wait(wait)
+                
+    async def acquire_async(self, limiter):
+        """acquire() for the event loop: awaits the next release() instead of blocking the loop thread"""
+        loop = asyncio.get_running_loop()
+        while True:
+            released = asyncio.Event()
+            with self._cond:
+                wait = self._try_acquire(limiter)
+                if wait is None:
+                    return
+                self._async_waiters.add((loop, released))
+            try:
+                await asyncio.wait_for(released.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._cond:
+                    self._async_waiters.discard((loop, released))
+            
+    def release(self, limiter, latency, status=None, error=None, retry_after=None):
+        """Record the outcome of a request and adjust the host's window"""
+        with self._cond:
+            now = time.monotonic()
+            limiter.in_flight -= 1
+            limiter.requests += 1
+            
+            overloaded = error is not None or status in self.RETRY_STATUSES or (status or 0) >= 500
+            if status in self.RETRY_STATUSES:
+                limiter.throttled += 1
+                limiter.blocked_until = max(limiter.blocked_until, now + (1.0 if retry_after is None else retry_after))
+            elif error is None:
+                limiter.latency = latency if limiter.latency is None else 0.8 * limiter.latency + 0.2 * latency
+                if limiter.baseline is None or limiter.latency < limiter.baseline:
+                    limiter.baseline = limiter.latency
+                else:
+                    # Let the baseline follow a lasting change slowly
+                    limiter.baseline += (limiter.latency - limiter.baseline) * 0.01
+                if limiter.latency > max(self.SLOW_MINIMUM, limiter.baseline * self.SLOW_FACTOR):
+                    overloaded = True
+                    
+            if overloaded:
+                limiter.errors += 1
+                if now - limiter.last_decrease > 1.0:
+                    limiter.limit = max(1.0, limiter.limit / 2)
+                    limiter.last_decrease = now
+            else:
+                limiter.limit = min(limiter.maximum, limiter.limit + 1 / limiter.limit)
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, set()
+        # release() runs on worker threads and event loops alike
+        for loop, released in waiters:
+            try:
+                loop.call_soon_threadsafe(released.set)
+            except RuntimeError:
+                pass    # Loop already closed
+            
+    def request(self, method, url, session=None, **kwargs):
+        """
+        Perform an HTTP request through the controller (with session if given).
+        429/503 responses are retried after their Retry-After delay, up to
+        max_retries times; the last response is returned either way.
+        """
+        limiter = self.host(url)
+        http = session or requests
+        for attempt in range(self.max_retries + 1):
+            self.acquire(limiter)
+            start = time.perf_counter()
+            try:
+                response = http.request(method, url, hooks={'response': self._mark_connection}, **kwargs)
+            except Exception as e:
+                latency = time.perf_counter() - start
+                self.release(limiter, latency, error=e)
+                self._trace(method, url, kwargs, latency, attempt, error=e)
+                raise
+            latency = time.perf_counter() - start
+            retry_after = None
+            if response.status_code in self.RETRY_STATUSES:
+                retry_after = self._retry_after(response.headers.get('Retry-After'), attempt)
+            self.release(limiter, latency, status=response.status_code, retry_after=retry_after)
+            self._trace(method, url, kwargs, latency, attempt, response.status_code, len(response.content or b''),
+                        reused=getattr(response, 'connection_reused', None))
+            if retry_after is None or attempt == self.max_retries:
+                return response
+        return response
+        
+    async def request_async(self, session, method, url, **kwargs):
+        """request() on an aiohttp session; returns an AsyncResponse"""
+        limiter = self.host(url)
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(limiter)
+            start = time.perf_counter()
+            connection = {}     # Filled in by connection_trace_config, if the session has it
+            try:
+                async with session.request(method, url, trace_request_ctx=connection, **kwargs) as raw:
+                    response = AsyncResponse(raw.status, raw.headers, await raw.read(), url)
+            except Exception as e:
+                latency = time.perf_counter() - start
+                self.release(limiter, latency, error=e)
+                self._trace(method, url, kwargs, latency, attempt, error=e)
+                raise
+            latency = time.perf_counter() - start
+            retry_after = None
+            if response.status_code in self.RETRY_STATUSES:
+                retry_after = self._retry_after(response.headers.get('Retry-After'), attempt)
+            self.release(limiter, latency, status=response.status_code, retry_after=retry_after)
+            self._trace(method, url, kwargs, latency, attempt, response.status_code, len(response.content),
+                        reused=connection.get('reused'))
+            if retry_after is None or attempt == self.max_retries:
+                return response
+        return response
+        
+    @staticmethod
+    def _retry_after(value, attempt):
+        """Seconds to wait from a Retry-After header (seconds or HTTP date)"""
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                try:
+                    return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+                except (TypeError, ValueError):
+                    pass
+        # No usable header: exponential back-off
+        return float(2 ** attempt)
+
+
+# Global traffic controller instance
+traffic = TrafficController()
+
+
+# ============================================================================
+# HTTP TRACING - Per-endpoint request statistics
+# ============================================================================
+
+# One request attempt as seen by the traffic controller (error is the exception, if any;
+# reused is None when the connection couldn't be identified)
+RequestTrace = namedtuple('RequestTrace', 'method url host endpoint status seconds size attempt error reused')
+
+WOO_API_PATH = '/wp-json/wc/v3/'
+
+
+def endpoint_template(method, url, payload=None):
+    """
+    Endpoint name for statistics: WooCommerce paths with their ids replaced
+    ('GET /products/{id}/variations'), Capital calls by service and table
+    ('getdata STOCKITEMS').
+    """
+    if isinstance(payload, dict) and payload.get('service'):
+        return f"{payload['service']} {payload.get('tablename', '')}".rstrip()
+    path = urlparse(url).path
+    if WOO_API_PATH in path:
+        path = path.split(WOO_API_PATH, 1)[1]
+    parts = ['{id}' if part.isdigit() else part for part in path.strip('/').split('/')]
+    return f"{method} /{'/'.join(parts)}"
+
+
+class EndpointStats:
+    """Counters, status codes and a latency histogram for one endpoint"""
+    
+    # Latency histogram bucket upper bounds (ms); the last bucket is everything slower
+    BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 60000)
+    SAMPLES = 2000      # Recent latencies kept for percentiles
+    
+    def __init__(self, host, endpoint):
+        self.host = host
+        self.endpoint = endpoint
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.reused = 0
+        self.new_connections = 0
+        self.bytes = 0
+        self.max_bytes = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.statuses = Counter()
+        self.histogram = [0] * (len(self.BUCKETS_MS) + 1)
+        self.samples = deque(maxlen=self.SAMPLES)
+        
+    def add(self, trace):
+        self.requests += 1
+        self.retries += trace.attempt > 0
+        if trace.error is not None:
+            self.errors += 1
+            self.statuses[type(trace.error).__name__] += 1
+        else:
+            self.errors += trace.status >= 400
+            self.statuses[trace.status] += 1
+        if trace.reused is not None:
+            if trace.reused:
+                self.reused += 1
+            else:
+                self.new_connections += 1
+        self.bytes += trace.size
+        self.max_bytes = max(self.max_bytes, trace.size)
+        self.seconds += trace.seconds
+        self.max_seconds = max(self.max_seconds, trace.seconds)
+        
+        milliseconds = trace.seconds * 1000
+        bucket = 0
+        while bucket < len(self.BUCKETS_MS) and milliseconds > self.BUCKETS_MS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+        self.samples.append(trace.seconds)
+        
+    @classmethod
+    def bucket_labels(cls):
+        return [f"<={limit}ms" for limit in cls.BUCKETS_MS] + [f">{cls.BUCKETS_MS[-1]}ms"]
+        
+    def summary(self):
+        """Plain dict of the counters, percentiles (ms) and histogram"""
+        ordered = sorted(self.samples)
+        
+        def percentile(q):
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+            
+        identified = self.reused + self.new_connections
+        return {
+            'host': self.host,
+            'endpoint': self.endpoint,
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'connection_reuse': round(self.reused / identified, 3) if identified else None,
+            'new_connections': self.new_connections,
+            'p50_ms': percentile(0.50),
+            'p90_ms': percentile(0.90),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(self.max_seconds * 1000, 1),
+            'mean_ms': round(self.seconds / self.requests * 1000, 1) if self.requests else None,
+            'total_seconds': round(self.seconds, 3),
+            'bytes': self.bytes,
+            'mean_bytes': self.bytes // self.requests if self.requests else 0,
+            'max_bytes': self.max_bytes,
+            'statuses': {str(status): count for status, count in self.statuses.most_common()},
+            'histogram': dict(zip(self.bucket_labels(), self.histogram)),
+        }
+
+
+class RequestStats:
+    """
+    Per-endpoint statistics of every request through the traffic
+    controller (registered as its observer). Exportable as JSON or CSV
+    for finding the endpoints where concurrency or field projection pays.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.started_at = datetime.now()
+        
+    def record(self, trace):
+        key = (trace.host, trace.endpoint)
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = EndpointStats(trace.host, trace.endpoint)
+            stats.add(trace)
+            
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self.started_at = datetime.now()
+            
+    def summary(self):
+        """Endpoint summaries, the most total time first"""
+        with self._lock:
+            summaries = [stats.summary() for stats in self._endpoints.values()]
+        return sorted(summaries, key=lambda s: s['total_seconds'], reverse=True)
+        
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'exported_at': datetime.now().isoformat(timespec='seconds'),
+                'endpoints': self.summary(),
+            }, f, indent=2)
+            
+    def export_csv(self, path):
+        """One row per endpoint; statuses as 'code=count' pairs, one column per histogram bucket"""
+        labels = EndpointStats.bucket_labels()
+        columns = [key for key in EndpointStats('', '').summary() if key not in ('statuses', 'histogram')]
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns + ['statuses'] + labels)
+            for summary in self.summary():
+                statuses = " ".join(f"{status}={count}" for status, count in summary['statuses'].items())
+                writer.writerow(
+                    [summary[column] for column in columns] + [statuses] + [summary['histogram'][label] for label in labels]
+                )
+
+
+# Global request statistics instance
+http_stats = RequestStats()
+
+traffic.add_observer(perf.add_request)
+traffic.add_observer(http_stats.record)
+
+
+# ============================================================================
+# API CLIENTS
+# ============================================================================
+
+class ContextThreadPool(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor whose tasks run in a copy of the submitting thread's
+    context, so requests made on the pool count towards the caller's perf
+    run and report to its progress task
+    """
+    
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class WooCommerceClient:
+    """WooCommerce REST API client (progress and errors of bulk calls go to log)"""
+    
+    # Largest include= list WooCommerce accepts in one page (per_page max)
+    INCLUDE_BATCH_SIZE = 100
+    
+    # Paged listings run oldest id first: in the default order (newest first) every
+    # product created mid-listing shifts the later pages, and checkpointed pages
+    # saved before it would overlap the pages fetched after
+    LISTING_ORDER = {'orderby': 'id', 'order': 'asc'}
+    
+    def __init__(self, config, log=print):
+        self.store_url = config["store_url"]
+        self.auth = HTTPBasicAuth(config["consumer_key"], config["consumer_secret"])
+        self.log = log
+        
+    def get_products(self, per_page=100, page=1, **kwargs):
+        """Get products from WooCommerce"""
+        url = f"{self.store_url}/wp-json/wc/v3/products"
+        params = {"per_page": per_page, "page": page, **kwargs}
+        response = traffic.request('GET', url, auth=self.auth, params=params, timeout=60)
+        response.raise_for_status()
+        return response.json(), response.headers
+        
+    def _get_all_pages(self, get_page, params, progress_callback, checkpoint, status):
+        """
+        All pages of a listing. With a checkpoint, every fetched page is
+        saved to it and pages already saved are not requested again.
+        """
+        params = {**self.LISTING_ORDER, **params}
+        all_items = []
+        page = 1
+        per_page = 100
+        
+        while True:
+            saved = checkpoint.get(page) if checkpoint else None
+            if saved is not None:
+                items, total_pages, total = saved['items'], saved['total_pages'], saved['total']
+            else:
+                items, headers = get_page(per_page=per_page, page=page, **params)
+                total_pages = int(headers.get('X-WP-TotalPages', 1))
+                total = int(headers.get('X-WP-Total', 0)) or None
+                if checkpoint:
+                    checkpoint.put(page, {'items': items, 'total_pages': total_pages, 'total': total})
+            if not items:
+                break
+            all_items.extend(items)
+            
+            if progress_callback:
+                progress = min(100, int((page / total_pages) * 100))
+                progress_callback(progress, f"{status} Page {page}/{total_pages}", fetched=len(all_items), total=total)
+                
+            if page >= total_pages:
+                break
+            page += 1
+            
+        return self._unique_by_id(all_items)
+        
+    @staticmethod
+    def _unique_by_id(items):
+        """Items of merged pages, once each (the last copy, as fetched latest, in first-seen order)"""
+        unique = {item['id']: item for item in items}
+        return items if len(unique) == len(items) else list(unique.values())
+        
+    def get_all_products(self, progress_callback=None, checkpoint=None, **params):
+        """Get all products with pagination (extra params e.g. modified_after are passed through)"""
+        return self._get_all_pages(self.get_products, params, progress_callback, checkpoint,
+                                   "Fetching WooCommerce products...")
+        
+    def get_orders(self, per_page=100, page=1, **kwargs):
+        """Get orders from WooCommerce"""
+        url = f"{self.store_url}/wp-json/wc/v3/orders"
+        params = {"per_page": per_page, "page": page, **kwargs}
+        response = traffic.request('GET', url, auth=self.auth, params=params, timeout=60)
+        response.raise_for_status()
+        return response.json(), response.headers
+        
+    def get_all_orders(self, status=None, after=None, progress_callback=None, checkpoint=None):
+        """Get all orders with pagination"""
+        params = {}
+        if status:
+            params['status'] = status
+        if after:
+            params['after'] = after
+            
+        return self._get_all_pages(self.get_orders, params, progress_callback, checkpoint, "Fetching orders...")
+        
+    def get_categories(self):
+        """Get all product categories"""
+        all_categories = []
+        page = 1
+        per_page = 100
+        
+        while True:
+            url = f"{self.store_url}/wp-json/wc/v3/products/categories"
+            params = {"per_page": per_page, "page": page}
+            response = traffic.request('GET', url, auth=self.auth, params=params, timeout=30)
+            response.raise_for_status()
+            categories = response.json()
+            
+            if not categories:
+                break
+            all_categories.extend(categories)
+            
+            total_pages = int(response.headers.get('X-WP-TotalPages', 1))
+            if page >= total_pages:
+                break
+            page += 1
+            
+        return all_categories
+        
+    def get_product_variations(self, product_id):
+        """
+        Get all variations for a variable product ([] if it has none, None
+        if the listing failed, so a failure isn't taken for no variations)
+        """
+        all_variations = []
+        page = 1
+        per_page = 100
+        
+        while True:
+            url = f"{self.store_url}/wp-json/wc/v3/products/{product_id}/variations"
+            params = {"per_page": per_page, "page": page}
+            try:
+                response = traffic.request('GET', url, auth=self.auth, params=params, timeout=30)
+                response.raise_for_status()
+                variations = response.json()
+                
+                if not variations:
+                    break
+                all_variations.extend(variations)
+                
+                total_pages = int(response.headers.get('X-WP-TotalPages', 1))
+                if page >= total_pages:
+                    break
+                page += 1
+            except Exception as e:
+                self.log(f"[ERROR] Variations of product {product_id} could not be listed: {e}")
+                return None
+                
+        return all_variations
+        
+    def get_products_by_ids(self, items, max_workers=16, progress_callback=None):
+        """
+        Fetch specific products and variations with as few requests as possible.
+        
+        items are (product_id, parent_id) pairs. Simple products are looked up
+        INCLUDE_BATCH_SIZE at a time with include=, variations through their
+        parent's variation listing (also filtered with include=). Requests run
+        concurrently. Returns {id: product data}; ids that could not be
+        fetched are missing from the result. progress_callback(count) is
+        called with the number of ids covered by each finished request.
+        """
+        simple_ids = []
+        variation_ids = defaultdict(list)
+        for product_id, parent_id in items:
+            if parent_id:
+                variation_ids[parent_id].append(product_id)
+            else:
+                simple_ids.append(product_id)
+                
+        lookups = []
+        size = self.INCLUDE_BATCH_SIZE
+        for i in range(0, len(simple_ids), size):
+            lookups.append((f"{self.store_url}/wp-json/wc/v3/products", simple_ids[i:i + size]))
+        for parent_id, ids in variation_ids.items():
+            for i in range(0, len(ids), size):
+                lookups.append((f"{self.store_url}/wp-json/wc/v3/products/{parent_id}/variations", ids[i:i + size]))
+                
+        def fetch(url, ids):
+            params = {"include": ",".join(str(product_id) for product_id in ids), "per_page": len(ids)}
+            response = traffic.request('GET', url, auth=self.auth, params=params, timeout=30)
+            response.raise_for_status()
+            return response.json()
+            
+        products = {}
+        if not lookups:
+            return products
+        with ContextThreadPool(max_workers=min(max_workers, len(lookups))) as executor:
+            futures = {executor.submit(fetch, url, ids): ids for url, ids in lookups}
+            for future in as_completed(futures):
+                ids = futures[future]
+                try:
+                    for product in future.result():
+                        products[product['id']] = product
+                except Exception as e:
+                    self.log(f"[ERROR] Lookup of {len(ids)} products failed: {e}")
+                if progress_callback:
+                    progress_callback(len(ids))
+                    
+        return products
+        
+    def update_product(self, product_id, data):
+        """Update a product on WooCommerce"""
+        url = f"{self.store_url}/wp-json/wc/v3/products/{product_id}"
+        response = traffic.request('PUT', url, auth=self.auth, json=data, timeout=30)
+        response.raise_for_status()
+        return response.json()
+        
+    def update_variation(self, parent_id, variation_id, data):
+        """Update a product variation on WooCommerce"""
+        url = f"{self.store_url}/wp-json/wc/v3/products/{parent_id}/variations/{variation_id}"
+        response = traffic.request('PUT', url, auth=self.auth, json=data, timeout=30)
+        response.raise_for_status()
+        return response.json()
+        
+    def group_updates(self, updates):
+        """
+        Split updates into single writes and per-parent variation groups.
+        Several variations of one parent go out as one variations/batch
+        request (up to INCLUDE_BATCH_SIZE each). Returns (singles, groups)
+        with groups as (parent_id, updates) pairs.
+        """
+        by_parent = defaultdict(list)
+        singles = []
+        for update in updates:
+            if update.get('parent_id'):
+                by_parent[update['parent_id']].append(update)
+            else:
+                singles.append(update)
+        groups = []
+        size = self.INCLUDE_BATCH_SIZE
+        for parent_id, parent_updates in by_parent.items():
+            if len(parent_updates) == 1:
+                singles.extend(parent_updates)
+            else:
+                groups.extend((parent_id, parent_updates[i:i + size]) for i in range(0, len(parent_updates), size))
+        return singles, groups
+        
+    @staticmethod
+    def variation_batch_results(updates, response_items=None, error=None, retryable=False):
+        """(key, entry) results of a variations/batch request, in batch_update_products format"""
+        if error is not None:
+            return [('errors', {'id': update['id'], 'error': f"Product {update['id']} failed: {error}", 'retryable': retryable})
+                    for update in updates]
+        results = []
+        for item in response_items:
+            if 'error' in item:
+                message = item['error'].get('message', 'Unknown error') if isinstance(item['error'], dict) else item['error']
+                results.append(('errors', {'id': item.get('id'), 'error': f"Product {item.get('id')} failed: {message}"}))
+            else:
+                results.append(('update', item))
+        return results
+        
+    def batch_update_products(self, updates):
+        """
+        Batch update multiple products (handles both regular products and variations).
+        Writes run concurrently (the traffic controller decides how many at
+        once); variations sharing a parent go out as one variations/batch request.
+        """
+        self.log(f"[DEBUG] Updating {len(updates)} products...")
+        
+        results = {'update': [], 'errors': []}
+        
+        def update_group(parent_id, group):
+            url = f"{self.store_url}/wp-json/wc/v3/products/{parent_id}/variations/batch"
+            data = {'update': [{k: v for k, v in update.items() if k != 'parent_id'} for update in group]}
+            self.log(f"[DEBUG] Updating {len(group)} variations of parent {parent_id}")
+            try:
+                response = traffic.request('POST', url, auth=self.auth, json=data, timeout=60)
+                response.raise_for_status()
+                return self.variation_batch_results(group, response.json().get('update', []))
+            except requests.exceptions.HTTPError as e:
+                throttled = getattr(e.response, 'status_code', None) in TrafficController.RETRY_STATUSES
+                return self.variation_batch_results(group, error=str(e), retryable=throttled)
+            except Exception as e:
+                return self.variation_batch_results(group, error=str(e), retryable=True)
+                
+        def update_one(update):
+            try:
+                product_id = update.get('id')
+                parent_id = update.get('parent_id')
+                
+                # Remove parent_id from update data as it's not a valid field
+                update_data = {k: v for k, v in update.items() if k not in ['id', 'parent_id']}
+                
+                # Determine the correct endpoint
+                if parent_id:
+                    # This is a variation - use variations endpoint
+                    url = f"{self.store_url}/wp-json/wc/v3/products/{parent_id}/variations/{product_id}"
+                    self.log(f"[DEBUG] Updating variation {product_id} of parent {parent_id}")
+                else:
+                    # This is a regular product
+                    url = f"{self.store_url}/wp-json/wc/v3/products/{product_id}"
+                    self.log(f"[DEBUG] Updating product {product_id}")
+                
+                self.log(f"[DEBUG] Update data: {update_data}")
+                
+                response = traffic.request('PUT', url, auth=self.auth, json=update_data, timeout=30)
+                response.raise_for_status()
+                result = response.json()
+                
+                self.log(f"[SUCCESS] Updated product/variation {product_id}")
+                return [('update', result)]
+                
+            except requests.exceptions.HTTPError as e:
+                error_msg = f"Product {product_id} failed: {e.response.text if hasattr(e, 'response') else str(e)}"
+                self.log(f"[ERROR] {error_msg}")
+                # Still throttled after the controller's retries: worth another attempt later
+                throttled = getattr(e.response, 'status_code', None) in TrafficController.RETRY_STATUSES
+                return [('errors', {'id': product_id, 'error': error_msg, 'retryable': throttled})]
+            except Exception as e:
+                # Connection problems, timeouts... the write may succeed if retried
+                error_msg = f"Product {product_id} failed: {str(e)}"
+                self.log(f"[ERROR] {error_msg}")
+                return [('errors', {'id': product_id, 'error': error_msg, 'retryable': True})]
+                
+        singles, groups = self.group_updates(updates)
+        if updates:
+            with ContextThreadPool(max_workers=min(traffic.max_concurrency, len(singles) + len(groups))) as executor:
+                futures = [executor.submit(update_one, update) for update in singles]
+                futures += [executor.submit(update_group, parent_id, group) for parent_id, group in groups]
+                for future in futures:
+                    for key, entry in future.result():
+                        results[key].append(entry)
+        
+        success_count = len(results['update'])
+        error_count = len(results['errors'])
+        self.log(f"[DEBUG] Update complete: {success_count} succeeded, {error_count} failed")
+        
+        return results
+
+
+class CapitalClient:
+    """SoftOne Capital ERP API client"""
+    
+    # Field profile for price/stock refreshes (no descriptions)
+    PRICE_FIELDS = "CODE;RTLPRICE;WHSPRICE;DISCOUNT;MAXDISCOUNT;BALANCEQTY"
+    
+    # Codes per CODE IN (...) filter for selective lookups
+    CODE_CHUNK_SIZE = 200
+    
+    def __init__(self, config):
+        self.base_url = config["base_url"]
+        self.config = config
+        self.session = requests.Session()
+        self.session.verify = False
+        self.session_id = None
+        
+    def login(self):
+        """Login to Capital ERP and get session ID"""
+        login_data = {
+            "service": "login",
+            "company": self.config["company"],
+            "fiscalyear": self.config["fiscalyear"],
+            "branch": self.config["branch"],
+            "username": self.config["username"],
+            "password": self.config["password"]
+        }
+        
+        response = traffic.request('POST', self.base_url, session=self.session, json=login_data, timeout=30)
+        response.raise_for_status()
+        result = response.json()
+        
+        if result.get("success"):
+            self.session_id = result.get("sessionid")
+            return self.session_id
+        else:
+            raise Exception(f"Capital login failed: {result.get('message', 'Unknown error')}")
+            
+    def get_products(self, fields=None, filters=None):
+        """Get products from Capital ERP"""
+        if not self.session_id:
+            self.login()
+            
+        if fields is None:
+            # Default fields for product matching
+            fields = "CODE;DESCR;RTLPRICE;WHSPRICE;TRMODE;DISCOUNT;MAXDISCOUNT;BALANCEQTY"
+            
+        request_data = {
+            "service": "getdata",
+            "sessionid": self.session_id,
+            "action": "read",
+            "tablename": "STOCKITEMS",
+            "fields": fields
+        }
+        
+        if filters:
+            request_data["filters"] = filters
+            
+        response = traffic.request('POST', self.base_url, session=self.session, json=request_data, timeout=60)
+        response.raise_for_status()
+        result = response.json()
+        
+        if result.get("success"):
+            # Data can be in different formats depending on Capital version
+            data = result.get("data", [])
+            if not data:
+                data = result.get("STOCKITEMS", [])
+            if not data:
+                data = result.get("rows", [])
+            return data
+        else:
+            raise Exception(f"Failed to get Capital products: {result.get('message', 'Unknown error')}")
+            
+    def get_products_by_codes(self, codes, fields=PRICE_FIELDS, max_workers=4, progress_callback=None):
+        """
+        Get specific products by CODE. The codes are split into chunks of
+        CODE_CHUNK_SIZE so each CODE IN (...) filter stays bounded, and the
+        chunks are fetched concurrently over the shared session.
+        progress_callback(count) is called with the size of each finished chunk.
+        """
+        codes = list(dict.fromkeys(code for code in codes if code))
+        if not codes:
+            return []
+        if not self.session_id:
+            self.login()
+            
+        chunks = [codes[i:i + self.CODE_CHUNK_SIZE] for i in range(0, len(codes), self.CODE_CHUNK_SIZE)]
+        
+        def fetch(chunk):
+            # Capital API filter format: "CODE IN ('SKU1','SKU2','SKU3')"
+            code_list = "','".join(code.replace("'", "''") for code in chunk)
+            return self.get_products(fields=fields, filters=f"CODE IN ('{code_list}')")
+            
+        products = []
+        with ContextThreadPool(max_workers=min(max_workers, len(chunks))) as executor:
+            futures = {executor.submit(fetch, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                products.extend(future.result())
+                if progress_callback:
+                    progress_callback(len(futures[future]))
+                    
+        return products
+
+
+# ============================================================================
+# ASYNC I/O ENGINE - asyncio clients sharing one connection pool
+# ============================================================================
+
+class AsyncResponse:
+    """Fully read aiohttp response with the parts of the requests API the clients use"""
+    
+    def __init__(self, status_code, headers, content, url):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+        
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+        
+    def json(self):
+        return json.loads(self.content)
+        
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class AsyncIOEngine:
+    """
+    asyncio event loop running in its own daemon thread, with one shared
+    aiohttp connection pool for all async clients. Hundreds of requests can
+    be in flight without a thread each; the traffic controller still decides
+    how many actually run per host.
+    
+    Coroutines are submitted from any thread with submit(), which returns a
+    concurrent.futures.Future; worker threads (jobs) block on run().
+    """
+    
+    def __init__(self, max_connections=200):
+        if aiohttp is None:
+            raise RuntimeError("The async I/O engine needs aiohttp (pip install aiohttp)")
+        self.max_connections = max_connections
+        self.loop = asyncio.new_event_loop()
+        self._session = None
+        self._thread = threading.Thread(target=self._run_loop, name="bridge-io", daemon=True)
+        self._thread.start()
+        
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        
+    def submit(self, coro):
+        """Schedule a coroutine on the engine loop; returns a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+        
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the engine loop and wait for its result (worker threads only)"""
+        return self.submit(coro).result(timeout)
+        
+    async def request(self, method, url, timeout=30, **kwargs):
+        """HTTP request on the shared pool, through the traffic controller"""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                trace_configs=[traffic.connection_trace_config()]
+            )
+        return await traffic.request_async(
+            self._session, method, url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs
+        )
+        
+    def close(self):
+        """Close the connection pool and stop the loop"""
+        if self._session is not None:
+            self.run(self._session.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class AsyncWooCommerceClient(WooCommerceClient):
+    """
+    asyncio WooCommerce client with the same public methods as
+    WooCommerceClient (as coroutines). Paginated reads fetch the first
+    page, then all remaining pages concurrently.
+    """
+    
+    def __init__(self, config, engine, log=print):
+        super().__init__(config, log)
+        self.engine = engine
+        self.auth = aiohttp.BasicAuth(config["consumer_key"], config["consumer_secret"])
+        
+    async def _get(self, path, params=None, timeout=60):
+        response = await self.engine.request(
+            'GET', f"{self.store_url}/wp-json/wc/v3/{path}", auth=self.auth, params=params, timeout=timeout
+        )
+        response.raise_for_status()
+        return response
+        
+    async def _get_all(self, path, params, progress_callback=None, status="", checkpoint=None):
+        """All pages of a listing, in page order (pages saved in checkpoint are reused)"""
+        params = {**self.LISTING_ORDER, **params}
+        per_page = 100
+        
+        async def fetch_page(page):
+            saved = checkpoint.get(page) if checkpoint else None
+            if saved is not None:
+                return saved['items'], saved['total_pages'], saved['total']
+            response = await self._get(path, {**params, "per_page": per_page, "page": page})
+            items = response.json()
+            total_pages = int(response.headers.get('X-WP-TotalPages', 1))
+            total = int(response.headers.get('X-WP-Total', 0)) or None
+            if checkpoint:
+                checkpoint.put(page, {'items': items, 'total_pages': total_pages, 'total': total})
+            return items, total_pages, total
+            
+        first, total_pages, total = await fetch_page(1)
+        pages = [first]
+        fetched = len(first)
+        done = 1
+        
+        def report():
+            if progress_callback:
+                progress = min(100, int((done / total_pages) * 100))
+                progress_callback(progress, f"{status} Page {done}/{total_pages}", fetched=fetched, total=total)
+                
+        report()
+        if first and total_pages > 1:
+            async def fetch_rest(page):
+                nonlocal fetched, done
+                items = (await fetch_page(page))[0]
+                fetched += len(items)
+                done += 1
+                report()
+                return items
+            pages.extend(await asyncio.gather(*(fetch_rest(page) for page in range(2, total_pages + 1))))
+        return self._unique_by_id([item for page in pages for item in page])
+        
+    async def get_products(self, per_page=100, page=1, **kwargs):
+        """Get products from WooCommerce"""
+        response = await self._get("products", {"per_page": per_page, "page": page, **kwargs})
+        return response.json(), response.headers
+        
+    async def get_all_products(self, progress_callback=None, checkpoint=None, **params):
+        """Get all products with pagination (extra params e.g. modified_after are passed through)"""
+        return await self._get_all("products", params, progress_callback, "Fetching WooCommerce products...", checkpoint)
+        
+    async def get_orders(self, per_page=100, page=1, **kwargs):
+        """Get orders from WooCommerce"""
+        response = await self._get("orders", {"per_page": per_page, "page": page, **kwargs})
+        return response.json(), response.headers
+        
+    async def get_all_orders(self, status=None, after=None, progress_callback=None, checkpoint=None):
+        """Get all orders with pagination"""
+        params = {}
+        if status:
+            params['status'] = status
+        if after:
+            params['after'] = after
+        return await self._get_all("orders", params, progress_callback, "Fetching orders...", checkpoint)
+        
+    async def get_categories(self):
+        """Get all product categories"""
+        return await self._get_all("products/categories", {})
+        
+    async def get_product_variations(self, product_id):
+        """Get all variations for a variable product ([] if it has none, None if the listing failed)"""
+        try:
+            return await self._get_all(f"products/{product_id}/variations", {})
+        except Exception as e:
+            self.log(f"[ERROR] Variations of product {product_id} could not be listed: {e}")
+            return None
+            
+    async def get_products_by_ids(self, items, max_workers=None, progress_callback=None):
+        """
+        Same lookups as WooCommerceClient.get_products_by_ids, all issued at
+        once on the engine loop (max_workers is accepted for compatibility).
+        """
+        simple_ids = []
+        variation_ids = defaultdict(list)
+        for product_id, parent_id in items:
+            if parent_id:
+                variation_ids[parent_id].append(product_id)
+            else:
+                simple_ids.append(product_id)
+                
+        size = self.INCLUDE_BATCH_SIZE
+        lookups = [("products", simple_ids[i:i + size]) for i in range(0, len(simple_ids), size)]
+        for parent_id, ids in variation_ids.items():
+            lookups.extend((f"products/{parent_id}/variations", ids[i:i + size]) for i in range(0, len(ids), size))
+            
+        products = {}
+        
+        async def fetch(path, ids):
+            try:
+                params = {"include": ",".join(str(product_id) for product_id in ids), "per_page": len(ids)}
+                for product in (await self._get(path, params, timeout=30)).json():
+                    products[product['id']] = product
+            except Exception as e:
+                self.log(f"[ERROR] Lookup of {len(ids)} products failed: {e}")
+            if progress_callback:
+                progress_callback(len(ids))
+                
+        await asyncio.gather(*(fetch(path, ids) for path, ids in lookups))
+        return products
+        
+    async def update_product(self, product_id, data):
+        """Update a product on WooCommerce"""
+        url = f"{self.store_url}/wp-json/wc/v3/products/{product_id}"
+        response = await self.engine.request('PUT', url, auth=self.auth, json=data)
+        response.raise_for_status()
+        return response.json()
+        
+    async def update_variation(self, parent_id, variation_id, data):
+        """Update a product variation on WooCommerce"""
+        url = f"{self.store_url}/wp-json/wc/v3/products/{parent_id}/variations/{variation_id}"
+        response = await self.engine.request('PUT', url, auth=self.auth, json=data)
+        response.raise_for_status()
+        return response.json()
+        
+    async def batch_update_products(self, updates):
+        """Batch update multiple products (same result format and grouping as WooCommerceClient)"""
+        results = {'update': [], 'errors': []}
+        
+        async def update_group(parent_id, group):
+            url = f"{self.store_url}/wp-json/wc/v3/products/{parent_id}/variations/batch"
+            data = {'update': [{k: v for k, v in update.items() if k != 'parent_id'} for update in group]}
+            try:
+                response = await self.engine.request('POST', url, auth=self.auth, json=data, timeout=60)
+                response.raise_for_status()
+                entries = self.variation_batch_results(group, response.json().get('update', []))
+            except requests.exceptions.HTTPError as e:
+                throttled = getattr(e.response, 'status_code', None) in TrafficController.RETRY_STATUSES
+                entries = self.variation_batch_results(group, error=str(e), retryable=throttled)
+            except Exception as e:
+                entries = self.variation_batch_results(group, error=str(e), retryable=True)
+            for key, entry in entries:
+                results[key].append(entry)
+        
+        async def update_one(update):
+            product_id = update.get('id')
+            parent_id = update.get('parent_id')
+            update_data = {k: v for k, v in update.items() if k not in ['id', 'parent_id']}
+            try:
+                if parent_id:
+                    results['update'].append(await self.update_variation(parent_id, product_id, update_data))
+                else:
+                    results['update'].append(await self.update_product(product_id, update_data))
+            except requests.exceptions.HTTPError as e:
+                throttled = getattr(e.response, 'status_code', None) in TrafficController.RETRY_STATUSES
+                error_msg = f"Product {product_id} failed: {e.response.text if e.response is not None else str(e)}"
+                results['errors'].append({'id': product_id, 'error': error_msg, 'retryable': throttled})
+            except Exception as e:
+                results['errors'].append({'id': product_id, 'error': f"Product {product_id} failed: {str(e)}", 'retryable': True})
+                
+        singles, groups = self.group_updates(updates)
+        await asyncio.gather(
+            *(update_one(update) for update in singles),
+            *(update_group(parent_id, group) for parent_id, group in groups)
+        )
+        return results
+
+
+class AsyncCapitalClient(CapitalClient):
+    """asyncio Capital ERP client with the same public methods as CapitalClient (as coroutines)"""
+    
+    def __init__(self, config, engine):
+        super().__init__(config)
+        self.engine = engine
+        self._login_lock = None
+        
+    async def _post(self, data, timeout):
+        # Capital runs on a self-signed certificate
+        response = await self.engine.request('POST', self.base_url, json=data, ssl=False, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+        
+    async def login(self):
+        """Login to Capital ERP and get session ID"""
+        login_data = {
+            "service": "login",
+            "company": self.config["company"],
+            "fiscalyear": self.config["fiscalyear"],
+            "branch": self.config["branch"],
+            "username": self.config["username"],
+            "password": self.config["password"]
+        }
+        result = await self._post(login_data, timeout=30)
+        if result.get("success"):
+            self.session_id = result.get("sessionid")
+            return self.session_id
+        raise Exception(f"Capital login failed: {result.get('message', 'Unknown error')}")
+        
+    async def _ensure_login(self):
+        # Concurrent chunks share one login
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        async with self._login_lock:
+            if not self.session_id:
+                await self.login()
+                
+    async def get_products(self, fields=None, filters=None):
+        """Get products from Capital ERP"""
+        await self._ensure_login()
+        request_data = {
+            "service": "getdata",
+            "sessionid": self.session_id,
+            "action": "read",
+            "tablename": "STOCKITEMS",
+            "fields": fields or "CODE;DESCR;RTLPRICE;WHSPRICE;TRMODE;DISCOUNT;MAXDISCOUNT;BALANCEQTY"
+        }
+        if filters:
+            request_data["filters"] = filters
+            
+        result = await self._post(request_data, timeout=60)
+        if result.get("success"):
+            return result.get("data") or result.get("STOCKITEMS") or result.get("rows") or []
+        raise Exception(f"Failed to get Capital products: {result.get('message', 'Unknown error')}")
+        
+    async def get_products_by_codes(self, codes, fields=CapitalClient.PRICE_FIELDS, max_workers=None, progress_callback=None):
+        """Same chunked lookups as CapitalClient.get_products_by_codes, all issued at once"""
+        codes = list(dict.fromkeys(code for code in codes if code))
+        chunks = [codes[i:i + self.CODE_CHUNK_SIZE] for i in range(0, len(codes), self.CODE_CHUNK_SIZE)]
+        
+        async def fetch(chunk):
+            code_list = "','".join(code.replace("'", "''") for code in chunk)
+            rows = await self.get_products(fields=fields, filters=f"CODE IN ('{code_list}')")
+            if progress_callback:
+                progress_callback(len(chunk))
+            return rows
+            
+        results = await asyncio.gather(*(fetch(chunk) for chunk in chunks))
+        return [row for rows in results for row in rows]
+
+
+# ============================================================================
+# PRODUCT MATCHER
+# ============================================================================
+
+class ProductMatcher:
+    """Matches products between WooCommerce and Capital ERP"""
+    
+    @staticmethod
+    @hot_path('match_products')
+    def match_products(woo_products, capital_products):
+        """
+        Match products between WooCommerce and Capital by SKU/CODE
+        Returns: matched, unmatched_woo, unmatched_capital
+        """
+        matched = []
+        unmatched_woo = []
+        matched_codes = set()  # Capital codes taken by a match
+        
+        # Create lookup dictionary for Capital products
+        # Store both original and normalized (without leading zeros) versions
+        capital_lookup = {}
+        capital_lookup_normalized = {}
+        for cap_product in capital_products:
+            code = str(cap_product.get('CODE', '')).strip().upper()
+            if code:
+                capital_lookup[code] = cap_product
+                # Also store normalized version (remove leading zeros)
+                code_normalized = code.lstrip('0') or '0'  # Keep at least one zero if all zeros
+                capital_lookup_normalized[code_normalized] = cap_product
+                
+        for woo_product in woo_products:
+            # Skip parent products (variable products without SKU or with type='variable')
+            # Only match variations and regular products
+            product_type = woo_product.get('type', '')
+            is_variation = woo_product.get('is_variation', False)
+            
+            # Skip if it's a parent variable product (not a variation)
+            if product_type == 'variable' and not is_variation:
+                continue
+            
+            sku = str(woo_product.get('sku', '')).strip().upper()
+            
+            # Skip products without SKU
+            if not sku:
+                unmatched_woo.append(woo_product)
+                continue
+            
+            # Try exact match first
+            cap_product = None
+            if sku in capital_lookup:
+                cap_product = capital_lookup[sku]
+            # If no exact match, try normalized match (ignore leading zeros)
+            else:
+                sku_normalized = sku.lstrip('0') or '0'
+                if sku_normalized in capital_lookup_normalized:
+                    cap_product = capital_lookup_normalized[sku_normalized]
+            
+            if cap_product:
+                matched.append(ProductMatcher.build_matched_product(woo_product, cap_product, sku))
+                matched_codes.add(str(cap_product.get('CODE', '')).strip().upper())
+            else:
+                unmatched_woo.append(woo_product)
+                
+        # Remove matched products from unmatched capital
+        unmatched_capital = [p for p in capital_products
+                             if str(p.get('CODE', '')).strip().upper() not in matched_codes]
+                
+        return matched, unmatched_woo, unmatched_capital
+        
+    @staticmethod
+    def build_matched_product(woo_product, cap_product, sku, **extra):
+        """Build the MatchedProduct record for a WooCommerce/Capital pair"""
+        # Calculate discount percentage
+        regular_price = float(woo_product.get('regular_price') or 0)
+        sale_price = float(woo_product.get('sale_price') or 0)
+        discount_percent = 0
+        if regular_price > 0 and sale_price > 0:
+            discount_percent = round((1 - sale_price / regular_price) * 100, 2)
+            
+        # Share the (compressed) descriptions with the WooProduct record
+        stored = woo_product.stored if isinstance(woo_product, CompactRecord) else woo_product.get
+            
+        return MatchedProduct(
+            sku=sku,
+            woo_id=woo_product['id'],
+            parent_id=woo_product.get('parent_id'),  # For variations
+            woo_name=woo_product.get('name', ''),
+            woo_regular_price=regular_price,
+            woo_sale_price=sale_price,
+            woo_discount_percent=discount_percent,
+            woo_stock_quantity=woo_product.get('stock_quantity'),
+            woo_stock_status=woo_product.get('stock_status'),
+            woo_total_sales=woo_product.get('total_sales', 0),
+            woo_description=stored('description', ''),
+            woo_short_description=stored('short_description', ''),
+            woo_categories=tuple(sys.intern(cat.get('name', '')) for cat in woo_product.get('categories', [])),
+            woo_permalink=woo_product.get('permalink', ''),
+            woo_date_created=woo_product.get('date_created', ''),
+            woo_date_modified=woo_product.get('date_modified', ''),
+            
+            capital_code=cap_product.get('CODE', ''),
+            capital_descr=cap_product.get('DESCR', ''),
+            capital_rtlprice=float(cap_product.get('RTLPRICE') or 0),
+            capital_whsprice=float(cap_product.get('WHSPRICE') or 0),
+            capital_trmode=cap_product.get('TRMODE', 0),
+            capital_discount=float(cap_product.get('DISCOUNT') or 0),
+            capital_maxdiscount=float(cap_product.get('MAXDISCOUNT') or 0),
+            capital_stock=float(cap_product.get('BALANCEQTY') or 0),
+            
+            price_match=abs(regular_price - float(cap_product.get('RTLPRICE') or 0)) < 0.01,
+            **extra
+        )
+
+
+# ============================================================================
+# DATABASE FOR CACHING AND ANALYTICS
+# ============================================================================
+
+class LocalDatabase:
+    """SQLite database for caching and analytics"""
+    
+    # Order statuses whose line items count as sales
+    SALES_ORDER_STATUSES = ('completed', 'processing', 'on-hold')
+    
+    def __init__(self, db_path="bridge_data.db"):
+        self.db_path = db_path
+        self.init_database()
+        
+    def init_database(self):
+        """Initialize database tables"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        # Product sales history
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS product_sales (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sku TEXT NOT NULL,
+                product_name TEXT,
+                order_id INTEGER,
+                order_date TEXT,
+                quantity INTEGER,
+                price REAL,
+                total REAL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Price history
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sku TEXT NOT NULL,
+                regular_price REAL,
+                sale_price REAL,
+                recorded_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Update logs
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS update_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sku TEXT,
+                field_updated TEXT,
+                old_value TEXT,
+                new_value TEXT,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Order lines already folded into the sales aggregates
+        # (one row per WooCommerce line item, so re-ingesting is incremental)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sales_order_lines (
+                line_id INTEGER PRIMARY KEY,
+                order_id INTEGER,
+                sku TEXT NOT NULL,
+                day TEXT NOT NULL,
+                quantity INTEGER,
+                revenue REAL
+            )
+        ''')
+        
+        # Per-SKU daily sales aggregates
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sku_daily_sales (
+                sku TEXT NOT NULL,
+                day TEXT NOT NULL,
+                units INTEGER DEFAULT 0,
+                revenue REAL DEFAULT 0,
+                PRIMARY KEY (sku, day)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_sku_daily_sales_day
+            ON sku_daily_sales (day, sku)
+        ''')
+        
+        # Per-SKU running totals (top sellers read this through the units index)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sku_sales_totals (
+                sku TEXT PRIMARY KEY,
+                units INTEGER DEFAULT 0,
+                revenue REAL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_sku_sales_totals_units
+            ON sku_sales_totals (units DESC)
+        ''')
+        
+        # Price update outbox: one job per bulk update, one item per product
+        # (items are claimed before sending and acknowledged after, so an
+        # interrupted job resumes with only the unfinished items)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_update_jobs (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                status TEXT NOT NULL DEFAULT 'running',
+                total INTEGER,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                finished_at TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_update_items (
+                job_id INTEGER NOT NULL,
+                woo_id INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                error TEXT,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (job_id, woo_id)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_price_update_items_status
+            ON price_update_items (job_id, status)
+        ''')
+        # Lease of the process sending a job: its pid and the last heartbeat
+        # (added after price_update_jobs; older databases get the columns here)
+        for column in ('owner_pid INTEGER', 'claimed_at TEXT'):
+            try:
+                cursor.execute(f'ALTER TABLE price_update_jobs ADD COLUMN {column}')
+            except sqlite3.OperationalError:
+                pass  # Column already exists
+                
+        # Variations per variable product, valid while the parent's
+        # date_modified is unchanged
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS variation_cache (
+                parent_id INTEGER PRIMARY KEY,
+                parent_modified TEXT,
+                variations TEXT NOT NULL,
+                cached_at TEXT NOT NULL
+            )
+        ''')
+        
+        # Parent -> variation index (sku is stored upper-cased for lookups)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS variation_index (
+                variation_id INTEGER PRIMARY KEY,
+                parent_id INTEGER NOT NULL,
+                sku TEXT,
+                attributes TEXT,
+                updated_at TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_variation_index_parent
+            ON variation_index (parent_id)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_variation_index_sku
+            ON variation_index (sku)
+        ''')
+        
+        # Resumable full fetches: finished pages/parts per phase (zlib-compressed JSON)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS fetch_sessions (
+                session_id TEXT PRIMARY KEY,
+                params TEXT,
+                status TEXT NOT NULL DEFAULT 'running',
+                started_at TEXT NOT NULL,
+                finished_at TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS fetch_checkpoints (
+                session_id TEXT NOT NULL,
+                phase TEXT NOT NULL,
+                part TEXT NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (session_id, phase, part)
+            )
+        ''')
+        
+        # Per-run performance spans (PerfRecorder), one row per run
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS perf_runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                status TEXT,
+                started_at TEXT NOT NULL,
+                seconds REAL,
+                requests INTEGER,
+                bytes INTEGER,
+                retries INTEGER,
+                errors INTEGER,
+                spans TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_perf_runs_kind
+            ON perf_runs (kind, started_at)
+        ''')
+        # Peak process memory of a run (added after perf_runs; older databases get the column here)
+        try:
+            cursor.execute('ALTER TABLE perf_runs ADD COLUMN peak_rss INTEGER')
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+            
+        conn.commit()
+        conn.close()
+        
+    def record_price_history(self, sku, regular_price, sale_price):
+        """Record price change"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO price_history (sku, regular_price, sale_price)
+            VALUES (?, ?, ?)
+        ''', (sku, regular_price, sale_price))
+        conn.commit()
+        conn.close()
+        
+    def record_update(self, sku, field, old_value, new_value):
+        """Record an update"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO update_logs (sku, field_updated, old_value, new_value)
+            VALUES (?, ?, ?, ?)
+        ''', (sku, field, str(old_value), str(new_value)))
+        conn.commit()
+        conn.close()
+        
+    def get_price_history(self, sku, days=90):
+        """Get price history for a product"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        cursor.execute('''
+            SELECT regular_price, sale_price, recorded_at
+            FROM price_history
+            WHERE sku = ? AND recorded_at >= ?
+            ORDER BY recorded_at
+        ''', (sku, cutoff))
+        
+        results = cursor.fetchall()
+        conn.close()
+        return results
+        
+    def ingest_order_lines(self, orders):
+        """
+        Fold WooCommerce order lines into the per-SKU sales aggregates.
+        Lines already ingested only contribute the difference, so orders
+        can be re-ingested on every fetch (e.g. after a status change).
+        Returns the number of lines that changed the aggregates.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        changed = 0
+        
+        for order in orders:
+            counted = order.get('status') in self.SALES_ORDER_STATUSES
+            day = str(order.get('date_created') or '')[:10]
+            if not day:
+                continue
+                
+            for line in order.get('line_items', []):
+                line_id = line.get('id')
+                sku = str(line.get('sku') or '').strip().upper()
+                if line_id is None or not sku:
+                    continue
+                    
+                quantity = int(line.get('quantity') or 0) if counted else 0
+                revenue = float(line.get('total') or 0) if counted else 0.0
+                
+                cursor.execute(
+                    'SELECT sku, day, quantity, revenue FROM sales_order_lines WHERE line_id = ?',
+                    (line_id,)
+                )
+                previous = cursor.fetchone()
+                if previous == (sku, day, quantity, revenue):
+                    continue
+                    
+                if previous:
+                    # Take the old contribution out before adding the new one
+                    self._add_sales(cursor, previous[0], previous[1], -previous[2], -previous[3])
+                    cursor.execute('''
+                        UPDATE sales_order_lines
+                        SET sku = ?, day = ?, quantity = ?, revenue = ?
+                        WHERE line_id = ?
+                    ''', (sku, day, quantity, revenue, line_id))
+                else:
+                    cursor.execute('''
+                        INSERT INTO sales_order_lines (line_id, order_id, sku, day, quantity, revenue)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', (line_id, order.get('id'), sku, day, quantity, revenue))
+                    
+                self._add_sales(cursor, sku, day, quantity, revenue)
+                changed += 1
+                
+        conn.commit()
+        conn.close()
+        return changed
+        
+    def _add_sales(self, cursor, sku, day, units, revenue):
+        """Apply a units/revenue delta to the daily and total aggregates"""
+        if not units and not revenue:
+            return
+        cursor.execute('''
+            INSERT INTO sku_daily_sales (sku, day, units, revenue)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (sku, day) DO UPDATE SET
+                units = units + excluded.units,
+                revenue = revenue + excluded.revenue
+        ''', (sku, day, units, revenue))
+        cursor.execute('''
+            INSERT INTO sku_sales_totals (sku, units, revenue)
+            VALUES (?, ?, ?)
+            ON CONFLICT (sku) DO UPDATE SET
+                units = units + excluded.units,
+                revenue = revenue + excluded.revenue
+        ''', (sku, units, revenue))
+        
+    def get_sales_summary(self, sku, windows=(7, 30, 90)):
+        """
+        Get units, revenue and velocity (units/day) for a SKU over the
+        given day windows, e.g. {30: {'units': 12, 'revenue': 240.0, 'velocity': 0.4}}
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        summary = {}
+        today = datetime.now().date()
+        for days in windows:
+            cutoff = (today - timedelta(days=days - 1)).isoformat()
+            cursor.execute('''
+                SELECT COALESCE(SUM(units), 0), COALESCE(SUM(revenue), 0)
+                FROM sku_daily_sales
+                WHERE sku = ? AND day >= ?
+            ''', (sku.strip().upper(), cutoff))
+            units, revenue = cursor.fetchone()
+            summary[days] = {
+                'units': units,
+                'revenue': revenue,
+                'velocity': units / days
+            }
+            
+        conn.close()
+        return summary
+        
+    def get_top_sellers(self, limit=20, days=None):
+        """
+        Get the best selling SKUs as (sku, units, revenue) rows.
+        Without a window this reads the running totals through their units
+        index; with one it sums the daily aggregates from the cutoff day.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        if days is None:
+            cursor.execute('''
+                SELECT sku, units, revenue
+                FROM sku_sales_totals
+                WHERE units > 0
+                ORDER BY units DESC
+                LIMIT ?
+            ''', (limit,))
+        else:
+            cutoff = (datetime.now().date() - timedelta(days=days - 1)).isoformat()
+            cursor.execute('''
+                SELECT sku, SUM(units) AS total_units, SUM(revenue)
+                FROM sku_daily_sales
+                WHERE day >= ?
+                GROUP BY sku
+                HAVING total_units > 0
+                ORDER BY total_units DESC
+                LIMIT ?
+            ''', (cutoff, limit))
+            
+        results = cursor.fetchall()
+        conn.close()
+        return results
+        
+    # Variation fields kept in the cache (what build_variation_products reads)
+    VARIATION_CACHE_FIELDS = (
+        'id', 'sku', 'regular_price', 'sale_price', 'stock_quantity', 'stock_status',
+        'description', 'permalink', 'date_created', 'date_modified', 'attributes'
+    )
+    
+    def get_cached_variations(self, parents, max_age_hours=24):
+        """
+        Cached variations for parents ({parent_id: date_modified}) whose
+        date_modified matches the cached one and whose entry is younger than
+        max_age_hours (a safety net for variation edits that don't touch the
+        parent). Returns {parent_id: variations}.
+        """
+        cutoff = (datetime.now() - timedelta(hours=max_age_hours)).isoformat()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT parent_id, parent_modified, variations
+            FROM variation_cache
+            WHERE cached_at >= ?
+        ''', (cutoff,))
+        cached = {}
+        for parent_id, parent_modified, variations in cursor.fetchall():
+            if parent_id in parents and parents[parent_id] and parents[parent_id] == parent_modified:
+                cached[parent_id] = json.loads(variations)
+        conn.close()
+        return cached
+        
+    def save_cached_variations(self, entries):
+        """Cache fetched variations: entries are (parent_id, parent date_modified, variations)"""
+        if not entries:
+            return
+        now = datetime.now().isoformat()
+        fields = self.VARIATION_CACHE_FIELDS
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT INTO variation_cache (parent_id, parent_modified, variations, cached_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(parent_id) DO UPDATE SET
+                parent_modified = excluded.parent_modified,
+                variations = excluded.variations,
+                cached_at = excluded.cached_at
+        ''', [
+            (parent_id, parent_modified,
+             json.dumps([{key: variation.get(key) for key in fields if key in variation} for variation in variations]),
+             now)
+            for parent_id, parent_modified, variations in entries
+        ])
+        conn.commit()
+        conn.close()
+        
+    def index_variations(self, variations_by_parent, replace=True):
+        """
+        Record variations in the parent -> variation index.
+        variations_by_parent: {parent_id: [variation data]}. With replace the
+        listed parents' entries are replaced (a complete listing, e.g. from a
+        fetch); otherwise the variations are only added/updated.
+        """
+        now = datetime.now().isoformat()
+        rows = []
+        for parent_id, variations in variations_by_parent.items():
+            for variation in variations:
+                attributes = [
+                    {'name': attr.get('name'), 'option': attr.get('option')}
+                    for attr in variation.get('attributes') or []
+                ]
+                rows.append((variation['id'], parent_id, (variation.get('sku') or '').strip().upper(),
+                             json.dumps(attributes), now))
+        if not variations_by_parent:
+            return
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        # A parent listed with no variations left still loses its old entries
+        if replace:
+            cursor.executemany('DELETE FROM variation_index WHERE parent_id = ?',
+                               [(parent_id,) for parent_id in variations_by_parent])
+        if rows:
+            cursor.executemany('''
+                INSERT OR REPLACE INTO variation_index (variation_id, parent_id, sku, attributes, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+        conn.commit()
+        conn.close()
+        
+    def get_variation_parents(self, variation_ids):
+        """Parent ids of known variations as {variation_id: parent_id}"""
+        variation_ids = list(set(variation_ids))
+        parents = {}
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        for i in range(0, len(variation_ids), 500):
+            chunk = variation_ids[i:i + 500]
+            cursor.execute(
+                f"SELECT variation_id, parent_id FROM variation_index WHERE variation_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            parents.update(cursor.fetchall())
+        conn.close()
+        return parents
+        
+    def find_variation_by_sku(self, sku):
+        """Look up a variation by SKU; returns {variation_id, parent_id, sku, attributes} or None"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT variation_id, parent_id, sku, attributes
+            FROM variation_index
+            WHERE sku = ?
+        ''', (sku.strip().upper(),))
+        row = cursor.fetchone()
+        conn.close()
+        if row is None:
+            return None
+        return {'variation_id': row[0], 'parent_id': row[1], 'sku': row[2], 'attributes': json.loads(row[3] or '[]')}
+        
+    def get_parent_variations(self, parent_id):
+        """Indexed variations of a parent as (variation_id, sku, attributes) rows"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT variation_id, sku, attributes
+            FROM variation_index
+            WHERE parent_id = ?
+            ORDER BY variation_id
+        ''', (parent_id,))
+        rows = [(variation_id, sku, json.loads(attributes or '[]')) for variation_id, sku, attributes in cursor.fetchall()]
+        conn.close()
+        return rows
+        
+    def invalidate_cached_variations(self, parent_ids):
+        """Drop cached variations of parents whose variations were just written"""
+        parent_ids = [(parent_id,) for parent_id in set(parent_ids) if parent_id]
+        if not parent_ids:
+            return
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany('DELETE FROM variation_cache WHERE parent_id = ?', parent_ids)
+        conn.commit()
+        conn.close()
+        
+    def start_fetch_session(self, params, max_age_hours=12):
+        """
+        Resume the latest unfinished fetch session started with the same
+        params within max_age_hours, or start a new one (dropping the
+        checkpoints of abandoned sessions). Returns (session_id, resumed).
+        """
+        params_json = json.dumps(params, sort_keys=True)
+        cutoff = (datetime.now() - timedelta(hours=max_age_hours)).isoformat()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT session_id FROM fetch_sessions
+            WHERE status = 'running' AND params = ? AND started_at >= ?
+            ORDER BY started_at DESC
+            LIMIT 1
+        ''', (params_json, cutoff))
+        row = cursor.fetchone()
+        if row:
+            conn.close()
+            return row[0], True
+            
+        cursor.execute('''
+            DELETE FROM fetch_checkpoints
+            WHERE session_id IN (SELECT session_id FROM fetch_sessions WHERE status = 'running')
+        ''')
+        cursor.execute("UPDATE fetch_sessions SET status = 'abandoned' WHERE status = 'running'")
+        now = datetime.now()
+        session_id = now.strftime('%Y%m%d-%H%M%S-%f')
+        cursor.execute('''
+            INSERT INTO fetch_sessions (session_id, params, started_at)
+            VALUES (?, ?, ?)
+        ''', (session_id, params_json, now.isoformat()))
+        conn.commit()
+        conn.close()
+        return session_id, False
+        
+    def load_fetch_parts(self, session_id, phase):
+        """Saved parts of one phase of a fetch session as {part: data}"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT part, data FROM fetch_checkpoints
+            WHERE session_id = ? AND phase = ?
+        ''', (session_id, phase))
+        parts = {part: json.loads(zlib.decompress(data)) for part, data in cursor.fetchall()}
+        conn.close()
+        return parts
+        
+    def save_fetch_parts(self, session_id, phase, parts):
+        """Save finished parts ({part: data}) of a fetch session phase"""
+        if not parts:
+            return
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany('''
+            INSERT OR REPLACE INTO fetch_checkpoints (session_id, phase, part, data)
+            VALUES (?, ?, ?, ?)
+        ''', [
+            (session_id, phase, part, zlib.compress(json.dumps(data).encode('utf-8'), 1))
+            for part, data in parts.items()
+        ])
+        conn.commit()
+        conn.close()
+        
+    def finish_fetch_session(self, session_id):
+        """Mark a fetch session complete and drop its checkpoints"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM fetch_checkpoints WHERE session_id = ?', (session_id,))
+        cursor.execute('''
+            UPDATE fetch_sessions SET status = 'complete', finished_at = ?
+            WHERE session_id = ?
+        ''', (datetime.now().isoformat(), session_id))
+        conn.commit()
+        conn.close()
+        
+    def create_price_job(self, updates):
+        """
+        Store a bulk price update as a job with one pending item per product
+        and return its id, leased to this process. A repeated product id
+        keeps the last update.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO price_update_jobs (total, owner_pid, claimed_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+        ''', (len(updates), os.getpid()))
+        job_id = cursor.lastrowid
+        cursor.executemany('''
+            INSERT OR REPLACE INTO price_update_items (job_id, woo_id, payload)
+            VALUES (?, ?, ?)
+        ''', [(job_id, update['id'], json.dumps(update)) for update in updates])
+        conn.commit()
+        conn.close()
+        return job_id
+        
+    def lease_price_job(self, job_id, lease_seconds=300):
+        """
+        Take the lease of an unfinished (running or paused) job for this
+        process; False while another process holds a lease younger than
+        lease_seconds. A paused job becomes running again.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE price_update_jobs
+            SET status = 'running', owner_pid = ?, claimed_at = CURRENT_TIMESTAMP
+            WHERE job_id = ? AND status IN ('running', 'paused')
+            AND (owner_pid IS NULL OR owner_pid = ? OR claimed_at IS NULL
+                 OR claimed_at < datetime('now', ?))
+        ''', (os.getpid(), job_id, os.getpid(), f'-{int(lease_seconds)} seconds'))
+        leased = cursor.rowcount == 1
+        conn.commit()
+        conn.close()
+        return leased
+        
+    def release_price_job(self, job_id, paused=False):
+        """
+        Give up this process's lease of a job. paused marks a job the user
+        stopped, so it is only resumed when they ask (never unattended).
+        """
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            UPDATE price_update_jobs
+            SET owner_pid = NULL,
+                status = CASE WHEN ? AND status = 'running' THEN 'paused' ELSE status END
+            WHERE job_id = ? AND owner_pid = ?
+        ''', (paused, job_id, os.getpid()))
+        conn.commit()
+        conn.close()
+        
+    def claim_price_items(self, job_id, limit):
+        """
+        Mark up to limit pending items of a job as claimed and return their
+        updates, renewing this process's lease of the job. Only items this
+        call moved from pending are returned, so two processes never claim
+        the same item.
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('''
+                UPDATE price_update_jobs SET claimed_at = CURRENT_TIMESTAMP
+                WHERE job_id = ? AND owner_pid = ?
+            ''', (job_id, os.getpid()))
+            cursor.execute('''
+                SELECT woo_id, payload FROM price_update_items
+                WHERE job_id = ? AND status = 'pending'
+                ORDER BY rowid
+                LIMIT ?
+            ''', (job_id, limit))
+            claimed = []
+            for woo_id, payload in cursor.fetchall():
+                cursor.execute('''
+                    UPDATE price_update_items
+                    SET status = 'claimed', attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+                    WHERE job_id = ? AND woo_id = ? AND status = 'pending'
+                ''', (job_id, woo_id))
+                if cursor.rowcount == 1:
+                    claimed.append(json.loads(payload))
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return claimed
+        
+    def ack_price_items(self, job_id, done_ids=(), failed=None, retry_ids=()):
+        """
+        Record the outcome of claimed items: done, failed ({woo_id: error})
+        or back to pending for another attempt. Only claimed items change,
+        so acknowledging twice is harmless.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.executemany('''
+            UPDATE price_update_items
+            SET status = 'done', error = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE job_id = ? AND woo_id = ? AND status = 'claimed'
+        ''', [(job_id, woo_id) for woo_id in done_ids])
+        cursor.executemany('''
+            UPDATE price_update_items
+            SET status = 'failed', error = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE job_id = ? AND woo_id = ? AND status = 'claimed'
+        ''', [(str(error), job_id, woo_id) for woo_id, error in (failed or {}).items()])
+        cursor.executemany('''
+            UPDATE price_update_items
+            SET status = 'pending', updated_at = CURRENT_TIMESTAMP
+            WHERE job_id = ? AND woo_id = ? AND status = 'claimed'
+        ''', [(job_id, woo_id) for woo_id in retry_ids])
+        conn.commit()
+        conn.close()
+        
+    def finish_price_job(self, job_id):
+        """Close a job once it has no pending or claimed items; returns item counts by status"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT status, COUNT(*) FROM price_update_items
+            WHERE job_id = ?
+            GROUP BY status
+        ''', (job_id,))
+        counts = dict(cursor.fetchall())
+        if not counts.get('pending') and not counts.get('claimed'):
+            cursor.execute('''
+                UPDATE price_update_jobs
+                SET status = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE job_id = ?
+            ''', ('failed' if counts.get('failed') else 'done', job_id))
+        conn.commit()
+        conn.close()
+        return counts
+        
+    def get_pending_price_items(self, job_id):
+        """Updates of a job's pending items, without claiming them"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT payload FROM price_update_items
+            WHERE job_id = ? AND status = 'pending'
+            ORDER BY rowid
+        ''', (job_id,))
+        updates = [json.loads(payload) for payload, in cursor.fetchall()]
+        conn.close()
+        return updates
+        
+    def skip_price_items(self, job_id, woo_ids):
+        """Close pending items that no longer need sending (WooCommerce already has their prices)"""
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany('''
+            UPDATE price_update_items
+            SET status = 'skipped', updated_at = CURRENT_TIMESTAMP
+            WHERE job_id = ? AND woo_id = ? AND status = 'pending'
+        ''', [(job_id, woo_id) for woo_id in woo_ids])
+        conn.commit()
+        conn.close()
+        
+    def close_price_job(self, job_id, status, reason):
+        """
+        Give up on an unfinished (running or paused) job (status 'expired'
+        or 'cancelled'): its pending and claimed items are closed unsent,
+        with reason as their error. Returns the number of items closed.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE price_update_items
+            SET status = ?, error = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE job_id = ? AND status IN ('pending', 'claimed')
+        ''', (status, reason, job_id))
+        closed = cursor.rowcount
+        cursor.execute('''
+            UPDATE price_update_jobs
+            SET status = ?, finished_at = CURRENT_TIMESTAMP
+            WHERE job_id = ? AND status IN ('running', 'paused')
+        ''', (status, job_id))
+        conn.commit()
+        conn.close()
+        return closed
+        
+    def get_unfinished_price_jobs(self, lease_seconds=300, include_paused=False):
+        """
+        Jobs interrupted before finishing, as (job_id, remaining items, age
+        in hours) rows. Jobs whose lease is younger than lease_seconds are
+        still being sent by a live process and are left out; so are jobs
+        the user paused, unless include_paused.
+        Items claimed by the interrupted run go back to pending: they may or
+        may not have been written, and re-sending the same price is harmless.
+        """
+        statuses = ('running', 'paused') if include_paused else ('running',)
+        interrupted = f'''
+            SELECT job_id FROM price_update_jobs
+            WHERE status IN ({', '.join('?' * len(statuses))})
+            AND (owner_pid IS NULL OR claimed_at IS NULL OR claimed_at < datetime('now', ?))
+        '''
+        params = (*statuses, f'-{int(lease_seconds)} seconds')
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            UPDATE price_update_items SET status = 'pending'
+            WHERE status = 'claimed' AND job_id IN ({interrupted})
+        ''', params)
+        cursor.execute(f'''
+            SELECT j.job_id, COUNT(i.woo_id), (julianday('now') - julianday(j.created_at)) * 24
+            FROM price_update_jobs j
+            LEFT JOIN price_update_items i ON i.job_id = j.job_id AND i.status = 'pending'
+            WHERE j.job_id IN ({interrupted})
+            GROUP BY j.job_id
+            ORDER BY j.job_id
+        ''', params)
+        jobs = cursor.fetchall()
+        conn.commit()
+        conn.close()
+        return jobs
+        
+    def save_perf_run(self, run, keep_days=180):
+        """Store a finished run (PerfRun.to_dict()) and drop runs older than keep_days"""
+        cutoff = (datetime.now() - timedelta(days=keep_days)).isoformat()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO perf_runs (kind, status, started_at, seconds, requests, bytes, retries, errors, peak_rss, spans)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (run['kind'], run['status'], run['started_at'], run['seconds'], run['requests'],
+              run['bytes'], run['retries'], run['errors'], run.get('peak_rss'), json.dumps(run['spans'])))
+        cursor.execute('DELETE FROM perf_runs WHERE started_at < ?', (cutoff,))
+        conn.commit()
+        conn.close()
+        
+    def get_perf_runs(self, kind=None, limit=100):
+        """Most recent runs first (optionally of one kind), with their spans"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT run_id, kind, status, started_at, seconds, requests, bytes, retries, errors, peak_rss, spans
+            FROM perf_runs
+            WHERE ? IS NULL OR kind = ?
+            ORDER BY started_at DESC, run_id DESC
+            LIMIT ?
+        ''', (kind, kind, limit))
+        columns = [column[0] for column in cursor.description]
+        runs = []
+        for row in cursor.fetchall():
+            run = dict(zip(columns, row))
+            run['spans'] = json.loads(run['spans'] or '[]')
+            runs.append(run)
+        conn.close()
+        return runs
+
+
+# ============================================================================
+# RESUMABLE FETCH - Per-page checkpoints of a full fetch
+# ============================================================================
+
+class FetchSession:
+    """
+    Checkpoints of one full fetch, keyed by its session id. Pages and parts
+    (WooCommerce/order pages, variation parents, categories, Capital rows)
+    are saved per phase as they complete, so an interrupted fetch resumes
+    with only the missing parts. Saves are buffered and written every
+    FLUSH_INTERVAL seconds; flush() writes what is left.
+    """
+    
+    FLUSH_INTERVAL = 2.0
+    
+    def __init__(self, db, params):
+        self.db = db
+        self.session_id, self.resumed = db.start_fetch_session(params)
+        self._parts = {}                  # phase -> {part: data}
+        self._pending = defaultdict(dict) # phase -> {part: data} not yet saved
+        self._lock = threading.Lock()
+        self._flushed = time.monotonic()
+        
+    def phase(self, name):
+        """Checkpoint of one phase (get(part) / put(part, data))"""
+        return FetchCheckpoint(self, name)
+        
+    def get(self, phase, part):
+        with self._lock:
+            if phase not in self._parts:
+                self._parts[phase] = self.db.load_fetch_parts(self.session_id, phase) if self.resumed else {}
+            return self._parts[phase].get(str(part))
+            
+    def put(self, phase, part, data):
+        with self._lock:
+            self._parts.setdefault(phase, {})[str(part)] = data
+            self._pending[phase][str(part)] = data
+            due = time.monotonic() - self._flushed >= self.FLUSH_INTERVAL
+        if due:
+            self.flush()
+            
+    def flush(self):
+        """Write buffered parts to the database"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(dict)
+            self._flushed = time.monotonic()
+        for phase, parts in pending.items():
+            self.db.save_fetch_parts(self.session_id, phase, parts)
+            
+    def finish(self):
+        """The fetch completed: drop the checkpoints"""
+        with self._lock:
+            self._pending.clear()
+        self.db.finish_fetch_session(self.session_id)
+
+
+class FetchCheckpoint:
+    """One phase of a FetchSession, as passed to the paginating client methods"""
+    
+    def __init__(self, session, phase):
+        self.session = session
+        self.phase = phase
+        
+    def get(self, part):
+        return self.session.get(self.phase, part)
+        
+    def put(self, part, data):
+        self.session.put(self.phase, part, data)
+
+
+# ============================================================================
+# WARM-START SNAPSHOT
+# ============================================================================
+
+class DataStoreSnapshot:
+    """
+    Compact on-disk snapshot of the DataStore catalogs (gzipped JSON).
+    Saved after every fetch and loaded at startup so the UI has data
+    immediately, while a delta refresh brings it up to date.
+    """
+    
+    FORMAT = "bridge-datastore-snapshot"
+    VERSION = 1
+    
+    # Matched products are stored column-wise in this field order
+    MATCHED_FIELDS = MatchedProduct.FIELDS
+    
+    def __init__(self, path="bridge_snapshot.json.gz"):
+        self.path = path
+        
+    def save(self, store):
+        """Write the store's catalogs to disk (atomically replaces the previous snapshot)"""
+        state = store.state
+        woo_count, capital_count = store.product_counts()
+        snapshot = {
+            'format': self.FORMAT,
+            'version': self.VERSION,
+            'saved_at': datetime.now().isoformat(),
+            'meta': {
+                'last_fetch_time': state.last_fetch_time.isoformat() if state.last_fetch_time else None,
+                'woo_count': woo_count,
+                'capital_count': capital_count,
+            },
+            'matched_products': {
+                'fields': list(self.MATCHED_FIELDS),
+                'rows': [[p.get(f) for f in self.MATCHED_FIELDS] for p in state.matched_products],
+            },
+            'unmatched_capital': self._pack_columns(state.unmatched_capital),
+            'unmatched_woo': [dict(p.items()) for p in state.unmatched_woo],
+            'woo_categories': state.woo_categories,
+        }
+        
+        tmp_path = f"{self.path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        
+    def load(self, store):
+        """
+        Load the snapshot into the store. Returns the snapshot metadata, or
+        None if there is no snapshot or it doesn't match the current schema.
+        """
+        if not os.path.exists(self.path):
+            return None
+            
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable snapshot {self.path}: {e}")
+            return None
+            
+        if snapshot.get('format') != self.FORMAT or snapshot.get('version') != self.VERSION:
+            print(f"Ignoring snapshot {self.path}: unsupported format/version")
+            return None
+            
+        matched_block = snapshot.get('matched_products', {})
+        capital_block = snapshot.get('unmatched_capital', {})
+        if (tuple(matched_block.get('fields', ())) != self.MATCHED_FIELDS
+                or (capital_block.get('rows') and 'CODE' not in capital_block.get('fields', ()))):
+            print(f"Ignoring snapshot {self.path}: schema mismatch")
+            return None
+            
+        fields = self.MATCHED_FIELDS
+        meta = dict(snapshot.get('meta', {}))
+        meta['saved_at'] = snapshot.get('saved_at')
+        last_fetch = meta.get('last_fetch_time')
+        
+        store.publish(
+            matched_products=[MatchedProduct(dict(zip(fields, row))) for row in matched_block['rows']],
+            unmatched_capital=[CapitalItem.from_api(row) for row in self._unpack_columns(capital_block)],
+            unmatched_woo=[WooProduct.from_api(p) for p in snapshot.get('unmatched_woo', [])],
+            woo_categories=snapshot.get('woo_categories', []),
+            last_fetch_time=datetime.fromisoformat(last_fetch) if last_fetch else None,
+            snapshot_info=meta
+        )
+        return meta
+        
+    @staticmethod
+    def _pack_columns(rows):
+        """Store flat dict rows as a field list plus value lists"""
+        fields = []
+        for row in rows:
+            for key in row:
+                if key not in fields:
+                    fields.append(key)
+        return {'fields': fields, 'rows': [[row.get(f) for f in fields] for row in rows]}
+        
+    @staticmethod
+    def _unpack_columns(block):
+        """Inverse of _pack_columns (fields missing from a row are left out)"""
+        fields = block.get('fields', [])
+        return [
+            {f: v for f, v in zip(fields, row) if v is not None}
+            for row in block.get('rows', [])
+        ]
@@ -0,0 +1,243 @@
+"""
+BRIDGE job manager
+==================
+Runs fetches, refreshes and price updates on a bounded worker pool
+instead of one thread per button press. Jobs touching the same products
+run one after another, user-triggered jobs go first and push background
+refreshes aside, and every job can be cancelled.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+
+# ============================================================================
+# CANCELLATION
+# ============================================================================
+
+class JobCancelled(Exception):
+    """Raised inside a job that was cancelled"""
+
+
+class CancelToken:
+    """Passed to every job; long-running work calls check() between steps"""
+    
+    def __init__(self):
+        self._event = threading.Event()
+    
+    def cancel(self):
+        self._event.set()
+    
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+    
+    def check(self):
+        """Raise JobCancelled if the job was cancelled"""
+        if self._event.is_set():
+            raise JobCancelled()
+
+
+# ============================================================================
+# JOBS
+# ============================================================================
+
+# Resource key for jobs that touch the whole catalog (fetches, delta refreshes)
+ALL_PRODUCTS = '*'
+
+
+class Job:
+    """
+    One unit of work: func(cancel_token) run on a worker thread.
+    state goes queued -> running -> done / failed / cancelled; a running
+    job counts as cancelled only if it stopped by raising JobCancelled.
+    """
+    
+    def __init__(self, job_id, name, func, priority, resources, on_done=None):
+        self.job_id = job_id
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.resources = frozenset(resources)
+        self.on_done = on_done
+        self.token = CancelToken()
+        self.state = 'queued'
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.finished = threading.Event()
+    
+    def conflicts_with(self, other):
+        """True if both jobs need some of the same products"""
+        if ALL_PRODUCTS in self.resources or ALL_PRODUCTS in other.resources:
+            return True
+        return not self.resources.isdisjoint(other.resources)
+    
+    def wait(self, timeout=None):
+        """Block until the job has finished; True if it did"""
+        return self.finished.wait(timeout)
+
+
+class JobManager:
+    """
+    Bounded worker pool with a priority queue. A queued job starts when a
+    worker is free and no running job holds any of its resources; among
+    those, the highest priority (lowest number) and oldest goes first.
+    Submitting a USER job cancels BACKGROUND jobs in its way.
+    """
+    
+    USER = 0
+    BACKGROUND = 10
+    
+    PRIORITY_NAMES = {USER: "user", BACKGROUND: "background"}
+    
+    def __init__(self, max_workers=3, history=50):
+        self.max_workers = max_workers
+        self._cond = threading.Condition()
+        self._queue = []               # heap of (priority, sequence, job)
+        self._running = {}             # job_id -> job
+        self._finished = deque(maxlen=history)
+        self._ids = itertools.count(1)
+        self._listeners = []
+        self._workers = [
+            threading.Thread(target=self._work, name=f"bridge-job-{n + 1}", daemon=True)
+            for n in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+    
+    def add_listener(self, callback):
+        """callback() is called (from worker threads) whenever a job changes state"""
+        self._listeners.append(callback)
+    
+    def _notify(self):
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Job listener error: {e}")
+    
+    def submit(self, name, func, priority=USER, resources=(ALL_PRODUCTS,), on_done=None):
+        """
+        Queue func(cancel_token). resources are the product keys the job
+        reads or writes (ALL_PRODUCTS for the whole catalog). on_done(job)
+        is called on the worker thread when the job has finished.
+        """
+        with self._cond:
+            job = Job(next(self._ids), name, func, priority, resources, on_done)
+            heapq.heappush(self._queue, (priority, job.job_id, job))
+            if priority < self.BACKGROUND:
+                self._preempt_for(job)
+            self._cond.notify_all()
+        self._notify()
+        return job
+    
+    def _preempt_for(self, job):
+        """Cancel running background jobs that block a user job (lock held)"""
+        background = [j for j in self._running.values() if j.priority >= self.BACKGROUND]
+        blocking = [j for j in background if j.conflicts_with(job)]
+        if not blocking and len(self._running) >= self.max_workers and background:
+            blocking = [max(background, key=lambda j: j.started_at)]
+        for running in blocking:
+            running.token.cancel()
+    
+    def cancel(self, job_id):
+        """Cancel a queued or running job; a running job stops at its next check"""
+        dequeued = None
+        with self._cond:
+            for entry in self._queue:
+                if entry[2].job_id == job_id:
+                    dequeued = entry[2]
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    dequeued.token.cancel()
+                    self._finish(dequeued, 'cancelled')
+                    break
+            else:
+                job = self._running.get(job_id)
+                if job:
+                    job.token.cancel()
+        if dequeued and dequeued.on_done:
+            self._call_on_done(dequeued)
+        self._notify()
+    
+    def jobs(self):
+        """Running, queued and recently finished jobs, in that order"""
+        with self._cond:
+            running = sorted(self._running.values(), key=lambda j: j.started_at)
+            queued = [entry[2] for entry in sorted(self._queue)]
+            return running + queued + list(reversed(self._finished))
+    
+    def active(self, name=None, priority=None):
+        """Queued or running jobs, optionally only those with this name / priority"""
+        with self._cond:
+            jobs = list(self._running.values()) + [entry[2] for entry in self._queue]
+        return [
+            job for job in jobs
+            if (name is None or job.name == name) and (priority is None or job.priority == priority)
+        ]
+    
+    def _next_runnable(self):
+        """
+        Pop the first queued job whose resources are free (lock held). A job
+        never overtakes a conflicting job queued ahead of it, so writes to
+        the same products happen in the order they were requested.
+        """
+        waiting = []
+        for entry in sorted(self._queue):
+            job = entry[2]
+            blockers = itertools.chain(self._running.values(), waiting)
+            if not any(job.conflicts_with(other) for other in blockers):
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                return job
+            waiting.append(job)
+        return None
+    
+    def _finish(self, job, state):
+        """Record a finished job (lock held)"""
+        job.state = state
+        job.finished_at = time.time()
+        self._finished.append(job)
+        job.finished.set()
+    
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_runnable()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_runnable()
+                job.state = 'running'
+                job.started_at = time.time()
+                self._running[job.job_id] = job
+            self._notify()
+            
+            state = 'done'
+            try:
+                job.result = job.func(job.token)
+            except JobCancelled:
+                state = 'cancelled'
+            except Exception as e:
+                state = 'failed'
+                job.error = str(e)
+                print(f"Job {job.job_id} ({job.name}) failed: {e}")
+            
+            with self._cond:
+                del self._running[job.job_id]
+                self._finish(job, state)
+                self._cond.notify_all()
+            if job.on_done:
+                self._call_on_done(job)
+            self._notify()
+            
+    def _call_on_done(self, job):
+        try:
+            job.on_done(job)
+        except Exception as e:
+            print(f"Job {job.job_id} on_done error: {e}")
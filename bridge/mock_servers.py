@@ -0,0 +1,637 @@
+"""
+BRIDGE mock servers
+===================
+Local stand-ins for the WooCommerce REST API (the /wp-json/wc/v3 subset
+Bridge uses) and the SoftOne S1 login/getdata services, serving an
+in-memory catalog with configurable latency, bandwidth and concurrency
+caps, 429s, 5xx errors and hung requests. Standard library only.
+
+    python -m bridge.mock_servers --products 3000 --capital 40000 --latency-ms 80
+    python -m bridge.mock_servers --realistic --match-rate 0.8 --price-mismatch-rate 0.3
+
+prints the URLs to put in WOOCOMMERCE_CONFIG["store_url"] and
+CAPITAL_CONFIG["base_url"]. Benchmarks start the servers in-process:
+
+    catalog = MockCatalog.generate(products=3000, capital=40000)
+    with MockWooCommerceServer(catalog, Faults(latency_ms=50)) as woo, MockCapitalServer(catalog) as capital:
+        client = WooCommerceClient({"store_url": woo.url, "consumer_key": "ck", "consumer_secret": "cs"})
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from bridge.catalog_generator import CatalogGenerator
+
+
+# ============================================================================
+# FAULT INJECTION
+# ============================================================================
+
+class Faults:
+    """
+    Per-server behaviour knobs. Rates are fractions of requests (0-1);
+    random choices come from a seeded generator so runs are repeatable.
+    - latency_ms / jitter_ms: delay before every response
+    - bytes_per_second: response bandwidth cap (0 = unlimited)
+    - max_concurrency: requests served at once, the rest queue (0 = unlimited)
+    - rate_limit_rps: requests per second before answering 429 (0 = off)
+    - rate_429: random 429 Too Many Requests (with Retry-After: retry_after)
+    - rate_5xx: random 503 Service Unavailable
+    - rate_hang: hold the request for hang_seconds, then drop the connection
+    """
+    
+    def __init__(self, latency_ms=0, jitter_ms=0, bytes_per_second=0, max_concurrency=0,
+                 rate_limit_rps=0, rate_429=0.0, rate_5xx=0.0, rate_hang=0.0,
+                 hang_seconds=5.0, retry_after=1, seed=1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.bytes_per_second = bytes_per_second
+        self.max_concurrency = max_concurrency
+        self.rate_limit_rps = rate_limit_rps
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.rate_hang = rate_hang
+        self.hang_seconds = hang_seconds
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._window = (0, 0)  # (second, requests seen in it)
+    
+    def roll(self):
+        """Pick the fault for one request: None, '429', '5xx' or 'hang'"""
+        with self._lock:
+            if self.rate_limit_rps:
+                second = int(time.monotonic())
+                window_second, count = self._window
+                count = count + 1 if window_second == second else 1
+                self._window = (second, count)
+                if count > self.rate_limit_rps:
+                    return '429'
+            draw = self._random.random()
+        if draw < self.rate_429:
+            return '429'
+        if draw < self.rate_429 + self.rate_5xx:
+            return '5xx'
+        if draw < self.rate_429 + self.rate_5xx + self.rate_hang:
+            return 'hang'
+        return None
+    
+    def latency(self):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, self.latency_ms + jitter) / 1000
+    
+    def transfer_time(self, size):
+        return size / self.bytes_per_second if self.bytes_per_second else 0.0
+
+
+# ============================================================================
+# CATALOG
+# ============================================================================
+
+class MockCatalog:
+    """
+    WooCommerce products (by id), variations (by parent id), orders,
+    categories and Capital STOCKITEMS rows, shared by both servers so
+    SKUs and CODEs line up. Writes go through lock.
+    """
+    
+    def __init__(self, products=(), variations=None, orders=(), categories=(), capital=()):
+        self.products = {product['id']: product for product in products}
+        self.variations = {
+            int(parent_id): {variation['id']: variation for variation in items}
+            for parent_id, items in (variations or {}).items()
+        }
+        self.orders = list(orders)
+        self.categories = list(categories)
+        self.capital = list(capital)
+        self.generator = None           # CatalogGenerator of a realistic() catalog, used by evolve()
+        self.generation = 0
+        self.lock = threading.Lock()
+    
+    @classmethod
+    def from_data(cls, data):
+        """Catalog from a dict with the keys save() writes (a CatalogGenerator result)"""
+        return cls(data.get('products', ()), data.get('variations'), data.get('orders', ()),
+                   data.get('categories', ()), data.get('capital', ()))
+    
+    @classmethod
+    def from_file(cls, path):
+        """Load a catalog saved with save() (or any JSON with the same keys)"""
+        with open(path, encoding='utf-8') as f:
+            return cls.from_data(json.load(f))
+    
+    def to_data(self):
+        return {
+            'products': list(self.products.values()),
+            'variations': {parent_id: list(items.values()) for parent_id, items in self.variations.items()},
+            'orders': self.orders,
+            'categories': self.categories,
+            'capital': self.capital,
+        }
+    
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_data(), f, ensure_ascii=False)
+    
+    @classmethod
+    def realistic(cls, products=3000, capital=40000, orders=500, seed=1, **options):
+        """
+        Realistic synthetic catalog (Greek names, brand prefixes, codes that
+        match only after normalization...); options go to CatalogGenerator.
+        """
+        generator = CatalogGenerator(seed, **options)
+        catalog = cls.from_data(generator.generate(products, capital, orders))
+        catalog.generator = generator
+        return catalog
+    
+    def evolve(self, churn=0.02, added=0.005, removed=0.002, modified_at=None):
+        """
+        Move the served catalog to its next generation (CatalogGenerator.evolve):
+        edited, new and removed products and Capital items, changed products
+        stamped with modified_at. Returns the change counts.
+        """
+        generator = self.generator or CatalogGenerator()
+        with self.lock:
+            self.generation += 1
+            data = generator.evolve(self.to_data(), churn, added, removed, generation=self.generation,
+                                    modified_at=modified_at)
+            self.products = {product['id']: product for product in data['products']}
+            self.variations = {
+                parent_id: {variation['id']: variation for variation in items}
+                for parent_id, items in data['variations'].items()
+            }
+            self.orders = data['orders']
+            self.capital = data['capital']
+        return data['meta']['changes']
+    
+    @classmethod
+    def generate(cls, products=3000, capital=40000, variable_share=0.05, variations_per_parent=4,
+                 orders=500, seed=1):
+        """
+        Plain synthetic catalog: every WooCommerce SKU has a Capital CODE
+        (about a third at a different price), plus unmatched Capital items.
+        """
+        rng = random.Random(seed)
+        now = datetime.now().replace(microsecond=0)  # Dates relative to now, so 'last 90 days' windows work
+        categories = [{'id': n, 'name': f"Category {n}", 'slug': f"category-{n}", 'parent': 0, 'count': 0}
+                      for n in range(1, 41)]
+        woo_products, variations, capital_rows = [], {}, []
+        next_id = 1000
+        
+        def stamp(days):
+            return (now - timedelta(days=days)).isoformat(timespec='seconds')
+        
+        def capital_row(code, price):
+            capital_rows.append({
+                'CODE': code, 'DESCR': f"Item {code}",
+                'RTLPRICE': price if rng.random() > 0.33 else round(price * rng.uniform(0.8, 1.2), 2),
+                'WHSPRICE': round(price * 0.6, 2), 'TRMODE': 1, 'DISCOUNT': 0, 'MAXDISCOUNT': 0,
+                'BALANCEQTY': rng.randint(0, 200),
+            })
+        
+        for n in range(products):
+            next_id += 1
+            price = round(rng.uniform(1, 300), 2)
+            is_variable = rng.random() < variable_share
+            product = {
+                'id': next_id, 'name': f"Product {n}", 'sku': f"{n:06d}",
+                'type': 'variable' if is_variable else 'simple',
+                'regular_price': '' if is_variable else f"{price:.2f}",
+                'sale_price': '', 'price': f"{price:.2f}",
+                'stock_quantity': rng.randint(0, 100), 'stock_status': 'instock',
+                'description': '', 'short_description': '',
+                'categories': [{'id': c['id'], 'name': c['name'], 'slug': c['slug']}
+                               for c in rng.sample(categories, 1)],
+                'permalink': f"https://shop.example/product-{n}",
+                'date_created': stamp(rng.randint(30, 900)), 'date_modified': stamp(rng.randint(1, 30)),
+                'total_sales': rng.randint(0, 500), 'attributes': [],
+            }
+            woo_products.append(product)
+            if is_variable:
+                items = []
+                for v in range(variations_per_parent):
+                    next_id += 1
+                    items.append({
+                        'id': next_id, 'sku': f"{n:06d}-{v + 1}",
+                        'regular_price': f"{price:.2f}", 'sale_price': '', 'price': f"{price:.2f}",
+                        'stock_quantity': rng.randint(0, 50), 'stock_status': 'instock',
+                        'description': '', 'permalink': product['permalink'],
+                        'date_created': product['date_created'], 'date_modified': product['date_modified'],
+                        'attributes': [{'id': 1, 'name': 'Size', 'option': f"S{v + 1}"}],
+                    })
+                    capital_row(items[-1]['sku'], price)
+                variations[product['id']] = items
+            else:
+                capital_row(product['sku'], price)
+        
+        for n in range(max(0, capital - len(capital_rows))):
+            capital_row(f"C{n:07d}", round(rng.uniform(1, 300), 2))
+        
+        skus = [p['sku'] for p in woo_products if p['type'] == 'simple'] or ['000000']
+        order_rows = []
+        for n in range(orders):
+            order_rows.append({
+                'id': 50000 + n, 'status': rng.choice(['completed', 'processing', 'on-hold', 'cancelled']),
+                'date_created': stamp(rng.randint(0, 120)),
+                'line_items': [{'sku': rng.choice(skus), 'quantity': rng.randint(1, 5),
+                                'total': f"{rng.uniform(1, 500):.2f}", 'product_id': 0}
+                               for _ in range(rng.randint(1, 4))],
+            })
+        
+        return cls(woo_products, variations, order_rows, categories, capital_rows)
+
+
+# ============================================================================
+# HTTP PLUMBING
+# ============================================================================
+
+class MockHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer with a listen backlog deep enough for 32 clients connecting at once"""
+    
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class MockServer:
+    """MockHTTPServer on a free local port, served from a daemon thread"""
+    
+    handler_class = None
+    
+    def __init__(self, catalog, faults=None, host="127.0.0.1", port=0):
+        self.catalog = catalog
+        self.faults = faults or Faults()
+        self.requests = 0
+        handler = type('Handler', (self.handler_class,), {'mock': self})
+        self.httpd = MockHTTPServer((host, port), handler)
+        self._thread = None
+    
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Applies the server's faults around route(); keep-alive like the real servers"""
+    
+    protocol_version = "HTTP/1.1"
+    mock = None
+    
+    def log_message(self, format, *args):
+        pass  # Quiet; thousands of requests per benchmark
+    
+    def do_GET(self):
+        self.handle_request('GET')
+    
+    def do_POST(self):
+        self.handle_request('POST')
+    
+    def do_PUT(self):
+        self.handle_request('PUT')
+    
+    def handle_request(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        faults = self.mock.faults
+        self.mock.requests += 1
+        
+        if faults._slots:
+            faults._slots.acquire()
+        try:
+            fault = faults.roll()
+            time.sleep(faults.latency())
+            if fault == 'hang':
+                time.sleep(faults.hang_seconds)
+                self.close_connection = True
+                return
+            if fault == '429':
+                self.send_json(429, {'code': 'too_many_requests', 'message': 'Too many requests'},
+                               {'Retry-After': str(faults.retry_after)})
+                return
+            if fault == '5xx':
+                self.send_json(503, {'code': 'unavailable', 'message': 'Service unavailable'})
+                return
+            
+            url = urlparse(self.path)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                payload = json.loads(body) if body else None
+            except ValueError:
+                self.send_json(400, {'code': 'invalid_json', 'message': 'Invalid JSON body'})
+                return
+            status, data, headers = self.route(method, url.path, query, payload)
+            self.send_json(status, data, headers)
+        finally:
+            if faults._slots:
+                faults._slots.release()
+    
+    def route(self, method, path, query, payload):
+        raise NotImplementedError
+    
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        delay = self.mock.faults.transfer_time(len(body))
+        if delay:
+            time.sleep(delay)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# ============================================================================
+# WOOCOMMERCE
+# ============================================================================
+
+def order_by(items, query):
+    """items in the orderby/order of the query; WooCommerce lists newest first by default"""
+    field = {'id': 'id', 'date': 'date_created', 'modified': 'date_modified',
+             'title': 'name'}.get(query.get('orderby', 'date'), 'date_created')
+    return sorted(items, key=lambda item: (item.get(field) or '', item['id']) if field != 'id' else item['id'],
+                  reverse=query.get('order', 'desc') == 'desc')
+
+
+def paginate(items, query, max_per_page=100):
+    """One page of items plus the X-WP-Total / X-WP-TotalPages headers"""
+    per_page = max(1, min(int(query.get('per_page', 10)), max_per_page))
+    page = max(1, int(query.get('page', 1)))
+    total = len(items)
+    headers = {'X-WP-Total': str(total), 'X-WP-TotalPages': str(max(1, math.ceil(total / per_page)))}
+    return items[(page - 1) * per_page:page * per_page], headers
+
+
+class WooCommerceHandler(MockHandler):
+    """/wp-json/wc/v3: products, variations, categories, orders and batch writes"""
+    
+    PREFIX = "/wp-json/wc/v3"
+    
+    # Fields a price/stock update may change
+    WRITABLE = ('regular_price', 'sale_price', 'stock_quantity', 'stock_status', 'description',
+                'short_description', 'name', 'manage_stock')
+    
+    def route(self, method, path, query, payload):
+        if not path.startswith(self.PREFIX):
+            return self.no_route()
+        parts = [part for part in path[len(self.PREFIX):].split('/') if part]
+        catalog = self.mock.catalog
+        
+        if parts == ['products'] and method == 'GET':
+            return self.list_products(query)
+        if parts == ['products', 'categories'] and method == 'GET':
+            items, headers = paginate(catalog.categories, query)
+            return 200, items, headers
+        if parts == ['orders'] and method == 'GET':
+            return self.list_orders(query)
+        if parts == ['products', 'batch'] and method == 'POST':
+            return 200, self.batch(None, payload or {}), {}
+        if len(parts) == 2 and parts[0] == 'products' and parts[1].isdigit():
+            return self.single(int(parts[1]), None, method, payload)
+        if len(parts) >= 3 and parts[0] == 'products' and parts[1].isdigit() and parts[2] == 'variations':
+            parent_id = int(parts[1])
+            if parent_id not in catalog.products:
+                return self.not_found(parent_id)
+            if len(parts) == 3 and method == 'GET':
+                items = list(catalog.variations.get(parent_id, {}).values())
+                items = self.filter_include(items, query)
+                items, headers = paginate(items, query)
+                return 200, items, headers
+            if len(parts) == 4 and parts[3] == 'batch' and method == 'POST':
+                return 200, self.batch(parent_id, payload or {}), {}
+            if len(parts) == 4 and parts[3].isdigit():
+                return self.single(int(parts[3]), parent_id, method, payload)
+        return self.no_route()
+    
+    def no_route(self):
+        return 404, {'code': 'rest_no_route', 'message': 'No route was found matching the URL and request method.',
+                     'data': {'status': 404}}, {}
+    
+    def not_found(self, item_id):
+        return 404, {'code': 'woocommerce_rest_product_invalid_id', 'message': 'Invalid ID.',
+                     'data': {'status': 404, 'id': item_id}}, {}
+    
+    @staticmethod
+    def filter_include(items, query):
+        if 'include' not in query:
+            return items
+        wanted = {int(value) for value in query['include'].split(',') if value.strip().isdigit()}
+        return [item for item in items if item['id'] in wanted]
+    
+    def list_products(self, query):
+        items = list(self.mock.catalog.products.values())
+        items = self.filter_include(items, query)
+        if 'modified_after' in query:
+            since = query['modified_after'][:19]
+            items = [item for item in items if item.get('date_modified', '')[:19] > since]
+        if 'type' in query:
+            items = [item for item in items if item.get('type') == query['type']]
+        # Like WooCommerce, 'any' (the default) leaves out the trash
+        status = query.get('status', 'any')
+        if status == 'any':
+            items = [item for item in items if item.get('status', 'publish') != 'trash']
+        else:
+            items = [item for item in items if item.get('status', 'publish') == status]
+        items, headers = paginate(order_by(items, query), query)
+        return 200, items, headers
+    
+    def list_orders(self, query):
+        items = self.mock.catalog.orders
+        if 'after' in query:
+            after = query['after'][:19]
+            items = [order for order in items if order.get('date_created', '')[:19] > after]
+        if 'status' in query:
+            items = [order for order in items if order.get('status') == query['status']]
+        items, headers = paginate(order_by(items, query), query)
+        return 200, items, headers
+    
+    def lookup(self, item_id, parent_id):
+        catalog = self.mock.catalog
+        if parent_id is None:
+            return catalog.products.get(item_id)
+        return catalog.variations.get(parent_id, {}).get(item_id)
+    
+    def apply(self, item, changes):
+        """Write changes to a product/variation (lock held) and return its new state"""
+        for field in self.WRITABLE:
+            if field in changes:
+                item[field] = changes[field]
+        item['price'] = item.get('sale_price') or item.get('regular_price', '')
+        item['date_modified'] = datetime.now().isoformat(timespec='seconds')
+        return dict(item)
+    
+    def single(self, item_id, parent_id, method, payload):
+        with self.mock.catalog.lock:
+            item = self.lookup(item_id, parent_id)
+            if item is None:
+                return self.not_found(item_id)
+            if method == 'GET':
+                return 200, dict(item), {}
+            if method == 'PUT':
+                return 200, self.apply(item, payload or {}), {}
+        return self.no_route()
+    
+    def batch(self, parent_id, payload):
+        """Batch endpoint: 'update' only (at most 100 items, like WooCommerce)"""
+        updates = payload.get('update', [])
+        if len(updates) > 100:
+            return {'update': [], 'errors': [{'code': 'rest_batch_max_items', 'message': 'Too many items'}]}
+        results = []
+        with self.mock.catalog.lock:
+            for changes in updates:
+                item = self.lookup(changes.get('id'), parent_id)
+                if item is None:
+                    results.append({'id': changes.get('id'), 'error': {
+                        'code': 'woocommerce_rest_product_invalid_id', 'message': 'Invalid ID.',
+                        'data': {'status': 400}}})
+                else:
+                    results.append(self.apply(item, changes))
+        return {'update': results}
+
+
+class MockWooCommerceServer(MockServer):
+    """Local WooCommerce REST API (authentication is accepted, not checked)"""
+    
+    handler_class = WooCommerceHandler
+
+
+# ============================================================================
+# CAPITAL (SoftOne S1)
+# ============================================================================
+
+class CapitalHandler(MockHandler):
+    """S1 web services: POST {"service": "login" | "getdata", ...} to any path"""
+    
+    CODE_FILTER = re.compile(r"CODE\s+IN\s*\((.*)\)", re.IGNORECASE | re.DOTALL)
+    
+    def route(self, method, path, query, payload):
+        if method != 'POST' or not isinstance(payload, dict):
+            return 200, {'success': False, 'message': 'Invalid request'}, {}
+        service = payload.get('service')
+        if service == 'login':
+            return 200, self.login(payload), {}
+        if service == 'getdata':
+            return 200, self.getdata(payload), {}
+        return 200, {'success': False, 'message': f"Unknown service {service}"}, {}
+    
+    def login(self, payload):
+        if not payload.get('username'):
+            return {'success': False, 'message': 'Login failed'}
+        session_id = f"mock-{random.getrandbits(64):016x}"
+        self.mock.sessions.add(session_id)
+        return {'success': True, 'sessionid': session_id}
+    
+    def getdata(self, payload):
+        if payload.get('sessionid') not in self.mock.sessions:
+            return {'success': False, 'message': 'Invalid session'}
+        if payload.get('tablename', 'STOCKITEMS') != 'STOCKITEMS':
+            return {'success': False, 'message': f"Unknown table {payload.get('tablename')}"}
+        
+        rows = self.mock.catalog.capital
+        match = self.CODE_FILTER.search(payload.get('filters') or '')
+        if match:
+            codes = {code.replace("''", "'") for code in re.findall(r"'((?:[^']|'')*)'", match.group(1))}
+            rows = [row for row in rows if row.get('CODE') in codes]
+        
+        fields = [field for field in (payload.get('fields') or '').split(';') if field]
+        if fields:
+            rows = [{field: row.get(field) for field in fields if field in row} for row in rows]
+        return {'success': True, 'totalcount': len(rows), 'data': rows}
+
+
+class MockCapitalServer(MockServer):
+    """Local S1 login/getdata service (any username logs in)"""
+    
+    handler_class = CapitalHandler
+    
+    def __init__(self, catalog, faults=None, host="127.0.0.1", port=0):
+        super().__init__(catalog, faults, host, port)
+        self.sessions = set()
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bridge.mock_servers",
+                                     description="Serve mock WooCommerce and Capital APIs locally")
+    parser.add_argument("--catalog", help="catalog JSON (default: generate one)")
+    parser.add_argument("--products", type=int, default=3000)
+    parser.add_argument("--capital", type=int, default=40000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--realistic", action="store_true",
+                        help="generate with CatalogGenerator (Greek names, normalization-only matches, unmatched tails)")
+    parser.add_argument("--match-rate", type=float, default=0.85, help="with --realistic (default: %(default)s)")
+    parser.add_argument("--price-mismatch-rate", type=float, default=0.2, help="with --realistic (default: %(default)s)")
+    parser.add_argument("--woo-port", type=int, default=8081)
+    parser.add_argument("--capital-port", type=int, default=8082)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--bytes-per-second", type=int, default=0)
+    parser.add_argument("--max-concurrency", type=int, default=0)
+    parser.add_argument("--rate-limit-rps", type=int, default=0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--rate-hang", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=5.0)
+    args = parser.parse_args(argv)
+    
+    if args.catalog:
+        catalog = MockCatalog.from_file(args.catalog)
+    elif args.realistic:
+        catalog = MockCatalog.realistic(products=args.products, capital=args.capital, seed=args.seed,
+                                        match_rate=args.match_rate, price_mismatch_rate=args.price_mismatch_rate)
+    else:
+        catalog = MockCatalog.generate(products=args.products, capital=args.capital, seed=args.seed)
+    
+    def faults():
+        return Faults(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, bytes_per_second=args.bytes_per_second,
+                      max_concurrency=args.max_concurrency, rate_limit_rps=args.rate_limit_rps,
+                      rate_429=args.rate_429, rate_5xx=args.rate_5xx, rate_hang=args.rate_hang,
+                      hang_seconds=args.hang_seconds, seed=args.seed)
+    
+    woo = MockWooCommerceServer(catalog, faults(), port=args.woo_port).start()
+    capital = MockCapitalServer(catalog, faults(), port=args.capital_port).start()
+    print(f"WooCommerce: {woo.url}  ({len(catalog.products)} products, "
+          f"{sum(len(v) for v in catalog.variations.values())} variations, {len(catalog.orders)} orders)")
+    print(f"Capital:     {capital.url}  ({len(catalog.capital)} items)")
+    print("Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        woo.stop()
+        capital.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+BRIDGE profiler
+===============
+Profiling switch for capturing what a customer-sized session really does.
+While a session runs:
+
+- the hot paths (table filtering, UI refresh, matching, sync workers) are
+  profiled deterministically, one <hot path>.pstats file each;
+- a sampler records the stacks of all threads every few milliseconds into
+  samples.folded (collapsed stacks for flamegraph.pl or speedscope);
+- with a Tk scheduler attached, a watchdog logs main-thread callbacks that
+  stall the UI for longer than stall_ms, with the stacks they were stuck
+  in (stalls.log).
+
+When no session runs, a hot path wrapper costs one attribute check.
+"""
+
+import atexit
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+
+
+# ============================================================================
+# SESSION
+# ============================================================================
+
+class ProfileSession:
+    """One profiling session writing to its own directory"""
+    
+    def __init__(self, path, sample_interval_ms=10, stall_ms=200, after=None):
+        self.path = path
+        self.sample_interval = sample_interval_ms / 1000
+        self.stall_ms = stall_ms
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._profile_lock = threading.Lock()  # cProfile: one deterministic profile at a time
+        self._profiles = {}                     # hot path -> cProfile.Profile
+        self._profiling = None                  # hot path being profiled right now
+        self._calls = {}                        # hot path -> [calls, profiled, seconds, max seconds]
+        self._samples = Counter()               # folded stack -> samples
+        self._sample_count = 0
+        self._stalls = 0
+        self._stopped = threading.Event()
+        
+        self._threads = [threading.Thread(target=self._sample, name="bridge-profiler-sampler", daemon=True)]
+        
+        # Tk stall watchdog: after(ms, func) is the Tk scheduler (widget.after)
+        self._after = after
+        self._beat_interval = 0.05
+        self._last_beat = time.perf_counter()
+        self._stall_stacks = Counter()
+        self._main_thread = threading.main_thread().ident
+        if after:
+            self._threads.append(threading.Thread(target=self._watch, name="bridge-profiler-watchdog", daemon=True))
+    
+    def start(self):
+        os.makedirs(self.path, exist_ok=True)
+        for thread in self._threads:
+            thread.start()
+        if self._after:
+            self._after(int(self._beat_interval * 1000), self._beat)
+    
+    # ------------------------------------------------------------------------
+    # Hot paths
+    # ------------------------------------------------------------------------
+    
+    def call(self, name, func, args, kwargs):
+        """Run func, profiled unless another hot path is being profiled (it is still sampled and timed)"""
+        profile = None
+        if self._profile_lock.acquire(blocking=False):
+            profile = self._profiles.get(name)
+            if profile is None:
+                profile = self._profiles[name] = cProfile.Profile()
+            self._profiling = name
+        start = time.perf_counter()
+        try:
+            if profile is None:
+                return func(*args, **kwargs)
+            profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                self._profiling = None
+                self._profile_lock.release()
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                calls = self._calls.setdefault(name, [0, 0, 0.0, 0.0])
+                calls[0] += 1
+                calls[1] += profile is not None
+                calls[2] += elapsed
+                calls[3] = max(calls[3], elapsed)
+    
+    # ------------------------------------------------------------------------
+    # Sampling (all threads)
+    # ------------------------------------------------------------------------
+    
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    
+    def _sample(self):
+        own = {thread.ident for thread in self._threads}
+        while not self._stopped.wait(self.sample_interval):
+            # Pool threads are numbered (ThreadPoolExecutor-0_3); group them by pool
+            names = {thread.ident: thread.name.rstrip('0123456789_-') for thread in threading.enumerate()}
+            samples = []
+            for ident, frame in sys._current_frames().items():
+                if ident in own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, "thread"))
+                samples.append(";".join(reversed(stack)))
+            with self._lock:
+                self._samples.update(samples)
+                self._sample_count += 1
+    
+    # ------------------------------------------------------------------------
+    # Tk main-thread stalls
+    # ------------------------------------------------------------------------
+    
+    def _beat(self):
+        """Runs on the Tk main loop; a late beat means a callback held the loop"""
+        now = time.perf_counter()
+        stall = now - self._last_beat - self._beat_interval
+        self._last_beat = now
+        if stall * 1000 >= self.stall_ms:
+            with self._lock:
+                stacks, self._stall_stacks = self._stall_stacks, Counter()
+            self._log_stall(stall, stacks)
+        if not self._stopped.is_set():
+            self._after(int(self._beat_interval * 1000), self._beat)
+    
+    def _watch(self):
+        """Snapshot the main thread's stack while the Tk loop is overdue"""
+        interval = self._beat_interval / 2
+        while not self._stopped.wait(interval):
+            overdue = time.perf_counter() - self._last_beat - self._beat_interval
+            if overdue * 1000 < self.stall_ms / 2:
+                continue
+            frame = sys._current_frames().get(self._main_thread)
+            if frame is not None:
+                stack = tuple(traceback.format_stack(frame))
+                with self._lock:
+                    self._stall_stacks[stack] += 1
+    
+    def _log_stall(self, seconds, stacks):
+        self._stalls += 1
+        lines = [f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]}  "
+                 f"Tk main thread stalled for {seconds * 1000:.0f} ms"]
+        total = sum(stacks.values())
+        for stack, count in stacks.most_common(3):
+            lines.append(f"  stack seen in {count} of {total} snapshots:")
+            lines.extend("    " + line.rstrip().replace("\n", "\n    ") for line in stack)
+        if not stacks:
+            lines.append("  (no stack captured)")
+        with open(os.path.join(self.path, "stalls.log"), 'a', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n\n")
+    
+    # ------------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------------
+    
+    def stop(self):
+        """Stop sampling and write the profiles, samples and summary"""
+        self._stopped.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=2)
+        seconds = time.perf_counter() - self._started
+        
+        # A hot path still running (a long fetch) is left out rather than blocking the UI
+        unfinished = None
+        locked = self._profile_lock.acquire(timeout=2)
+        if not locked:
+            unfinished = self._profiling
+        try:
+            written = [name for name in sorted(self._profiles) if name != unfinished]
+            for name in written:
+                pstats.Stats(self._profiles[name]).dump_stats(os.path.join(self.path, f"{name}.pstats"))
+        finally:
+            if locked:
+                self._profile_lock.release()
+        with self._lock:
+            samples = list(self._samples.items())
+            calls = dict(self._calls)
+        with open(os.path.join(self.path, "samples.folded"), 'w', encoding='utf-8') as f:
+            for stack, count in sorted(samples):
+                f.write(f"{stack} {count}\n")
+        
+        lines = [
+            f"BRIDGE profile, started {self.started_at.strftime('%Y-%m-%d %H:%M:%S')}, {seconds:.1f} s",
+            "",
+            f"{'Hot path':<24} {'Calls':>7} {'Profiled':>9} {'Total s':>9} {'Mean ms':>9} {'Max ms':>9}",
+        ]
+        for name, (count, profiled, total, longest) in sorted(calls.items(), key=lambda item: -item[1][2]):
+            lines.append(f"{name:<24} {count:>7} {profiled:>9} {total:>9.2f} "
+                         f"{total / count * 1000:>9.1f} {longest * 1000:>9.1f}")
+        lines += [
+            "",
+            f"{self._sample_count} stack samples every {self.sample_interval * 1000:.0f} ms -> samples.folded",
+            f"{self._stalls} Tk main-thread stalls over {self.stall_ms} ms -> stalls.log" if self._after
+            else "Tk stall log: not attached",
+            "Profiles: " + (", ".join(f"{name}.pstats" for name in written) or "none"),
+        ]
+        if unfinished:
+            lines.append(f"Not written: {unfinished} was still running")
+        with open(os.path.join(self.path, "summary.txt"), 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        return self.path
+
+
+# ============================================================================
+# PROFILER SWITCH
+# ============================================================================
+
+class Profiler:
+    """Starts and stops profile sessions; hot_path() wrappers report to the active one"""
+    
+    def __init__(self):
+        self.session = None
+        self._lock = threading.Lock()
+        atexit.register(self.stop)
+    
+    @property
+    def active(self):
+        return self.session is not None
+    
+    def start(self, output_dir="profiles", sample_interval_ms=10, stall_ms=200, after=None):
+        """
+        Start a session in a new timestamped directory under output_dir and
+        return its path. Pass after (a Tk widget's after) to log UI stalls;
+        start() must then be called on the Tk main thread.
+        """
+        with self._lock:
+            if self.session:
+                return self.session.path
+            path = os.path.join(output_dir, datetime.now().strftime('%Y%m%d-%H%M%S'))
+            session = ProfileSession(path, sample_interval_ms, stall_ms, after)
+            session.start()
+            self.session = session
+            return path
+    
+    def stop(self):
+        """Stop the session and write its files; returns their directory (None if none was running)"""
+        with self._lock:
+            session, self.session = self.session, None
+        if session is None:
+            return None
+        return session.stop()
+
+
+# Global profiler instance
+profiler = Profiler()
+
+
+def hot_path(name):
+    """Decorator: profile the function as hot path name while a profiling session runs"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            session = profiler.session
+            if session is None:
+                return func(*args, **kwargs)
+            return session.call(name, func, args, kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,1041 @@
+"""
+BRIDGE sync engine
+==================
+The fetch, refresh and price update workflows, independent of any user
+interface. BridgeApp runs them on its worker threads and shows the
+results; `python -m bridge sync` runs them headless.
+"""
+
+import asyncio
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from concurrent.futures import as_completed
+from collections import defaultdict
+
+from bridge.core import (
+    PRICE_UPDATE_CONFIG, SALES_CONFIG, WooProduct, CapitalItem, data_store, traffic, perf,
+    CapitalClient, ProductMatcher, FetchSession, ContextThreadPool
+)
+from bridge.jobs import JobManager, JobCancelled, ALL_PRODUCTS
+from bridge.profiling import hot_path
+
+
+def check_cancelled(cancel):
+    """Raise JobCancelled if the (optional) cancel token is set"""
+    if cancel:
+        cancel.check()
+
+
+def recorded(kind):
+    """
+    Record each call of a SyncEngine method as a perf run, saved to the
+    engine's database, and as a progress task of its own (and profile it as
+    a hot path during a profiling session)
+    """
+    def decorate(method):
+        method = hot_path(kind)(method)
+        
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with perf.run(kind, self.db), self.store.progress.task(kind):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def exclusive(method):
+    """
+    Run a SyncEngine method holding the engine's run lock (when it has
+    one), waiting while another process holds it
+    """
+    signature = inspect.signature(method)
+    
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.run_lock is None:
+            return method(self, *args, **kwargs)
+        cancel = signature.bind(self, *args, **kwargs).arguments.get('cancel')
+        on_wait = lambda: self.log(f"Waiting for another sync to finish (lock file {self.run_lock.path})")
+        with self.run_lock.hold(cancel, on_wait):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+# ============================================================================
+# RUN LOCK
+# ============================================================================
+
+class SyncLock:
+    """
+    Lock file that keeps the desktop app's fetches and price updates and
+    scheduled `python -m bridge sync` runs on the same database and
+    snapshot apart. Holds within one process are counted, so the app's
+    overlapping jobs share it. A lock older than max_age_hours is assumed
+    to be left over from a killed run.
+    """
+    
+    # How often a waiting hold() tries again
+    POLL_SECONDS = 1
+    
+    def __init__(self, path="bridge_sync.lock", max_age_hours=6):
+        self.path = path
+        self.max_age_hours = max_age_hours
+        self._holds = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def held(self):
+        return self._holds > 0
+    
+    def acquire(self):
+        """Take the lock (again, if this process holds it); False if another process holds it"""
+        with self._lock:
+            if self._holds:
+                self._holds += 1
+                try:
+                    os.utime(self.path)  # Still in use: keep it from looking left over
+                except OSError:
+                    pass
+                return True
+            
+            try:
+                if time.time() - os.path.getmtime(self.path) > self.max_age_hours * 3600:
+                    os.remove(self.path)
+            except OSError:
+                pass
+            
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                return False
+            with os.fdopen(fd, 'w') as f:
+                f.write(f"{os.getpid()} {datetime.now().isoformat()}\n")
+            self._holds = 1
+            return True
+    
+    def release(self):
+        with self._lock:
+            if not self._holds:
+                return
+            self._holds -= 1
+            if not self._holds:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+    
+    @contextmanager
+    def hold(self, cancel=None, on_wait=None):
+        """Hold the lock for a block, waiting (cancellably) while another process holds it"""
+        waited = False
+        while not self.acquire():
+            if on_wait and not waited:
+                on_wait()
+            waited = True
+            check_cancelled(cancel)
+            time.sleep(self.POLL_SECONDS)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+# ============================================================================
+# SYNC ENGINE
+# ============================================================================
+
+class SyncEngine:
+    """
+    Runs the sync workflows against a DataStore. Progress is reported
+    through store.set_loading / store.progress and messages through log;
+    errors are raised to the caller. The long-running methods take an
+    optional cancel token (bridge.jobs.CancelToken) checked between steps.
+    With a run_lock (SyncLock), fetches, delta refreshes and price jobs
+    hold it, so they never overlap a sync run of another process.
+    """
+    
+    def __init__(self, woo_client, capital_client, db, snapshot=None, store=data_store,
+                 log=print, io_engine=None, async_woo_client=None, async_capital_client=None,
+                 run_lock=None):
+        self.woo_client = woo_client
+        self.capital_client = capital_client
+        self.db = db
+        self.snapshot = snapshot
+        self.store = store
+        self.log = log
+        self.io_engine = io_engine
+        self.async_woo_client = async_woo_client
+        self.async_capital_client = async_capital_client
+        self.run_lock = run_lock
+    
+    # ========================================================================
+    # FULL FETCH
+    # ========================================================================
+    
+    @exclusive
+    @recorded('full_fetch')
+    def full_fetch(self, fetch_variations=False, cancel=None):
+        """Fetch all data from WooCommerce and Capital and publish it as one state"""
+        store = self.store
+        fetch = None
+        try:
+            store.set_loading(True, 0, "Starting data fetch...")
+            self.log("Starting data fetch...")
+            
+            # Finished pages are checkpointed; an interrupted fetch with the
+            # same settings resumes with only the missing parts
+            fetch = FetchSession(self.db, {'variations': bool(fetch_variations)})
+            if fetch.resumed:
+                self.log(f"Resuming interrupted fetch {fetch.session_id}")
+            
+            # Fetch WooCommerce products
+            store.set_loading(True, 10, "Fetching WooCommerce products...")
+            self.log("Fetching WooCommerce products...")
+            
+            def woo_progress(progress, status, fetched=0, total=None):
+                check_cancelled(cancel)
+                store.progress.report("Products", fetched, total)
+                store.set_loading(True, 10 + int(progress * 0.3), status)
+            
+            # Everything is collected locally and published in one step at the end,
+            # so other threads keep seeing the previous data until then.
+            # Keep compact records only; the raw API payloads are dropped
+            perf.begin('woo_products')
+            woo_products = [
+                WooProduct.from_api(product)
+                for product in self.woo_client.get_all_products(
+                    progress_callback=woo_progress, checkpoint=fetch.phase('products'))
+            ]
+            perf.end('woo_products', len(woo_products))
+            store.progress.end("Products")
+            self.log(f"Fetched {len(woo_products)} WooCommerce products")
+            
+            # Fetch product variations for variable products (only if enabled)
+            if fetch_variations:
+                store.set_loading(True, 40, "Fetching product variations (parallel)...")
+                self.log("Fetching product variations in parallel...")
+                
+                perf.begin('variations')
+                variation_count = 0
+                variable_products = [p for p in woo_products if p.get('type') == 'variable']
+                
+                store.progress.begin("Variations", len(variable_products))
+                completed = 0
+                fetched_variations = []  # (parent_id, parent date_modified, variations) to cache
+                listed_variations = {}   # parent_id -> variations, for the variation index
+                failed = 0
+                
+                def collect_variations(product, variations, fetched=True):
+                    nonlocal variation_count, completed, failed
+                    check_cancelled(cancel)
+                    # A product without variations is cached and indexed too, so it isn't
+                    # listed again; a failed listing (None) is neither
+                    if variations is not None:
+                        listed_variations[product['id']] = variations
+                        if fetched:
+                            fetched_variations.append((product['id'], product.get('date_modified'), variations))
+                        records = self.build_variation_products(product, variations)
+                        woo_products.extend(records)
+                        variation_count += len(records)
+                    else:
+                        failed += 1
+                    
+                    # Reported per product; the channel caps how often the UI redraws
+                    completed += 1
+                    progress = int(completed / len(variable_products) * 100)
+                    store.load_progress = 40 + int(progress * 0.05)
+                    store.progress.advance("Variations")
+                
+                # Parents whose date_modified hasn't moved are served from the cache,
+                # parents already fetched by an interrupted run from its checkpoint
+                cached = self.db.get_cached_variations(
+                    {product['id']: product.get('date_modified') for product in variable_products}
+                )
+                variations_checkpoint = fetch.phase('variations')
+                changed_parents = []
+                for product in variable_products:
+                    checkpointed = variations_checkpoint.get(product['id'])
+                    if checkpointed is not None:
+                        collect_variations(product, checkpointed)
+                    elif product['id'] in cached:
+                        collect_variations(product, cached[product['id']], fetched=False)
+                    else:
+                        changed_parents.append(product)
+                
+                def fetched_variations_for(product, variations):
+                    if variations is not None:
+                        variations_checkpoint.put(product['id'], variations)
+                    collect_variations(product, variations)
+                
+                self.download_variations(changed_parents, fetched_variations_for)
+                
+                self.db.save_cached_variations(fetched_variations)
+                self.db.index_variations(listed_variations)
+                perf.end('variations', variation_count)
+                store.progress.end("Variations")
+                self.log(f"Fetched {variation_count} product variations from {len(variable_products)} variable products "
+                         f"({len(variable_products) - len(changed_parents)} from cache/checkpoint, "
+                         f"{len(changed_parents) - failed} fetched, {failed} failed)")
+            else:
+                self.log("Skipping product variations (not enabled)")
+                store.set_loading(True, 40, "Skipping variations...")
+            
+            # Fetch WooCommerce categories
+            check_cancelled(cancel)
+            store.set_loading(True, 45, "Fetching categories...")
+            perf.begin('categories')
+            woo_categories = fetch.get('categories', 'all')
+            if woo_categories is None:
+                woo_categories = self.woo_client.get_categories()
+                fetch.put('categories', 'all', woo_categories)
+            perf.end('categories', len(woo_categories))
+            self.log(f"Fetched {len(woo_categories)} categories")
+            
+            # Fetch WooCommerce orders (last 90 days)
+            store.set_loading(True, 50, "Fetching orders...")
+            self.log("Fetching WooCommerce orders...")
+            
+            # A resumed fetch keeps its original window so pages line up
+            after_date = fetch.get('orders', 'after')
+            if after_date is None:
+                after_date = (datetime.now() - timedelta(days=SALES_CONFIG["order_window_days"])).isoformat()
+                fetch.put('orders', 'after', after_date)
+            
+            def order_progress(progress, status, fetched=0, total=None):
+                check_cancelled(cancel)
+                store.progress.report("Orders", fetched, total)
+                store.set_loading(True, 50 + int(progress * 0.2), status)
+            
+            perf.begin('orders')
+            woo_orders = self.woo_client.get_all_orders(
+                after=after_date,
+                progress_callback=order_progress,
+                checkpoint=fetch.phase('orders')
+            )
+            perf.end('orders', len(woo_orders))
+            store.progress.end("Orders")
+            self.log(f"Fetched {len(woo_orders)} orders")
+            
+            # Fold order lines into the per-SKU sales aggregates
+            perf.begin('sales_aggregates')
+            changed_lines = self.db.ingest_order_lines(woo_orders)
+            perf.end('sales_aggregates', changed_lines)
+            self.log(f"Sales aggregates updated from {changed_lines} new/changed order lines")
+            
+            # Fetch Capital products
+            check_cancelled(cancel)
+            store.set_loading(True, 75, "Fetching Capital ERP products...")
+            self.log("Fetching Capital ERP products...")
+            
+            perf.begin('capital')
+            capital_rows = fetch.get('capital', 'all')
+            if capital_rows is None:
+                capital_rows = self.capital_client.get_products()
+                fetch.put('capital', 'all', capital_rows)
+            capital_products = [CapitalItem.from_api(row) for row in capital_rows]
+            perf.end('capital', len(capital_products))
+            self.log(f"Fetched {len(capital_products)} Capital products")
+            
+            # Match products
+            check_cancelled(cancel)
+            store.set_loading(True, 90, "Matching products...")
+            self.log("Matching products...")
+            
+            perf.begin('match')
+            matched, unmatched_woo, unmatched_capital = ProductMatcher.match_products(
+                woo_products,
+                capital_products
+            )
+            perf.end('match', len(woo_products))
+            
+            self.log(f"Matched: {len(matched)}, Unmatched WOO: {len(unmatched_woo)}, Unmatched Capital: {len(unmatched_capital)}")
+            
+            # Publish everything (with the fetch time) as one consistent state
+            store.publish(
+                woo_products=woo_products,
+                capital_products=capital_products,
+                woo_orders=woo_orders,
+                woo_categories=woo_categories,
+                matched_products=matched,
+                unmatched_woo=unmatched_woo,
+                unmatched_capital=unmatched_capital,
+                last_fetch_time=datetime.now(),
+                snapshot_info=None
+            )
+            
+            fetch.finish()
+            store.set_loading(False, 100, "Data fetch complete!")
+            self.log("Data fetch complete!")
+            with perf.span('snapshot'):
+                self.save_snapshot()
+            
+            return {
+                'woo_products': len(woo_products),
+                'capital_products': len(capital_products),
+                'orders': len(woo_orders),
+                'matched': len(matched),
+                'unmatched_woo': len(unmatched_woo),
+                'unmatched_capital': len(unmatched_capital),
+            }
+        
+        except Exception as e:
+            if fetch:
+                # Keep what was fetched for the next attempt
+                try:
+                    fetch.flush()
+                except Exception as flush_error:
+                    self.log(f"Warning: Could not save fetch checkpoints: {str(flush_error)}")
+            if isinstance(e, JobCancelled):
+                store.set_loading(False, 0, "Data fetch cancelled")
+                self.log("Data fetch cancelled; fetched pages are kept for the next fetch")
+            else:
+                store.set_loading(False, 0, f"Error: {str(e)}")
+                self.log(f"Error fetching data: {str(e)}")
+            raise
+    
+    def download_variations(self, parents, on_variations):
+        """
+        Fetch the variations of every parent product, calling
+        on_variations(parent, variations) as each one arrives (on the
+        calling thread for the thread pool, on the I/O loop for the async
+        engine). variations is None when the listing failed.
+        """
+        if not parents:
+            return
+        if self.io_engine:
+            # Every parent in flight at once on the async engine
+            async def fetch_all_variations():
+                async def fetch_parent(product):
+                    on_variations(product, await self.async_woo_client.get_product_variations(product['id']))
+                await asyncio.gather(*(fetch_parent(product) for product in parents))
+            self.io_engine.run(fetch_all_variations())
+        else:
+            # Parallel fetching; the traffic controller adapts the actual concurrency
+            with ContextThreadPool(max_workers=traffic.max_concurrency) as executor:
+                futures = {
+                    executor.submit(self.woo_client.get_product_variations, product['id']): product
+                    for product in parents
+                }
+                for future in as_completed(futures):
+                    on_variations(futures[future], future.result())
+                    
+    @staticmethod
+    def build_variation_products(product, variations):
+        """Variation records (with parent details filled in) for a variable product"""
+        result = []
+        for variation in variations:
+            variation_product = {
+                'id': variation['id'],
+                'parent_id': product['id'],
+                'name': f"{product['name']} - {', '.join([attr['option'] for attr in variation.get('attributes', [])])}",
+                'sku': variation.get('sku', ''),
+                'regular_price': variation.get('regular_price', ''),
+                'sale_price': variation.get('sale_price', ''),
+                'stock_quantity': variation.get('stock_quantity'),
+                'stock_status': variation.get('stock_status'),
+                'description': variation.get('description', ''),
+                'short_description': product.get('short_description', ''),
+                'categories': product.get('categories', []),
+                'permalink': variation.get('permalink', ''),
+                'date_created': variation.get('date_created', ''),
+                'date_modified': variation.get('date_modified', ''),
+                'total_sales': product.get('total_sales', 0),
+                'attributes': variation.get('attributes', []),
+                'is_variation': True
+            }
+            if variation_product['sku']:
+                result.append(WooProduct.from_api(variation_product))
+        return result
+    
+    def save_snapshot(self):
+        """Persist the current catalogs for the next warm start"""
+        if not self.snapshot:
+            return
+        try:
+            self.snapshot.save(self.store)
+        except Exception as e:
+            self.log(f"Warning: Could not save snapshot: {str(e)}")
+    
+    # ========================================================================
+    # DELTA AND SELECTIVE REFRESH
+    # ========================================================================
+    
+    @exclusive
+    @recorded('delta_refresh')
+    def delta_refresh(self, since, cancel=None):
+        """
+        Bring loaded data up to date: WooCommerce products modified or
+        trashed since the last fetch, plus the Capital catalog (new and
+        removed codes, prices, stock). Products are rematched where a change
+        can pair them up. Indexed variations of changed variable products
+        are refreshed, and new Capital codes are looked up among indexed
+        variations; variations added since the last listing and products
+        deleted permanently (not trashed) wait for the next full fetch.
+        """
+        store = self.store
+        try:
+            store.set_loading(True, 0, "Fetching WooCommerce changes since last fetch...")
+            
+            def woo_progress(progress, status, fetched=0, total=None):
+                check_cancelled(cancel)
+                store.progress.report("Changed products", fetched, total)
+                store.set_loading(True, int(progress * 0.5), status)
+            
+            perf.begin('woo_changes')
+            changed_products = self.woo_client.get_all_products(
+                progress_callback=woo_progress,
+                modified_after=since.isoformat()
+            )
+            trashed = self.woo_client.get_all_products(modified_after=since.isoformat(), status='trash')
+            # A changed variation re-saves its parent
+            variations = self.indexed_variations(
+                {product['id']: product for product in changed_products if product.get('type') == 'variable'})
+            updated, newly_matched, removed = store.apply_woo_changes(
+                changed_products + variations, removed_ids=[product['id'] for product in trashed])
+            perf.end('woo_changes', len(changed_products) + len(variations) + len(trashed))
+            self.log(f"Delta refresh: {len(changed_products)} WooCommerce products changed "
+                     f"(and {len(variations)} of their variations), {len(trashed)} trashed "
+                     f"({updated} updated, {newly_matched} newly matched, {removed} removed)")
+            
+            check_cancelled(cancel)
+            store.set_loading(True, 50, "Refreshing Capital prices and stock...")
+            perf.begin('capital_prices')
+            capital_rows = self.capital_client.get_products(fields=CapitalClient.PRICE_FIELDS)
+            new_codes = store.new_capital_codes(capital_rows)
+            new_items = self.lookup_capital_products(new_codes, fields=None) if new_codes else []
+            capital = store.apply_capital_catalog(capital_rows, new_items)
+            
+            # New codes matching no loaded product may be variations that aren't loaded
+            unmatched_codes = [code for code in new_codes if store.get_product_by_sku(code) is None]
+            variations = self.indexed_variations({}, skus=unmatched_codes) if unmatched_codes else []
+            if variations:
+                capital['newly_matched'] += store.apply_woo_changes(variations)[1]
+            perf.end('capital_prices', len(capital_rows))
+            self.log(f"Delta refresh: Capital prices updated for {capital['updated']} matched products, "
+                     f"{capital['added']} new and {capital['removed']} removed codes "
+                     f"({capital['newly_matched']} newly matched, {capital['unmatched']} unmatched)")
+            
+            store.publish(last_fetch_time=datetime.now())
+            store.set_loading(False, 100, "Delta refresh complete!")
+            with perf.span('snapshot'):
+                self.save_snapshot()
+            
+            return {
+                'woo_changed': len(changed_products),
+                'woo_updated': updated,
+                'woo_removed': removed,
+                'newly_matched': newly_matched + capital['newly_matched'],
+                'capital_updated': capital['updated'],
+                'capital_added': capital['added'],
+                'capital_removed': capital['removed'],
+                'unmatched': capital['unmatched'],
+            }
+        
+        except JobCancelled:
+            store.set_loading(False, 0, "Delta refresh cancelled")
+            self.log("Delta refresh cancelled")
+            raise
+        except Exception as e:
+            store.set_loading(False, 0, "Delta refresh failed")
+            self.log(f"Error in delta refresh: {str(e)}")
+            raise
+    
+    @recorded('capital_refresh')
+    def refresh_capital_prices(self, skus, cancel=None):
+        """Refresh Capital prices for specific SKUs. Returns the number of products updated"""
+        store = self.store
+        store.set_loading(True, 0, "Refreshing Capital prices...")
+        store.progress.begin("Codes", len(skus))
+        
+        def lookup_progress(count):
+            check_cancelled(cancel)
+            store.progress.advance("Codes", count)
+        
+        # Look up the matched Capital code (it may differ from the SKU after normalization)
+        codes = []
+        for sku in skus:
+            product = store.get_product_by_sku(sku)
+            codes.append(product['capital_code'] if product and product.get('capital_code') else sku)
+        
+        # Fetch only these codes (bounded, concurrent chunks; price/stock fields only)
+        capital_products = self.lookup_capital_products(codes, progress_callback=lookup_progress)
+        self.log(f"Fetched {len(capital_products)} products from Capital")
+        
+        # Update matched products with new Capital prices
+        updated_count = store.update_capital_prices(capital_products)
+        
+        store.set_loading(False, 100, "Capital prices refreshed!")
+        self.log(f"Successfully refreshed {updated_count} Capital prices")
+        return updated_count
+    
+    @recorded('woo_refresh')
+    def refresh_woo_prices(self, products_to_refresh, cancel=None):
+        """
+        Refresh WooCommerce prices for specific products ({'id', 'parent_id',
+        'sku'} dicts). Returns the number of products updated.
+        """
+        store = self.store
+        store.set_loading(True, 0, "Refreshing WooCommerce prices...")
+        store.progress.begin("Products", len(products_to_refresh))
+        
+        done = [0]
+        
+        def lookup_progress(count):
+            check_cancelled(cancel)
+            done[0] += count
+            store.load_progress = int(done[0] / len(products_to_refresh) * 100)
+            store.progress.advance("Products", count)
+        
+        # A handful of concurrent include= lookups instead of one GET per product
+        refreshed = self.lookup_woo_products(
+            [(p['id'], p.get('parent_id')) for p in products_to_refresh],
+            progress_callback=lookup_progress
+        )
+        for product_info in products_to_refresh:
+            if product_info['id'] not in refreshed:
+                self.log(f"Error refreshing {product_info['sku']}: not returned by WooCommerce")
+        
+        # Apply all refreshed prices in one publish
+        updated_count = store.update_woo_products_from_api(refreshed, prices_only=True)
+        
+        store.set_loading(False, 100, "WooCommerce prices refreshed!")
+        self.log(f"Successfully refreshed {updated_count} WooCommerce prices")
+        return updated_count
+    
+    def indexed_variations(self, parents, skus=()):
+        """
+        Variation records looked up (include=) through the variation index
+        instead of listing variations again: all indexed variations of
+        parents ({parent_id: parent data}) and those indexed under skus,
+        whose parents are looked up with them.
+        """
+        items = {}
+        for parent_id in parents:
+            for variation_id, _, _ in self.db.get_parent_variations(parent_id):
+                items[variation_id] = parent_id
+        for sku in skus:
+            variation = self.db.find_variation_by_sku(sku)
+            if variation:
+                items[variation['variation_id']] = variation['parent_id']
+        if not items:
+            return []
+        
+        missing_parents = set(items.values()) - set(parents)
+        found = self.lookup_woo_products(list(items.items()) + [(parent_id, None) for parent_id in missing_parents])
+        parents = {**parents, **{parent_id: found[parent_id] for parent_id in missing_parents if parent_id in found}}
+        records = []
+        for variation_id, parent_id in items.items():
+            if variation_id in found and parent_id in parents:
+                records.extend(self.build_variation_products(parents[parent_id], [found[variation_id]]))
+        return records
+    
+    def lookup_capital_products(self, codes, **kwargs):
+        """get_products_by_codes on the async engine when available (all chunks at once), else on a thread pool"""
+        if self.io_engine and self.async_capital_client:
+            return self.io_engine.run(self.async_capital_client.get_products_by_codes(codes, **kwargs))
+        return self.capital_client.get_products_by_codes(codes, **kwargs)
+    
+    def lookup_woo_products(self, items, progress_callback=None):
+        """
+        get_products_by_ids on the async engine when available, else on a
+        thread pool. items are (id, parent_id) pairs; variations missing their
+        parent are routed through the variation index.
+        """
+        known_parents = self.db.get_variation_parents(product_id for product_id, parent_id in items if not parent_id)
+        items = [(product_id, parent_id or known_parents.get(product_id)) for product_id, parent_id in items]
+        
+        if self.io_engine:
+            products = self.io_engine.run(self.async_woo_client.get_products_by_ids(items, progress_callback=progress_callback))
+        else:
+            products = self.woo_client.get_products_by_ids(items, progress_callback=progress_callback)
+        
+        # Keep the variation index current with what came back
+        returned_variations = defaultdict(list)
+        for product_id, parent_id in items:
+            if parent_id and product_id in products:
+                returned_variations[parent_id].append(products[product_id])
+        self.db.index_variations(returned_variations, replace=False)
+        return products
+    
+    def refresh_from_woocommerce(self, updates):
+        """Refresh specific products from WooCommerce after updates"""
+        try:
+            refreshed = self.lookup_woo_products(
+                [(update['id'], update.get('parent_id')) for update in updates]
+            )
+            for update in updates:
+                if update['id'] not in refreshed:
+                    self.log(f"Warning: Could not refresh product {update['id']}")
+            
+            # Update local cache with fresh data in one publish
+            updated_count = self.store.update_woo_products_from_api(refreshed)
+            self.log(f"Refreshed {updated_count} products from WooCommerce")
+        
+        except Exception as e:
+            self.log(f"Error refreshing products from WooCommerce: {str(e)}")
+    
+    # ========================================================================
+    # PRICE UPDATES
+    # ========================================================================
+    
+    @staticmethod
+    def capital_price_update(product):
+        """
+        Price update that moves a matched product to its Capital retail
+        price, keeping its current discount percentage. None if the product
+        has no usable Capital price.
+        """
+        capital_price = product.get('capital_rtlprice')
+        if not capital_price or capital_price <= 0:
+            return None
+        
+        new_regular_price = float(capital_price)
+        update = {
+            "id": product['woo_id'],
+            "parent_id": product.get('parent_id'),
+            "regular_price": f"{new_regular_price:.2f}",
+            "sale_price": ""
+        }
+        
+        # Calculate new sale price to preserve discount percentage
+        current_discount = product.get('woo_discount_percent', 0)
+        if current_discount is not None and float(current_discount) > 0:
+            discount_multiplier = (100 - float(current_discount)) / 100
+            update["sale_price"] = f"{new_regular_price * discount_multiplier:.2f}"
+        return update
+    
+    def capital_price_mismatches(self):
+        """Price updates for every matched product whose price differs from Capital"""
+        updates = []
+        for product in self.store.matched_products:
+            if not product.get('price_match'):
+                update = self.capital_price_update(product)
+                if update:
+                    updates.append(update)
+        return updates
+    
+    def with_variation_parents(self, updates):
+        """Fill in parent_id of variation updates from the variation index, so they use the right endpoint"""
+        missing = [update['id'] for update in updates if not update.get('parent_id')]
+        if not missing:
+            return updates
+        parents = self.db.get_variation_parents(missing)
+        return [
+            {**update, 'parent_id': parents[update['id']]}
+            if not update.get('parent_id') and update['id'] in parents else update
+            for update in updates
+        ]
+    
+    def reconcile_write_results(self, batch, result):
+        """
+        Apply the products returned by a batch write to the DataStore.
+        The write responses are the authoritative product state, so nothing
+        is re-fetched for them. Returns (updates whose response was missing
+        or lacked prices, {woo_id: error entry} for failed writes); failed
+        writes are left as they were.
+        """
+        returned = {}
+        failed = {error.get('id'): error for error in result.get('errors', [])}
+        for product in result.get('update', []):
+            if 'error' in product:
+                failed[product.get('id')] = product
+            elif 'id' in product and 'regular_price' in product:
+                returned[product['id']] = product
+        
+        self.store.update_woo_products_from_api(returned, prices_only=True)
+        to_refetch = [
+            update for update in batch
+            if update['id'] not in returned and update['id'] not in failed
+        ]
+        return to_refetch, failed
+    
+    def apply_price_updates(self, updates, cancel=None):
+        """
+        Write price updates through the price update outbox. Prices
+        WooCommerce already has are dropped first. Returns the job result
+        (see run_price_job) with 'requested' and 'skipped' counts added;
+        job_id is None when there was nothing to send.
+        """
+        requested = len(updates)
+        updates, skipped_fields = self.store.drop_unchanged_prices(updates)
+        skipped_products = requested - len(updates)
+        if skipped_fields:
+            self.log(f"Skipped {skipped_fields} unchanged price fields ({skipped_products} products already up to date)")
+        if not updates:
+            return {'job_id': None, 'requested': requested, 'skipped': skipped_products,
+                    'done': 0, 'failed': 0, 'pending': 0, 'interrupted': False}
+        
+        # Persist the plan first so an interrupted update can resume
+        updates = self.with_variation_parents(updates)
+        job_id = self.db.create_price_job(updates)
+        self.log(f"Price update job {job_id}: {len(updates)} products")
+        result = self.run_price_job(job_id, len(updates), cancel)
+        result.update(requested=requested, skipped=skipped_products)
+        return result
+    
+    @exclusive
+    @recorded('price_update')
+    def run_price_job(self, job_id, total, cancel=None):
+        """
+        Send the pending items of a price update job in batches of 50,
+        holding the job's lease (renewed every batch) so no other process
+        resumes it meanwhile. Each batch is claimed before it is sent and
+        acknowledged after, so only unfinished items are sent again when a
+        job is resumed. Items that failed on connection errors go back to
+        pending and the job stops, to be resumed later. A cancelled job is
+        paused: it is only resumed when the user asks. Returns the job's
+        done/failed/pending counts, whether it was interrupted and whether
+        it was paused.
+        """
+        if not self.db.lease_price_job(job_id, PRICE_UPDATE_CONFIG["lease_seconds"]):
+            self.log(f"Price update job {job_id} is being sent by another process; skipped")
+            counts = self.db.finish_price_job(job_id)
+            return {
+                'job_id': job_id,
+                'done': counts.get('done', 0),
+                'failed': counts.get('failed', 0),
+                'pending': counts.get('pending', 0) + counts.get('claimed', 0),
+                'interrupted': True,
+                'paused': False,
+            }
+        
+        store = self.store
+        store.set_loading(True, 0, "Updating prices...")
+        store.progress.begin("Price updates", total)
+        
+        batch_size = 50
+        sent = 0
+        to_refetch = []
+        interrupted = paused = False
+        try:
+            while not interrupted:
+                if cancel and cancel.cancelled:
+                    self.log(f"Job {job_id} cancelled; the remaining products are kept until you resume or discard them")
+                    interrupted = paused = True
+                    break
+                batch = self.db.claim_price_items(job_id, batch_size)
+                if not batch:
+                    break
+                self.log(f"Sending batch {sent // batch_size + 1}: {len(batch)} products")
+                self.log(f"Sample update: ID={batch[0]['id']}, regular_price={batch[0].get('regular_price')}, sale_price={batch[0].get('sale_price')}")
+                
+                perf.begin('send')
+                try:
+                    result = self.woo_client.batch_update_products(batch)
+                except Exception:
+                    self.db.ack_price_items(job_id, retry_ids=[update['id'] for update in batch])
+                    raise
+                perf.end('send', len(batch))
+                
+                # Log any errors from WooCommerce
+                if 'update' in result:
+                    for product in result['update']:
+                        if 'error' in product:
+                            self.log(f"ERROR: Product {product.get('id')} failed: {product['error'].get('message', 'Unknown error')}")
+                        else:
+                            self.log(f"Updated product {product.get('id')}: {product.get('sku', 'N/A')}")
+                
+                # Update local cache from the write responses (one publish per batch)
+                refetch, failed = self.reconcile_write_results(batch, result)
+                self.db.invalidate_cached_variations(update.get('parent_id') for update in batch)
+                to_refetch.extend(refetch)
+                
+                retry_ids = [woo_id for woo_id, error in failed.items() if error.get('retryable')]
+                self.db.ack_price_items(
+                    job_id,
+                    done_ids=[update['id'] for update in batch if update['id'] not in failed],
+                    failed={woo_id: error.get('error') for woo_id, error in failed.items() if not error.get('retryable')},
+                    retry_ids=retry_ids
+                )
+                if retry_ids:
+                    self.log(f"Job {job_id}: {len(retry_ids)} products could not be sent; the job will be resumed later")
+                    interrupted = True
+                
+                sent += len(batch)
+                progress = min(100, int(sent / total * 100))
+                store.progress.advance("Price updates", len(batch))
+                store.set_loading(True, progress, f"Updated {sent}/{total} products")
+        finally:
+            self.db.release_price_job(job_id, paused=paused)
+        
+        counts = self.db.finish_price_job(job_id)
+        store.set_loading(False, 100, "Update interrupted" if interrupted else "Update complete!")
+        
+        # Only products whose response was missing or incomplete are re-fetched
+        if to_refetch:
+            self.log(f"Refreshing {len(to_refetch)} products from WooCommerce...")
+            perf.begin('refetch')
+            self.refresh_from_woocommerce(to_refetch)
+            perf.end('refetch', len(to_refetch))
+        
+        return {
+            'job_id': job_id,
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'pending': counts.get('pending', 0),
+            'interrupted': interrupted,
+            'paused': paused,
+        }
+    
+    def interrupted_price_jobs(self, max_age_hours=None, include_paused=False):
+        """
+        Prepare price update jobs interrupted by a crash or shutdown for
+        resuming; jobs the user paused too with include_paused (only when
+        the user is asked). Jobs a live process is still sending are left
+        alone. Jobs older than max_age_hours are expired unsent: the prices
+        they would write may have been changed since. The remaining items of
+        the others are re-diffed against the prices WooCommerce has now
+        (read fresh, not from the cache); items it already has are skipped.
+        Returns (job_id, items left to send) pairs of the jobs that still
+        have something to send.
+        """
+        if max_age_hours is None:
+            max_age_hours = PRICE_UPDATE_CONFIG["resume_max_age_hours"]
+        jobs = []
+        unfinished = self.db.get_unfinished_price_jobs(PRICE_UPDATE_CONFIG["lease_seconds"], include_paused)
+        for job_id, remaining, age_hours in unfinished:
+            if remaining and max_age_hours and age_hours > max_age_hours:
+                self.db.close_price_job(job_id, 'expired', f"Not resumed: interrupted {age_hours:.0f} hours ago")
+                self.log(f"Price update job {job_id} expired: interrupted {age_hours:.0f} hours ago, "
+                         f"{remaining} products not sent")
+                continue
+            if remaining:
+                updates = self.db.get_pending_price_items(job_id)
+                current = self.lookup_woo_products([(update['id'], update.get('parent_id')) for update in updates])
+                self.store.update_woo_products_from_api(current, prices_only=True)
+                to_send, _ = self.store.drop_unchanged_prices(updates, current=current)
+                to_send_ids = {update['id'] for update in to_send}
+                already_applied = [update['id'] for update in updates if update['id'] not in to_send_ids]
+                if already_applied:
+                    self.db.skip_price_items(job_id, already_applied)
+                    self.log(f"Price update job {job_id}: {len(already_applied)} products already have their new prices")
+                remaining = len(to_send)
+            if remaining:
+                jobs.append((job_id, remaining))
+            else:
+                self.db.finish_price_job(job_id)
+        return jobs
+    
+    def cancel_price_job(self, job_id):
+        """Drop the unsent items of an interrupted or paused job (the user chose not to resume it)"""
+        closed = self.db.close_price_job(job_id, 'cancelled', "Not resumed: cancelled by the user")
+        self.log(f"Price update job {job_id} cancelled: {closed} products not sent")
+    
+    def resume_price_jobs(self, cancel=None, max_age_hours=None, include_paused=False):
+        """
+        Finish price update jobs interrupted by a crash or shutdown, and
+        with include_paused the jobs the user paused (see
+        interrupted_price_jobs). Returns their results.
+        """
+        results = []
+        for job_id, remaining in self.interrupted_price_jobs(max_age_hours, include_paused):
+            if cancel and cancel.cancelled:
+                break
+            self.log(f"Resuming price update job {job_id}: {remaining} products left")
+            results.append(self.run_price_job(job_id, remaining, cancel))
+        return results
+
+
+# ============================================================================
+# BACKGROUND SCHEDULER
+# ============================================================================
+
+class SyncScheduler:
+    """
+    Keeps loaded data fresh without user action: a delta refresh every
+    delta_minutes and a full reconcile once a night at nightly_time
+    ("HH:MM"). Runs are submitted to the job manager as background jobs
+    over the whole catalog, so they wait for user jobs and are cancelled
+    by new ones; results reach the UI through the store's normal data
+    change notification.
+    """
+    
+    # How often to re-check while waiting (user jobs running, or for an interval change)
+    POLL_SECONDS = 30
+    
+    def __init__(self, engine, jobs, delta_minutes=15, nightly_time="03:00", fetch_variations=lambda: False):
+        self.engine = engine
+        self.jobs = jobs
+        self.delta_minutes = delta_minutes
+        self.nightly_time = nightly_time
+        self.fetch_variations = fetch_variations
+        self.last_delta_attempt = None
+        self.next_full = self._next_nightly(datetime.now())
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="bridge-scheduler", daemon=True)
+            self._thread.start()
+            
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        
+    def set_interval(self, minutes):
+        """Change the delta refresh interval (0 turns delta refreshes off)"""
+        self.delta_minutes = minutes
+        self._wake.set()
+        
+    def _next_nightly(self, after):
+        """Next nightly reconcile time after the given time (None if disabled)"""
+        if not self.nightly_time:
+            return None
+        hour, minute = (int(part) for part in self.nightly_time.split(':'))
+        at = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return at if at > after else at + timedelta(days=1)
+        
+    def due(self, now):
+        """'full', 'delta' or None"""
+        if self.next_full and now >= self.next_full:
+            return 'full'
+        last_fetch = self.engine.store.last_fetch_time
+        if not self.delta_minutes or not last_fetch:
+            return None  # Nothing loaded yet to refresh
+        last_run = max(last_fetch, self.last_delta_attempt or last_fetch)
+        if now - last_run >= timedelta(minutes=self.delta_minutes):
+            return 'delta'
+        return None
+        
+    def _run(self):
+        while not self._stop.is_set():
+            kind = self.due(datetime.now())
+            if kind and not self.jobs.active(priority=JobManager.USER):
+                job = self.jobs.submit(
+                    "Scheduled full reconcile" if kind == 'full' else "Scheduled delta refresh",
+                    lambda cancel, kind=kind: self.run_now(kind, cancel),
+                    priority=JobManager.BACKGROUND,
+                    resources=(ALL_PRODUCTS,)
+                )
+                job.wait()
+                # A run pushed aside by a user job is retried once the user job is done
+                if job.state != 'cancelled':
+                    if kind == 'full':
+                        self.next_full = self._next_nightly(datetime.now())
+                    else:
+                        self.last_delta_attempt = datetime.now()
+                continue
+            self._wake.wait(self.POLL_SECONDS)
+            self._wake.clear()
+            
+    def run_now(self, kind, cancel=None):
+        """Run a delta refresh or full reconcile on the calling thread"""
+        store = self.engine.store
+        try:
+            if kind == 'full':
+                self.engine.log("Scheduled full reconcile starting")
+                self.engine.full_fetch(fetch_variations=self.fetch_variations(), cancel=cancel)
+            else:
+                self.engine.delta_refresh(store.last_fetch_time, cancel=cancel)
+            store.notify_data_changed()
+        except JobCancelled:
+            raise
+        except Exception as e:
+            self.engine.log(f"Scheduled {kind} refresh failed: {str(e)}")
@@ -17,629 +17,27 @@ Author: Roussakis Supplies IKE
 """
 
 import customtkinter as ctk
-from tkinter import ttk, messagebox
-import requests
-from requests.auth import HTTPBasicAuth
-import urllib3
+from tkinter import ttk, messagebox, filedialog
 import pyodbc
-import threading
-from datetime import datetime, timedelta
+import time
 import json
-import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import sqlite3
-from collections import defaultdict
+from datetime import datetime
 
-# Disable SSL warnings for Capital ERP
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-# ============================================================================
-# CONFIGURATION
-# ============================================================================
-
-# WooCommerce API Configuration
-WOOCOMMERCE_CONFIG = {
-    "store_url": "https://roussakis.com.gr",
-    "consumer_key": "ck_bb11ea8930c80ab895887236e037ddcfbee003e1",
-    "consumer_secret": "cs_c7cc521fbe93def7c731a920632c0c23c50d0bd7"
-}
-
-# Capital ERP Configuration
-CAPITAL_CONFIG = {
-    "base_url": "https://401003161911.oncloud.gr/s1services",
-    "username": "WEBESHOP",
-    "password": "1975",
-    "company": 1,
-    "fiscalyear": 2025,
-    "branch": 1
-}
+from bridge.core import (
+    WOOCOMMERCE_CONFIG, CAPITAL_CONFIG, SCHEDULER_CONFIG, PROFILING_CONFIG, SALES_CONFIG, aiohttp, data_store, perf, http_stats,
+    products_table_rows, prices_table_rows, perf_trends, memory_report, format_memory_report,
+    WooCommerceClient, CapitalClient, AsyncIOEngine, AsyncWooCommerceClient, AsyncCapitalClient,
+    ProductMatcher, LocalDatabase, DataStoreSnapshot
+)
+from bridge.sync import SyncEngine, SyncScheduler, SyncLock
+from bridge.jobs import JobManager, JobCancelled, ALL_PRODUCTS
+from bridge.profiling import profiler, hot_path
 
 # Application Theme
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
 
-# ============================================================================
-# DATA STORE - Shared data between all panels
-# ============================================================================
-
-class DataStore:
-    """
-    Central data store that holds all fetched data.
-    This prevents repeated API calls and shares data between panels.
-    """
-    
-    def __init__(self):
-        self.woo_products = []           # All WooCommerce products
-        self.capital_products = []        # All Capital ERP products
-        self.woo_orders = []              # All WooCommerce orders
-        self.woo_categories = []          # WooCommerce categories
-        self.matched_products = []        # Products matched between systems
-        self.unmatched_woo = []           # WooCommerce products without Capital match
-        self.unmatched_capital = []       # Capital products without WooCommerce match
-        
-        self.capital_session_id = None    # Capital ERP session
-        self.last_fetch_time = None       # When data was last fetched
-        
-        self.is_loading = False           # Loading state flag
-        self.load_progress = 0            # Loading progress (0-100)
-        self.load_status = ""             # Current loading status message
-        
-        # Callbacks for UI updates
-        self.on_data_changed = []
-        self.on_loading_changed = []
-        
-    def add_data_listener(self, callback):
-        """Add a callback to be notified when data changes"""
-        self.on_data_changed.append(callback)
-        
-    def add_loading_listener(self, callback):
-        """Add a callback to be notified when loading state changes"""
-        self.on_loading_changed.append(callback)
-        
-    def notify_data_changed(self):
-        """Notify all listeners that data has changed"""
-        for callback in self.on_data_changed:
-            try:
-                callback()
-            except Exception as e:
-                print(f"Error in data listener: {e}")
-                
-    def notify_loading_changed(self):
-        """Notify all listeners that loading state changed"""
-        for callback in self.on_loading_changed:
-            try:
-                callback()
-            except Exception as e:
-                print(f"Error in loading listener: {e}")
-                
-    def set_loading(self, is_loading, progress=0, status=""):
-        """Update loading state"""
-        self.is_loading = is_loading
-        self.load_progress = progress
-        self.load_status = status
-        self.notify_loading_changed()
-        
-    def get_product_by_sku(self, sku):
-        """Get matched product data by SKU"""
-        for product in self.matched_products:
-            if product.get('sku', '').strip().upper() == sku.strip().upper():
-                return product
-        return None
-        
-    def update_woo_product_locally(self, product_id, updates):
-        """Update a WooCommerce product in local cache after API update"""
-        for i, product in enumerate(self.woo_products):
-            if product['id'] == product_id:
-                self.woo_products[i].update(updates)
-                break
-        # Also update in matched products
-        for i, product in enumerate(self.matched_products):
-            if product.get('woo_id') == product_id:
-                for key, value in updates.items():
-                    if key == 'regular_price':
-                        self.matched_products[i]['woo_regular_price'] = value
-                    elif key == 'sale_price':
-                        self.matched_products[i]['woo_sale_price'] = value
-                    elif key == 'description':
-                        self.matched_products[i]['woo_description'] = value
-                    elif key == 'short_description':
-                        self.matched_products[i]['woo_short_description'] = value
-                break
-        self.notify_data_changed()
-    
-    def update_woo_product_from_api(self, product_id, product_data):
-        """Update a WooCommerce product from fresh API data"""
-        # Update in woo_products list
-        for i, product in enumerate(self.woo_products):
-            if product['id'] == product_id:
-                self.woo_products[i] = product_data
-                break
-        
-        # Update in matched_products list
-        for i, product in enumerate(self.matched_products):
-            if product.get('woo_id') == product_id:
-                # Update all WooCommerce fields from fresh data
-                self.matched_products[i]['woo_regular_price'] = float(product_data.get('regular_price', 0) or 0)
-                self.matched_products[i]['woo_sale_price'] = float(product_data.get('sale_price', 0) or 0)
-                self.matched_products[i]['woo_description'] = product_data.get('description', '')
-                self.matched_products[i]['woo_short_description'] = product_data.get('short_description', '')
-                self.matched_products[i]['name'] = product_data.get('name', '')
-                
-                # Recalculate discount percentage
-                regular_price = self.matched_products[i]['woo_regular_price']
-                sale_price = self.matched_products[i]['woo_sale_price']
-                if regular_price > 0 and sale_price > 0:
-                    discount_percent = round((1 - sale_price / regular_price) * 100, 2)
-                    self.matched_products[i]['woo_discount_percent'] = discount_percent
-                else:
-                    self.matched_products[i]['woo_discount_percent'] = 0
-                break
-        
-        self.notify_data_changed()
-
-
-# Global data store instance
-data_store = DataStore()
-
-
-# ============================================================================
-# API CLIENTS
-# ============================================================================
-
-class WooCommerceClient:
-    """WooCommerce REST API client"""
-    
-    def __init__(self, config):
-        self.store_url = config["store_url"]
-        self.auth = HTTPBasicAuth(config["consumer_key"], config["consumer_secret"])
-        
-    def get_products(self, per_page=100, page=1, **kwargs):
-        """Get products from WooCommerce"""
-        url = f"{self.store_url}/wp-json/wc/v3/products"
-        params = {"per_page": per_page, "page": page, **kwargs}
-        response = requests.get(url, auth=self.auth, params=params, timeout=60)
-        response.raise_for_status()
-        return response.json(), response.headers
-        
-    def get_all_products(self, progress_callback=None):
-        """Get all products with pagination"""
-        all_products = []
-        page = 1
-        per_page = 100
-        
-        while True:
-            products, headers = self.get_products(per_page=per_page, page=page)
-            if not products:
-                break
-            all_products.extend(products)
-            
-            total_pages = int(headers.get('X-WP-TotalPages', 1))
-            if progress_callback:
-                progress = min(100, int((page / total_pages) * 100))
-                progress_callback(progress, f"Fetching WooCommerce products... Page {page}/{total_pages}")
-                
-            if page >= total_pages:
-                break
-            page += 1
-            
-        return all_products
-        
-    def get_orders(self, per_page=100, page=1, **kwargs):
-        """Get orders from WooCommerce"""
-        url = f"{self.store_url}/wp-json/wc/v3/orders"
-        params = {"per_page": per_page, "page": page, **kwargs}
-        response = requests.get(url, auth=self.auth, params=params, timeout=60)
-        response.raise_for_status()
-        return response.json(), response.headers
-        
-    def get_all_orders(self, status=None, after=None, progress_callback=None):
-        """Get all orders with pagination"""
-        all_orders = []
-        page = 1
-        per_page = 100
-        
-        params = {}
-        if status:
-            params['status'] = status
-        if after:
-            params['after'] = after
-            
-        while True:
-            orders, headers = self.get_orders(per_page=per_page, page=page, **params)
-            if not orders:
-                break
-            all_orders.extend(orders)
-            
-            total_pages = int(headers.get('X-WP-TotalPages', 1))
-            if progress_callback:
-                progress = min(100, int((page / total_pages) * 100))
-                progress_callback(progress, f"Fetching orders... Page {page}/{total_pages}")
-                
-            if page >= total_pages:
-                break
-            page += 1
-            
-        return all_orders
-        
-    def get_categories(self):
-        """Get all product categories"""
-        all_categories = []
-        page = 1
-        per_page = 100
-        
-        while True:
-            url = f"{self.store_url}/wp-json/wc/v3/products/categories"
-            params = {"per_page": per_page, "page": page}
-            response = requests.get(url, auth=self.auth, params=params, timeout=30)
-            response.raise_for_status()
-            categories = response.json()
-            
-            if not categories:
-                break
-            all_categories.extend(categories)
-            
-            total_pages = int(response.headers.get('X-WP-TotalPages', 1))
-            if page >= total_pages:
-                break
-            page += 1
-            
-        return all_categories
-        
-    def get_product_variations(self, product_id):
-        """Get all variations for a variable product"""
-        all_variations = []
-        page = 1
-        per_page = 100
-        
-        while True:
-            url = f"{self.store_url}/wp-json/wc/v3/products/{product_id}/variations"
-            params = {"per_page": per_page, "page": page}
-            try:
-                response = requests.get(url, auth=self.auth, params=params, timeout=30)
-                response.raise_for_status()
-                variations = response.json()
-                
-                if not variations:
-                    break
-                all_variations.extend(variations)
-                
-                total_pages = int(response.headers.get('X-WP-TotalPages', 1))
-                if page >= total_pages:
-                    break
-                page += 1
-            except:
-                # Product doesn't have variations or error occurred
-                break
-                
-        return all_variations
-        
-    def update_product(self, product_id, data):
-        """Update a product on WooCommerce"""
-        url = f"{self.store_url}/wp-json/wc/v3/products/{product_id}"
-        response = requests.put(url, auth=self.auth, json=data, timeout=30)
-        response.raise_for_status()
-        return response.json()
-        
-    def batch_update_products(self, updates):
-        """Batch update multiple products (handles both regular products and variations)"""
-        print(f"[DEBUG] Updating {len(updates)} products...")
-        
-        results = {'update': [], 'errors': []}
-        
-        for update in updates:
-            try:
-                product_id = update.get('id')
-                parent_id = update.get('parent_id')
-                
-                # Remove parent_id from update data as it's not a valid field
-                update_data = {k: v for k, v in update.items() if k not in ['id', 'parent_id']}
-                
-                # Determine the correct endpoint
-                if parent_id:
-                    # This is a variation - use variations endpoint
-                    url = f"{self.store_url}/wp-json/wc/v3/products/{parent_id}/variations/{product_id}"
-                    print(f"[DEBUG] Updating variation {product_id} of parent {parent_id}")
-                else:
-                    # This is a regular product
-                    url = f"{self.store_url}/wp-json/wc/v3/products/{product_id}"
-                    print(f"[DEBUG] Updating product {product_id}")
-                
-                print(f"[DEBUG] Update data: {update_data}")
-                
-                response = requests.put(url, auth=self.auth, json=update_data, timeout=30)
-                response.raise_for_status()
-                result = response.json()
-                
-                results['update'].append(result)
-                print(f"[SUCCESS] Updated product/variation {product_id}")
-                
-            except requests.exceptions.HTTPError as e:
-                error_msg = f"Product {product_id} failed: {e.response.text if hasattr(e, 'response') else str(e)}"
-                print(f"[ERROR] {error_msg}")
-                results['errors'].append({'id': product_id, 'error': error_msg})
-            except Exception as e:
-                error_msg = f"Product {product_id} failed: {str(e)}"
-                print(f"[ERROR] {error_msg}")
-                results['errors'].append({'id': product_id, 'error': error_msg})
-        
-        success_count = len(results['update'])
-        error_count = len(results['errors'])
-        print(f"[DEBUG] Update complete: {success_count} succeeded, {error_count} failed")
-        
-        return results
-
-
-class CapitalClient:
-    """SoftOne Capital ERP API client"""
-    
-    def __init__(self, config):
-        self.base_url = config["base_url"]
-        self.config = config
-        self.session = requests.Session()
-        self.session.verify = False
-        self.session_id = None
-        
-    def login(self):
-        """Login to Capital ERP and get session ID"""
-        login_data = {
-            "service": "login",
-            "company": self.config["company"],
-            "fiscalyear": self.config["fiscalyear"],
-            "branch": self.config["branch"],
-            "username": self.config["username"],
-            "password": self.config["password"]
-        }
-        
-        response = self.session.post(self.base_url, json=login_data, timeout=30)
-        response.raise_for_status()
-        result = response.json()
-        
-        if result.get("success"):
-            self.session_id = result.get("sessionid")
-            return self.session_id
-        else:
-            raise Exception(f"Capital login failed: {result.get('message', 'Unknown error')}")
-            
-    def get_products(self, fields=None, filters=None):
-        """Get products from Capital ERP"""
-        if not self.session_id:
-            self.login()
-            
-        if fields is None:
-            # Default fields for product matching
-            fields = "CODE;DESCR;RTLPRICE;WHSPRICE;TRMODE;DISCOUNT;MAXDISCOUNT;BALANCEQTY"
-            
-        request_data = {
-            "service": "getdata",
-            "sessionid": self.session_id,
-            "action": "read",
-            "tablename": "STOCKITEMS",
-            "fields": fields
-        }
-        
-        if filters:
-            request_data["filters"] = filters
-            
-        response = self.session.post(self.base_url, json=request_data, timeout=60)
-        response.raise_for_status()
-        result = response.json()
-        
-        if result.get("success"):
-            # Data can be in different formats depending on Capital version
-            data = result.get("data", [])
-            if not data:
-                data = result.get("STOCKITEMS", [])
-            if not data:
-                data = result.get("rows", [])
-            return data
-        else:
-            raise Exception(f"Failed to get Capital products: {result.get('message', 'Unknown error')}")
-
-
-# ============================================================================
-# PRODUCT MATCHER
-# ============================================================================
-
-class ProductMatcher:
-    """Matches products between WooCommerce and Capital ERP"""
-    
-    @staticmethod
-    def match_products(woo_products, capital_products):
-        """
-        Match products between WooCommerce and Capital by SKU/CODE
-        Returns: matched, unmatched_woo, unmatched_capital
-        """
-        matched = []
-        unmatched_woo = []
-        unmatched_capital = list(capital_products)  # Copy to track unmatched
-        
-        # Create lookup dictionary for Capital products
-        # Store both original and normalized (without leading zeros) versions
-        capital_lookup = {}
-        capital_lookup_normalized = {}
-        for cap_product in capital_products:
-            code = str(cap_product.get('CODE', '')).strip().upper()
-            if code:
-                capital_lookup[code] = cap_product
-                # Also store normalized version (remove leading zeros)
-                code_normalized = code.lstrip('0') or '0'  # Keep at least one zero if all zeros
-                capital_lookup_normalized[code_normalized] = cap_product
-                
-        for woo_product in woo_products:
-            # Skip parent products (variable products without SKU or with type='variable')
-            # Only match variations and regular products
-            product_type = woo_product.get('type', '')
-            is_variation = woo_product.get('is_variation', False)
-            
-            # Skip if it's a parent variable product (not a variation)
-            if product_type == 'variable' and not is_variation:
-                continue
-            
-            sku = str(woo_product.get('sku', '')).strip().upper()
-            
-            # Skip products without SKU
-            if not sku:
-                unmatched_woo.append(woo_product)
-                continue
-            
-            # Try exact match first
-            cap_product = None
-            if sku in capital_lookup:
-                cap_product = capital_lookup[sku]
-            # If no exact match, try normalized match (ignore leading zeros)
-            else:
-                sku_normalized = sku.lstrip('0') or '0'
-                if sku_normalized in capital_lookup_normalized:
-                    cap_product = capital_lookup_normalized[sku_normalized]
-            
-            if cap_product:
-                
-                # Calculate discount percentage
-                regular_price = float(woo_product.get('regular_price') or 0)
-                sale_price = float(woo_product.get('sale_price') or 0)
-                discount_percent = 0
-                if regular_price > 0 and sale_price > 0:
-                    discount_percent = round((1 - sale_price / regular_price) * 100, 2)
-                    
-                matched_product = {
-                    'sku': sku,
-                    'woo_id': woo_product['id'],
-                    'parent_id': woo_product.get('parent_id'),  # For variations
-                    'woo_name': woo_product.get('name', ''),
-                    'woo_regular_price': regular_price,
-                    'woo_sale_price': sale_price,
-                    'woo_discount_percent': discount_percent,
-                    'woo_stock_quantity': woo_product.get('stock_quantity'),
-                    'woo_stock_status': woo_product.get('stock_status'),
-                    'woo_total_sales': woo_product.get('total_sales', 0),
-                    'woo_description': woo_product.get('description', ''),
-                    'woo_short_description': woo_product.get('short_description', ''),
-                    'woo_categories': [cat.get('name', '') for cat in woo_product.get('categories', [])],
-                    'woo_permalink': woo_product.get('permalink', ''),
-                    'woo_date_created': woo_product.get('date_created', ''),
-                    'woo_date_modified': woo_product.get('date_modified', ''),
-                    
-                    'capital_code': cap_product.get('CODE', ''),
-                    'capital_descr': cap_product.get('DESCR', ''),
-                    'capital_rtlprice': float(cap_product.get('RTLPRICE') or 0),
-                    'capital_whsprice': float(cap_product.get('WHSPRICE') or 0),
-                    'capital_trmode': cap_product.get('TRMODE', 0),
-                    'capital_discount': float(cap_product.get('DISCOUNT') or 0),
-                    'capital_maxdiscount': float(cap_product.get('MAXDISCOUNT') or 0),
-                    'capital_stock': float(cap_product.get('BALANCEQTY') or 0),
-                    
-                    'price_match': abs(regular_price - float(cap_product.get('RTLPRICE') or 0)) < 0.01,
-                }
-                
-                matched.append(matched_product)
-                
-                # Remove from unmatched capital
-                unmatched_capital = [p for p in unmatched_capital 
-                                     if str(p.get('CODE', '')).strip().upper() != sku]
-            else:
-                unmatched_woo.append(woo_product)
-                
-        return matched, unmatched_woo, unmatched_capital
-
-
-# ============================================================================
-# DATABASE FOR CACHING AND ANALYTICS
-# ============================================================================
-
-class LocalDatabase:
-    """SQLite database for caching and analytics"""
-    
-    def __init__(self, db_path="bridge_data.db"):
-        self.db_path = db_path
-        self.init_database()
-        
-    def init_database(self):
-        """Initialize database tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Product sales history
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS product_sales (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sku TEXT NOT NULL,
-                product_name TEXT,
-                order_id INTEGER,
-                order_date TEXT,
-                quantity INTEGER,
-                price REAL,
-                total REAL,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Price history
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS price_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sku TEXT NOT NULL,
-                regular_price REAL,
-                sale_price REAL,
-                recorded_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Update logs
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS update_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sku TEXT,
-                field_updated TEXT,
-                old_value TEXT,
-                new_value TEXT,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        
-    def record_price_history(self, sku, regular_price, sale_price):
-        """Record price change"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO price_history (sku, regular_price, sale_price)
-            VALUES (?, ?, ?)
-        ''', (sku, regular_price, sale_price))
-        conn.commit()
-        conn.close()
-        
-    def record_update(self, sku, field, old_value, new_value):
-        """Record an update"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO update_logs (sku, field_updated, old_value, new_value)
-            VALUES (?, ?, ?, ?)
-        ''', (sku, field, str(old_value), str(new_value)))
-        conn.commit()
-        conn.close()
-        
-    def get_price_history(self, sku, days=90):
-        """Get price history for a product"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
-        cursor.execute('''
-            SELECT regular_price, sale_price, recorded_at
-            FROM price_history
-            WHERE sku = ? AND recorded_at >= ?
-            ORDER BY recorded_at
-        ''', (sku, cutoff))
-        
-        results = cursor.fetchall()
-        conn.close()
-        return results
-
-
 # ============================================================================
 # MAIN APPLICATION
 # ============================================================================
@@ -657,7 +55,26 @@ class BridgeApp(ctk.CTk):
         # Initialize clients
         self.woo_client = WooCommerceClient(WOOCOMMERCE_CONFIG)
         self.capital_client = CapitalClient(CAPITAL_CONFIG)
+        
+        # asyncio I/O engine for high fan-out reads (when aiohttp is installed)
+        self.io_engine = AsyncIOEngine() if aiohttp else None
+        self.async_woo_client = AsyncWooCommerceClient(WOOCOMMERCE_CONFIG, self.io_engine) if self.io_engine else None
+        self.async_capital_client = AsyncCapitalClient(CAPITAL_CONFIG, self.io_engine) if self.io_engine else None
+        
         self.db = LocalDatabase()
+        self.snapshot = DataStoreSnapshot()
+        
+        # Fetch/refresh/price update workflows (shared with the headless CLI)
+        self.sync = SyncEngine(
+            self.woo_client, self.capital_client, self.db, self.snapshot,
+            log=self.log, io_engine=self.io_engine, async_woo_client=self.async_woo_client,
+            async_capital_client=self.async_capital_client,
+            run_lock=SyncLock()  # Shared with scheduled `python -m bridge sync` runs
+        )
+        self.rendered_version = None  # DataStore state version shown by refresh_all_ui
+        
+        # All background work runs as jobs on a bounded pool
+        self.jobs = JobManager(max_workers=3)
         
         # Setup UI
         self.setup_ui()
@@ -665,6 +82,36 @@ class BridgeApp(ctk.CTk):
         # Register for data updates
         data_store.add_data_listener(self.on_data_updated)
         data_store.add_loading_listener(self.on_loading_updated)
+        self.jobs.add_listener(self.on_jobs_updated)
+        
+        # Show the last fetched data right away
+        self.load_warm_start()
+        
+        # Periodic delta refreshes and the nightly full reconcile, as
+        # background jobs that give way to user jobs
+        self.scheduler = SyncScheduler(
+            self.sync,
+            self.jobs,
+            delta_minutes=SCHEDULER_CONFIG["delta_interval_minutes"],
+            nightly_time=SCHEDULER_CONFIG["nightly_full_time"],
+            fetch_variations=lambda: self.fetch_variations
+        )
+        self.scheduler.start()
+        
+        # Bulk price updates interrupted last time are re-checked against
+        # the shop, and only resent once the user agrees
+        self.jobs.submit("Check interrupted price updates", self.check_interrupted_price_jobs)
+        
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+    def on_close(self):
+        """Stop background work and close the async I/O engine before the window goes"""
+        self.scheduler.stop()
+        for job in self.jobs.active():
+            self.jobs.cancel(job.job_id)
+        if self.io_engine:
+            self.io_engine.close()
+        self.destroy()
         
     def setup_ui(self):
         """Setup the main UI"""
@@ -714,12 +161,26 @@ class BridgeApp(ctk.CTk):
         )
         self.fetch_btn.grid(row=0, column=2, padx=10, pady=10)
         
+        # Background delta refresh interval
+        interval = SCHEDULER_CONFIG["delta_interval_minutes"]
+        self.auto_refresh_var = ctk.StringVar(value=f"Auto refresh: {interval} min" if interval else "Auto refresh: Off")
+        ctk.CTkOptionMenu(
+            top_frame,
+            variable=self.auto_refresh_var,
+            values=["Auto refresh: Off"] + [f"Auto refresh: {minutes} min" for minutes in (5, 15, 30, 60)],
+            command=self.on_auto_refresh_changed,
+            font=ctk.CTkFont(size=11),
+            width=150
+        ).grid(row=1, column=2, padx=10, pady=(0, 5))
+        
         # Checkbox for including variations (add to top frame)
         self.fetch_variations_var = ctk.BooleanVar(value=False)  # Default to False for speed
+        self.fetch_variations = False  # Copy of the checkbox that jobs read (Tk variables are main-thread only)
         variations_checkbox = ctk.CTkCheckBox(
             top_frame,
             text="Include variations (slower)",
             variable=self.fetch_variations_var,
+            command=self.on_fetch_variations_changed,
             font=ctk.CTkFont(size=11)
         )
         variations_checkbox.grid(row=0, column=3, padx=10, pady=10)
@@ -742,7 +203,7 @@ class BridgeApp(ctk.CTk):
         
     def create_main_content(self):
         """Create main content area with tabview"""
-        self.tabview = ctk.CTkTabview(self)
+        self.tabview = ctk.CTkTabview(self, command=self.on_tab_changed)
         self.tabview.grid(row=1, column=0, sticky="nsew", padx=10, pady=5)
         
         # Create tabs
@@ -751,6 +212,8 @@ class BridgeApp(ctk.CTk):
         self.tab_prices = self.tabview.add("💰 Prices & Discounts")
         self.tab_unmatched = self.tabview.add("🔗 Unmatched")
         self.tab_analytics = self.tabview.add("📈 Analytics")
+        self.tab_jobs = self.tabview.add("⚙️ Jobs")
+        self.tab_performance = self.tabview.add("⏱️ Performance")
         self.tab_logs = self.tabview.add("📋 Logs")
         
         # Initialize tab content
@@ -759,6 +222,8 @@ class BridgeApp(ctk.CTk):
         self.setup_prices_tab()
         self.setup_unmatched_tab()
         self.setup_analytics_tab()
+        self.setup_jobs_tab()
+        self.setup_performance_tab()
         self.setup_logs_tab()
         
     def create_status_bar(self):
@@ -1091,6 +556,7 @@ class BridgeApp(ctk.CTk):
         # Simply call filter_products which will re-apply current filters
         self.filter_products()
     
+    @hot_path('filter_products')
     def filter_products(self):
         """Filter products based on criteria"""
         sku_filter = self.product_sku_filter.get().strip().upper()
@@ -1105,36 +571,9 @@ class BridgeApp(ctk.CTk):
         self.product_checkboxes.clear()
             
         # Filter and display
-        for product in data_store.matched_products:
-            sku = product.get('sku', '')
-            name = product.get('woo_name', '')
-            categories = product.get('woo_categories', [])
-            
-            # Apply filters
-            if sku_filter and sku_filter not in sku.upper():
-                continue
-            if name_filter and name_filter not in name.lower():
-                continue
-            if category_filter != "All Brands":
-                # Match brand against beginning of product name
-                if not name.startswith(category_filter):
-                    continue
-                    
-            # Add to treeview
-            match_status = "✅" if product.get('price_match') else "❌"
-            
-            item_id = self.products_tree.insert("", "end", values=(
-                "☐",  # Unchecked by default
-                sku,
-                name[:50] + "..." if len(name) > 50 else name,
-                f"{product.get('woo_regular_price', 0):.2f}",
-                f"{product.get('capital_rtlprice', 0):.2f}",
-                f"{product.get('woo_sale_price', 0):.2f}" if product.get('woo_sale_price') else "-",
-                f"{product.get('woo_discount_percent', 0):.1f}%" if product.get('woo_discount_percent') is not None else "-",
-                product.get('woo_stock_quantity', '-'),
-                product.get('woo_total_sales', 0),
-                match_status
-            ))
+        rows = products_table_rows(data_store.matched_products, sku_filter, name_filter, category_filter)
+        for values in rows:
+            item_id = self.products_tree.insert("", "end", values=values)
             # Track checkbox state
             self.product_checkboxes[item_id] = False
             
@@ -1194,7 +633,7 @@ class BridgeApp(ctk.CTk):
             
         if updates:
             self.log(f"Updating {len(updates)} products to €{price:.2f}")
-            threading.Thread(target=self.batch_update_prices, args=(updates,)).start()
+            self.submit_price_update(updates)
             self.group_price_entry.delete(0, "end")
         else:
             messagebox.showwarning("Warning", "No valid products found to update")
@@ -1242,7 +681,7 @@ class BridgeApp(ctk.CTk):
                 
         if updates:
             self.log(f"Applying {discount_percent}% discount to {len(updates)} products")
-            threading.Thread(target=self.batch_update_prices, args=(updates,)).start()
+            self.submit_price_update(updates)
             self.group_discount_entry.delete(0, "end")
         else:
             messagebox.showwarning("Warning", "No valid products found to update")
@@ -1264,41 +703,19 @@ class BridgeApp(ctk.CTk):
             values = self.products_tree.item(item, "values")
             sku = values[1]  # SKU is now in column 1 (after checkbox)
             product = data_store.get_product_by_sku(sku)
-            if product:
-                capital_price = product.get('capital_rtlprice')
-                if capital_price and capital_price > 0:
-                    # Get current discount percentage
-                    current_discount = product.get('woo_discount_percent', 0)
-                    
-                    # Format new regular price
-                    new_regular_price = float(capital_price)
-                    price_str = f"{new_regular_price:.2f}"
-                    
-                    # Calculate new sale price to preserve discount percentage
-                    if current_discount is not None and float(current_discount) > 0:
-                        discount_multiplier = (100 - float(current_discount)) / 100
-                        new_sale_price = new_regular_price * discount_multiplier
-                        sale_price_str = f"{new_sale_price:.2f}"
-                        updates.append({
-                            "id": product['woo_id'],
-                            "parent_id": product.get('parent_id'),
-                            "regular_price": price_str,
-                            "sale_price": sale_price_str
-                        })
-                        self.log(f"Syncing {sku}: regular_price={price_str}, sale_price={sale_price_str} ({current_discount}% discount preserved)")
-                    else:
-                        # No discount, just update regular price and clear sale price
-                        updates.append({
-                            "id": product['woo_id'],
-                            "parent_id": product.get('parent_id'),
-                            "regular_price": price_str,
-                            "sale_price": ""
-                        })
-                        self.log(f"Syncing {sku}: regular_price={price_str} (no discount)")
+            # Capital retail price, keeping the current discount percentage
+            update = SyncEngine.capital_price_update(product) if product else None
+            if update:
+                updates.append(update)
+                if update['sale_price']:
+                    self.log(f"Syncing {sku}: regular_price={update['regular_price']}, sale_price={update['sale_price']} "
+                             f"({product.get('woo_discount_percent')}% discount preserved)")
+                else:
+                    self.log(f"Syncing {sku}: regular_price={update['regular_price']} (no discount)")
                 
         if updates:
             self.log(f"Syncing {len(updates)} products to Capital prices")
-            threading.Thread(target=self.batch_update_prices, args=(updates,)).start()
+            self.submit_price_update(updates)
         else:
             messagebox.showwarning("Warning", "No valid Capital prices found to sync")
         
@@ -1504,6 +921,7 @@ class BridgeApp(ctk.CTk):
             fg_color="orange"
         ).grid(row=0, column=3, padx=10, pady=5)
         
+    @hot_path('refresh_prices_table')
     def refresh_prices_table(self):
         """Refresh the prices table"""
         # Clear current items
@@ -1513,36 +931,12 @@ class BridgeApp(ctk.CTk):
         show_mismatches = self.show_mismatches_var.get()
         search_text = self.price_search.get().strip().lower()
         
-        count = 0
-        for product in data_store.matched_products:
-            # Filter by mismatch
-            if show_mismatches and product.get('price_match'):
-                continue
-                
-            # Filter by search
-            if search_text:
-                if (search_text not in product.get('sku', '').lower() and 
-                    search_text not in product.get('woo_name', '').lower()):
-                    continue
-                    
-            woo_price = product.get('woo_regular_price', 0)
-            capital_price = product.get('capital_rtlprice', 0)
-            difference = woo_price - capital_price
-            
-            item_id = self.prices_tree.insert("", "end", values=(
-                "☐",  # Checkbox unchecked by default
-                product.get('sku', ''),
-                product.get('woo_name', '')[:40],
-                f"{woo_price:.2f}",
-                f"{capital_price:.2f}",
-                f"{difference:+.2f}",
-                f"{product.get('woo_sale_price', 0):.2f}" if product.get('woo_sale_price') else "-",
-                f"{product.get('woo_discount_percent', 0):.1f}%" if product.get('woo_discount_percent') is not None else "-"
-            ))
+        rows = prices_table_rows(data_store.matched_products, show_mismatches, search_text)
+        for values in rows:
+            item_id = self.prices_tree.insert("", "end", values=values)
             self.price_checkboxes[item_id] = False  # Track unchecked state
-            count += 1
             
-        self.price_count_label.configure(text=f"{count} products shown")
+        self.price_count_label.configure(text=f"{len(rows)} products shown")
         
     def toggle_all_prices(self):
         """Toggle all checkboxes in prices table"""
@@ -1629,7 +1023,7 @@ class BridgeApp(ctk.CTk):
                 
         if updates:
             self.log(f"Updating {len(updates)} products to Capital prices")
-            threading.Thread(target=self.batch_update_prices, args=(updates,)).start()
+            self.submit_price_update(updates)
         else:
             messagebox.showwarning("Warning", "No valid Capital prices found to update")
             
@@ -1674,7 +1068,7 @@ class BridgeApp(ctk.CTk):
                     })
                     
         if updates:
-            threading.Thread(target=self.batch_update_prices, args=(updates,)).start()
+            self.submit_price_update(updates)
             self.prices_group_discount_entry.delete(0, "end")
             
     def sync_checked_to_capital(self):
@@ -1694,131 +1088,93 @@ class BridgeApp(ctk.CTk):
             values = self.prices_tree.item(item, "values")
             sku = values[1]  # SKU is now in column 1 (after checkbox)
             product = data_store.get_product_by_sku(sku)
-            if product:
-                capital_price = product.get('capital_rtlprice')
-                if capital_price and capital_price > 0:
-                    # Get current discount percentage
-                    current_discount = product.get('woo_discount_percent', 0)
-                    
-                    # Format new regular price
-                    new_regular_price = float(capital_price)
-                    price_str = f"{new_regular_price:.2f}"
-                    
-                    # Calculate new sale price to preserve discount percentage
-                    if current_discount is not None and float(current_discount) > 0:
-                        discount_multiplier = (100 - float(current_discount)) / 100
-                        new_sale_price = new_regular_price * discount_multiplier
-                        sale_price_str = f"{new_sale_price:.2f}"
-                        updates.append({
-                            "id": product['woo_id'],
-                            "parent_id": product.get('parent_id'),
-                            "regular_price": price_str,
-                            "sale_price": sale_price_str
-                        })
-                        self.log(f"Syncing {sku}: regular_price={price_str}, sale_price={sale_price_str} ({current_discount}% discount preserved)")
-                    else:
-                        # No discount, just update regular price and clear sale price
-                        updates.append({
-                            "id": product['woo_id'],
-                            "parent_id": product.get('parent_id'),
-                            "regular_price": price_str,
-                            "sale_price": ""
-                        })
-                        self.log(f"Syncing {sku}: regular_price={price_str} (no discount)")
+            # Capital retail price, keeping the current discount percentage
+            update = SyncEngine.capital_price_update(product) if product else None
+            if update:
+                updates.append(update)
+                if update['sale_price']:
+                    self.log(f"Syncing {sku}: regular_price={update['regular_price']}, sale_price={update['sale_price']} "
+                             f"({product.get('woo_discount_percent')}% discount preserved)")
+                else:
+                    self.log(f"Syncing {sku}: regular_price={update['regular_price']} (no discount)")
                     
         if updates:
             self.log(f"Syncing {len(updates)} products to Capital prices")
-            threading.Thread(target=self.batch_update_prices, args=(updates,)).start()
+            self.submit_price_update(updates)
         else:
             messagebox.showwarning("Warning", "No valid Capital prices found to sync")
             
-    def refresh_from_woocommerce(self, updates):
-        """Refresh specific products from WooCommerce after updates"""
-        try:
-            for update in updates:
-                product_id = update['id']
-                parent_id = update.get('parent_id')
-                try:
-                    # Determine correct endpoint based on whether it's a variation
-                    if parent_id:
-                        # This is a variation
-                        url = f"{WOOCOMMERCE_CONFIG['store_url']}/wp-json/wc/v3/products/{parent_id}/variations/{product_id}"
-                    else:
-                        # This is a regular product
-                        url = f"{WOOCOMMERCE_CONFIG['store_url']}/wp-json/wc/v3/products/{product_id}"
-                    
-                    # Fetch updated product from WooCommerce
-                    response = requests.get(
-                        url,
-                        auth=HTTPBasicAuth(
-                            WOOCOMMERCE_CONFIG['consumer_key'],
-                            WOOCOMMERCE_CONFIG['consumer_secret']
-                        ),
-                        timeout=10
-                    )
-                    if response.status_code == 200:
-                        product_data = response.json()
-                        # Update local cache with fresh data
-                        data_store.update_woo_product_from_api(product_id, product_data)
-                        self.log(f"Refreshed product {product_data.get('sku', product_id)} from WooCommerce")
-                except Exception as e:
-                    self.log(f"Warning: Could not refresh product {product_id}: {str(e)}")
-                    
-        except Exception as e:
-            self.log(f"Error refreshing products from WooCommerce: {str(e)}")
-    
-    def batch_update_prices(self, updates):
-        """Batch update prices in background thread"""
+    def submit_price_update(self, updates):
+        """Queue a price update job, locking the products it writes"""
+        self.jobs.submit(
+            f"Update prices ({len(updates)} products)",
+            lambda cancel: self.batch_update_prices(updates, cancel),
+            resources=[update['id'] for update in updates]
+        )
+        
+    def batch_update_prices(self, updates, cancel=None):
+        """Batch update prices in a job (through the price update outbox)"""
         try:
-            data_store.set_loading(True, 0, "Updating prices...")
-            
-            # Process in batches of 50
-            batch_size = 50
-            for i in range(0, len(updates), batch_size):
-                batch = updates[i:i+batch_size]
-                self.log(f"Sending batch {i//batch_size + 1}: {len(batch)} products")
-                if batch:
-                    self.log(f"Sample update: ID={batch[0]['id']}, regular_price={batch[0].get('regular_price')}, sale_price={batch[0].get('sale_price')}")
-                
-                result = self.woo_client.batch_update_products(batch)
-                
-                # Log any errors from WooCommerce
-                if 'update' in result:
-                    for product in result['update']:
-                        if 'error' in product:
-                            self.log(f"ERROR: Product {product.get('id')} failed: {product['error'].get('message', 'Unknown error')}")
-                        else:
-                            self.log(f"Updated product {product.get('id')}: {product.get('sku', 'N/A')}")
-                
-                progress = min(100, int((i + len(batch)) / len(updates) * 100))
-                data_store.set_loading(True, progress, f"Updated {i + len(batch)}/{len(updates)} products")
-                
-                # Update local cache
-                for update in batch:
-                    local_update = {}
-                    if 'regular_price' in update:
-                        local_update['regular_price'] = float(update['regular_price']) if update['regular_price'] else 0
-                    if 'sale_price' in update:
-                        # Empty string means clear the sale price
-                        local_update['sale_price'] = float(update['sale_price']) if update['sale_price'] else 0
-                    data_store.update_woo_product_locally(update['id'], local_update)
-                    
-            data_store.set_loading(False, 100, "Update complete!")
-            
-            # Refresh products from WooCommerce to get actual updated values
-            self.log("Refreshing products from WooCommerce...")
-            self.refresh_from_woocommerce(updates)
-            
-            # Refresh both Products and Prices tables
-            self.after(0, self.refresh_products_table)
-            self.after(0, self.refresh_prices_table)
-            self.after(100, lambda: messagebox.showinfo("Success", f"Successfully updated {len(updates)} products!"))
+            result = self.sync.apply_price_updates(updates, cancel)
+            if result['job_id'] is None:
+                self.after(0, lambda: messagebox.showinfo("Info", f"All {result['requested']} products already have these prices - nothing to update"))
+                return
+            self.show_price_job_result(result)
             
         except Exception as e:
             data_store.set_loading(False, 0, "Update failed")
             self.after(0, lambda: messagebox.showerror("Error", f"Failed to update prices: {str(e)}"))
             print(f"Batch update error: {e}")
             
+    def show_price_job_result(self, result):
+        """Refresh the price tables and report a finished (or interrupted) price update job"""
+        # Refresh both Products and Prices tables
+        self.after(0, self.refresh_products_table)
+        self.after(0, self.refresh_prices_table)
+        interrupted = result['interrupted']
+        message = f"Successfully updated {result['done']} products!"
+        if result['failed']:
+            message += f"\n{result['failed']} products failed."
+        if result.get('paused'):
+            message += f"\n{result['pending']} products were not sent; you will be asked whether to send them on the next launch."
+        elif interrupted:
+            message += f"\n{result['pending']} products are pending; they will be resent by the next sync or launch."
+        if result.get('skipped'):
+            message += f"\n{result['skipped']} products were already up to date."
+        self.after(100, lambda: messagebox.showinfo("Update interrupted" if interrupted else "Success", message))
+        
+    def check_interrupted_price_jobs(self, cancel=None):
+        """Job: expire stale interrupted or paused price updates and offer to resume the rest"""
+        try:
+            jobs = self.sync.interrupted_price_jobs(include_paused=True)
+        except Exception as e:
+            self.log(f"Error checking interrupted price updates: {str(e)}")
+            return
+        if jobs:
+            self.after(0, lambda: self.confirm_resume_price_jobs(jobs))
+            
+    def confirm_resume_price_jobs(self, jobs):
+        """Ask whether to resend interrupted price updates; No discards them"""
+        remaining = sum(count for _, count in jobs)
+        if messagebox.askyesno(
+            "Resume price updates",
+            f"{len(jobs)} bulk price update(s) were interrupted or cancelled last time. {remaining} products still "
+            f"differ from the prices they would write.\n\nSend these prices now? (No discards them)"
+        ):
+            self.jobs.submit("Resume price updates", self.resume_price_jobs)
+        else:
+            for job_id, _ in jobs:
+                self.sync.cancel_price_job(job_id)
+                
+    def resume_price_jobs(self, cancel=None):
+        """Job to finish price update jobs interrupted by a crash or shutdown, or cancelled"""
+        try:
+            for result in self.sync.resume_price_jobs(cancel, include_paused=True):
+                self.show_price_job_result(result)
+        except Exception as e:
+            data_store.set_loading(False, 0, "Update failed")
+            self.log(f"Error resuming price updates: {str(e)}")
+            
     # ========================================================================
     # UNMATCHED TAB
     # ========================================================================
@@ -2049,49 +1405,16 @@ class BridgeApp(ctk.CTk):
                 return
             
             # Create matched product entry
-            regular_price = float(woo_product.get('regular_price') or 0)
-            sale_price = float(woo_product.get('sale_price') or 0)
-            discount_percent = 0
-            if regular_price > 0 and sale_price > 0:
-                discount_percent = round((1 - sale_price / regular_price) * 100, 2)
-            
-            matched_product = {
-                'sku': woo_sku,
-                'woo_id': woo_product['id'],
-                'parent_id': woo_product.get('parent_id'),
-                'woo_name': woo_product.get('name', ''),
-                'woo_regular_price': regular_price,
-                'woo_sale_price': sale_price,
-                'woo_discount_percent': discount_percent,
-                'woo_stock_quantity': woo_product.get('stock_quantity'),
-                'woo_stock_status': woo_product.get('stock_status'),
-                'woo_total_sales': woo_product.get('total_sales', 0),
-                'woo_description': woo_product.get('description', ''),
-                'woo_short_description': woo_product.get('short_description', ''),
-                'woo_categories': [cat.get('name', '') for cat in woo_product.get('categories', [])],
-                'woo_permalink': woo_product.get('permalink', ''),
-                'woo_date_created': woo_product.get('date_created', ''),
-                'woo_date_modified': woo_product.get('date_modified', ''),
-                
-                'capital_code': capital_product.get('CODE', ''),
-                'capital_descr': capital_product.get('DESCR', ''),
-                'capital_rtlprice': float(capital_product.get('RTLPRICE') or 0),
-                'capital_whsprice': float(capital_product.get('WHSPRICE') or 0),
-                'capital_trmode': capital_product.get('TRMODE', 0),
-                'capital_discount': float(capital_product.get('DISCOUNT') or 0),
-                'capital_maxdiscount': float(capital_product.get('MAXDISCOUNT') or 0),
-                'capital_stock': float(capital_product.get('BALANCEQTY') or 0),
-                
-                'price_match': abs(regular_price - float(capital_product.get('RTLPRICE') or 0)) < 0.01,
-                'manually_matched': True
-            }
-            
-            # Add to matched products
-            data_store.matched_products.append(matched_product)
+            matched_product = ProductMatcher.build_matched_product(
+                woo_product, capital_product, woo_sku, manually_matched=True
+            )
             
-            # Remove from unmatched lists
-            data_store.unmatched_woo = [p for p in data_store.unmatched_woo if p.get('sku', '') != woo_sku]
-            data_store.unmatched_capital = [p for p in data_store.unmatched_capital if p.get('CODE', '') != capital_code]
+            # Add to matched products and remove from unmatched lists
+            data_store.update(lambda state: {
+                'matched_products': state.matched_products + (matched_product,),
+                'unmatched_woo': [p for p in state.unmatched_woo if p.get('sku', '') != woo_sku],
+                'unmatched_capital': [p for p in state.unmatched_capital if p.get('CODE', '') != capital_code],
+            })
             
             # Refresh UI
             data_store.notify_data_changed()
@@ -2137,7 +1460,7 @@ class BridgeApp(ctk.CTk):
         
         ctk.CTkLabel(
             top_sellers_frame,
-            text="🏆 Top Selling Products",
+            text=f"🏆 Top Selling Products (last {SALES_CONFIG['order_window_days']} days)",
             font=ctk.CTkFont(size=16, weight="bold")
         ).pack(pady=10)
         
@@ -2169,6 +1492,13 @@ class BridgeApp(ctk.CTk):
             messagebox.showinfo("Not Found", f"No product found with SKU: {sku}")
             return
             
+        # Windowed sales straight from the daily aggregates
+        sales_summary = self.db.get_sales_summary(sku)
+        sales_lines = "\n".join(
+            f"  - Last {days} days: {window['units']} units | €{window['revenue']:.2f} | {window['velocity']:.2f} units/day"
+            for days, window in sales_summary.items()
+        )
+            
         # Display product details
         details = f"""
 === Product Details for {sku} ===
@@ -2184,6 +1514,7 @@ class BridgeApp(ctk.CTk):
 
 📊 Sales:
   - Total Sales: {product.get('woo_total_sales', 0)} units
+{sales_lines}
 
 📦 Stock:
   - Stock Status: {product.get('woo_stock_status', 'N/A')}
@@ -2202,6 +1533,233 @@ class BridgeApp(ctk.CTk):
         self.product_details_text.delete("1.0", "end")
         self.product_details_text.insert("1.0", details)
         
+    # ========================================================================
+    # JOBS TAB
+    # ========================================================================
+    
+    def setup_jobs_tab(self):
+        """Setup jobs tab (running, queued and recent jobs)"""
+        self.tab_jobs.grid_columnconfigure(0, weight=1)
+        self.tab_jobs.grid_rowconfigure(0, weight=1)
+        
+        tree_frame = ctk.CTkFrame(self.tab_jobs)
+        tree_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+        tree_frame.grid_columnconfigure(0, weight=1)
+        tree_frame.grid_rowconfigure(0, weight=1)
+        
+        columns = ("ID", "Job", "Priority", "State", "Products", "Time")
+        self.jobs_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=15)
+        for column, width in zip(columns, (50, 380, 100, 100, 100, 100)):
+            self.jobs_tree.heading(column, text=column)
+            self.jobs_tree.column(column, width=width)
+            
+        jobs_vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.jobs_tree.yview)
+        self.jobs_tree.configure(yscrollcommand=jobs_vsb.set)
+        self.jobs_tree.grid(row=0, column=0, sticky="nsew")
+        jobs_vsb.grid(row=0, column=1, sticky="ns")
+        
+        ctk.CTkButton(
+            self.tab_jobs,
+            text="⛔ Cancel Selected Job",
+            command=self.cancel_selected_job
+        ).grid(row=1, column=0, pady=10)
+        
+    def on_jobs_updated(self):
+        """Handle job state change (called from worker threads)"""
+        self.after(0, self.refresh_jobs_table)
+        
+    def refresh_jobs_table(self):
+        """Show running and queued jobs, then the most recent finished ones"""
+        self.jobs_tree.delete(*self.jobs_tree.get_children())
+        now = time.time()
+        for job in self.jobs.jobs():
+            if job.started_at:
+                elapsed = (job.finished_at or now) - job.started_at
+                duration = f"{elapsed:.1f}s"
+            else:
+                duration = f"waiting {now - job.submitted_at:.0f}s"
+            self.jobs_tree.insert("", "end", iid=str(job.job_id), values=(
+                job.job_id,
+                job.name + (f" - {job.error}" if job.error else ""),
+                JobManager.PRIORITY_NAMES.get(job.priority, job.priority),
+                job.state,
+                "all" if ALL_PRODUCTS in job.resources else len(job.resources),
+                duration
+            ))
+            
+    def cancel_selected_job(self):
+        """Cancel the job selected in the jobs table"""
+        selection = self.jobs_tree.selection()
+        if not selection:
+            messagebox.showwarning("Warning", "Please select a job to cancel")
+            return
+        self.jobs.cancel(int(selection[0]))
+        self.log(f"Cancel requested for job {selection[0]}")
+        
+    # ========================================================================
+    # PERFORMANCE TAB
+    # ========================================================================
+    
+    PERF_RUN_KINDS = ["All runs", "full_fetch", "delta_refresh", "price_update",
+                      "capital_refresh", "woo_refresh", "ui_refresh"]
+    
+    def on_tab_changed(self):
+        """Load the performance history when its tab is opened"""
+        if self.tabview.get() == "⏱️ Performance":
+            self.refresh_performance_view()
+            
+    def setup_performance_tab(self):
+        """Setup performance tab (recorded runs and per-phase trends)"""
+        self.tab_performance.grid_columnconfigure(0, weight=1)
+        self.tab_performance.grid_rowconfigure(1, weight=1)
+        self.tab_performance.grid_rowconfigure(2, weight=1)
+        
+        controls_frame = ctk.CTkFrame(self.tab_performance)
+        controls_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=10)
+        
+        ctk.CTkLabel(controls_frame, text="Runs:").grid(row=0, column=0, padx=5, pady=5)
+        self.perf_kind_var = ctk.StringVar(value="full_fetch")
+        ctk.CTkOptionMenu(
+            controls_frame,
+            variable=self.perf_kind_var,
+            values=self.PERF_RUN_KINDS,
+            command=lambda choice: self.refresh_performance_view()
+        ).grid(row=0, column=1, padx=5, pady=5)
+        
+        ctk.CTkButton(
+            controls_frame,
+            text="🔄 Refresh",
+            command=self.refresh_performance_view
+        ).grid(row=0, column=2, padx=10, pady=5)
+        
+        ctk.CTkButton(
+            controls_frame,
+            text="🌐 HTTP Diagnostics",
+            command=lambda: HttpDiagnosticsDialog(self)
+        ).grid(row=0, column=3, padx=10, pady=5)
+        
+        ctk.CTkButton(
+            controls_frame,
+            text="🧠 Memory",
+            command=lambda: MemoryReportDialog(self)
+        ).grid(row=0, column=4, padx=10, pady=5)
+        
+        self.profiling_var = ctk.BooleanVar(value=False)
+        ctk.CTkSwitch(
+            controls_frame,
+            text="🔬 Profiling",
+            variable=self.profiling_var,
+            command=self.toggle_profiling
+        ).grid(row=0, column=5, padx=10, pady=5)
+        
+        # Recent runs
+        tree_frame = ctk.CTkFrame(self.tab_performance)
+        tree_frame.grid(row=1, column=0, sticky="nsew", padx=10, pady=5)
+        tree_frame.grid_columnconfigure(0, weight=1)
+        tree_frame.grid_rowconfigure(0, weight=1)
+        
+        columns = ("When", "Run", "Status", "Total", "Requests", "Data", "Retries", "Errors", "Peak RAM", "Slowest phase")
+        self.perf_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=10)
+        for column, width in zip(columns, (140, 110, 80, 80, 80, 90, 70, 70, 90, 260)):
+            self.perf_tree.heading(column, text=column)
+            self.perf_tree.column(column, width=width)
+            
+        perf_vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.perf_tree.yview)
+        self.perf_tree.configure(yscrollcommand=perf_vsb.set)
+        self.perf_tree.grid(row=0, column=0, sticky="nsew")
+        perf_vsb.grid(row=0, column=1, sticky="ns")
+        
+        # Per-phase trends
+        self.perf_trends_text = ctk.CTkTextbox(self.tab_performance, height=200, font=ctk.CTkFont(family="Courier"))
+        self.perf_trends_text.grid(row=2, column=0, sticky="nsew", padx=10, pady=10)
+        
+    def toggle_profiling(self):
+        """Start or stop a profiling session (hot path profiles, stack samples, UI stall log)"""
+        if self.profiling_var.get():
+            try:
+                path = profiler.start(
+                    PROFILING_CONFIG['output_dir'],
+                    sample_interval_ms=PROFILING_CONFIG['sample_interval_ms'],
+                    stall_ms=PROFILING_CONFIG['stall_ms'],
+                    after=self.after
+                )
+            except Exception as e:
+                self.profiling_var.set(False)
+                self.log(f"❌ Could not start profiling: {str(e)}")
+                return
+            self.log(f"🔬 Profiling started - writing to {path}")
+        else:
+            try:
+                path = profiler.stop()
+            except Exception as e:
+                self.log(f"❌ Could not write profiling results: {str(e)}")
+                return
+            if path:
+                self.log(f"🔬 Profiling stopped - results in {path}")
+                messagebox.showinfo(
+                    "Profiling",
+                    f"Profiles, stack samples and the UI stall log were written to:\n{path}"
+                )
+            
+    def table_models(self):
+        """Row values and checkbox maps of the product tables (for the memory report)"""
+        models = {}
+        for name, tree in (("Products table", self.products_tree), ("Prices table", self.prices_tree),
+                           ("Unmatched WooCommerce table", self.unmatched_woo_tree),
+                           ("Unmatched Capital table", self.unmatched_capital_tree)):
+            models[name] = [tree.item(item_id, 'values') for item_id in tree.get_children()]
+        models["Products checkboxes"] = dict(self.product_checkboxes)
+        models["Prices checkboxes"] = dict(self.price_checkboxes)
+        return models
+        
+    def refresh_performance_view(self):
+        """Show the recorded runs of the selected kind and how each phase is trending"""
+        kind = self.perf_kind_var.get()
+        runs = self.db.get_perf_runs(None if kind == "All runs" else kind, limit=100)
+        
+        self.perf_tree.delete(*self.perf_tree.get_children())
+        for run in runs:
+            timed = [span for span in run['spans'] if span['seconds'] is not None]
+            slowest = max(timed, key=lambda span: span['seconds']) if timed else None
+            self.perf_tree.insert("", "end", values=(
+                run['started_at'].replace('T', ' '),
+                run['kind'],
+                run['status'],
+                f"{run['seconds']:.2f}s" if run['seconds'] is not None else "-",
+                run['requests'],
+                f"{(run['bytes'] or 0) / 1_000_000:.1f} MB",
+                run['retries'],
+                run['errors'],
+                f"{run['peak_rss'] / 1_000_000:.0f} MB" if run['peak_rss'] else "-",
+                f"{slowest['name']} ({slowest['seconds']:.2f}s)" if slowest else ""
+            ))
+            
+        self.perf_trends_text.delete("1.0", "end")
+        if kind == "All runs":
+            self.perf_trends_text.insert("1.0", "Select a run type to see its phase trends.")
+            return
+        if not runs:
+            self.perf_trends_text.insert("1.0", f"No {kind} runs recorded yet.")
+            return
+        
+        bars = "▁▂▃▄▅▆▇█"
+        lines = [f"{'Phase':<18} {'Last':>8} {'Median':>8} {'Min':>8} {'Max':>8}  Trend (oldest → newest, {len(runs)} runs)"]
+        for name, trend in perf_trends(runs).items():
+            history = trend['history'][-40:]
+            low, high = min(history), max(history)
+            spark = "".join(
+                bars[int((value - low) / (high - low) * (len(bars) - 1))] if high > low else bars[0]
+                for value in history
+            )
+            change = ""
+            if trend['median'] and trend['last'] > trend['median'] * 1.5:
+                change = "  ▲ slower than usual"
+            lines.append(
+                f"{name:<18} {trend['last']:>7.2f}s {trend['median']:>7.2f}s "
+                f"{trend['min']:>7.2f}s {trend['max']:>7.2f}s  {spark}{change}"
+            )
+        self.perf_trends_text.insert("1.0", "\n".join(lines))
+        
     # ========================================================================
     # LOGS TAB
     # ========================================================================
@@ -2233,150 +1791,75 @@ class BridgeApp(ctk.CTk):
     # ========================================================================
     
     def start_data_fetch(self):
-        """Start fetching data in background thread"""
-        if data_store.is_loading:
+        """Start fetching data as a job (it waits for jobs already running)"""
+        if self.jobs.active(name="Fetch all data"):
             messagebox.showwarning("Warning", "Already fetching data...")
             return
             
         self.fetch_btn.configure(state="disabled", text="⏳ Fetching...")
-        threading.Thread(target=self.fetch_all_data, daemon=True).start()
+        self.jobs.submit(
+            "Fetch all data",
+            self.fetch_all_data,
+            on_done=lambda job: self.after(0, lambda: self.fetch_btn.configure(state="normal", text="📥 Fetch All Data"))
+        )
         
-    def fetch_all_data(self):
+    def fetch_all_data(self, cancel=None):
         """Fetch all data from WooCommerce and Capital"""
         try:
-            data_store.set_loading(True, 0, "Starting data fetch...")
-            self.log("Starting data fetch...")
-            
-            # Fetch WooCommerce products
-            data_store.set_loading(True, 10, "Fetching WooCommerce products...")
-            self.log("Fetching WooCommerce products...")
+            self.sync.full_fetch(fetch_variations=self.fetch_variations, cancel=cancel)
             
-            def woo_progress(progress, status):
-                data_store.set_loading(True, 10 + int(progress * 0.3), status)
-                
-            data_store.woo_products = self.woo_client.get_all_products(progress_callback=woo_progress)
-            self.log(f"Fetched {len(data_store.woo_products)} WooCommerce products")
-            
-            # Fetch product variations for variable products (only if enabled)
-            if self.fetch_variations_var.get():
-                data_store.set_loading(True, 40, "Fetching product variations (parallel)...")
-                self.log("Fetching product variations in parallel...")
-                
-                variation_count = 0
-                variable_products = [p for p in data_store.woo_products if p.get('type') == 'variable']
-                
-                # Parallel fetching with ThreadPoolExecutor
-                def fetch_variations_for_product(product):
-                    """Fetch variations for a single product"""
-                    try:
-                        variations = self.woo_client.get_product_variations(product['id'])
-                        result = []
-                        if variations:
-                            for variation in variations:
-                                variation_product = {
-                                    'id': variation['id'],
-                                    'parent_id': product['id'],
-                                    'name': f"{product['name']} - {', '.join([attr['option'] for attr in variation.get('attributes', [])])}",
-                                    'sku': variation.get('sku', ''),
-                                    'regular_price': variation.get('regular_price', ''),
-                                    'sale_price': variation.get('sale_price', ''),
-                                    'stock_quantity': variation.get('stock_quantity'),
-                                    'stock_status': variation.get('stock_status'),
-                                    'description': variation.get('description', ''),
-                                    'short_description': product.get('short_description', ''),
-                                    'categories': product.get('categories', []),
-                                    'permalink': variation.get('permalink', ''),
-                                    'date_created': variation.get('date_created', ''),
-                                    'date_modified': variation.get('date_modified', ''),
-                                    'total_sales': product.get('total_sales', 0),
-                                    'attributes': variation.get('attributes', []),
-                                    'is_variation': True
-                                }
-                                if variation_product['sku']:
-                                    result.append(variation_product)
-                        return result
-                    except Exception as e:
-                        self.log(f"Error fetching variations for product {product.get('id')}: {e}")
-                        return []
-                
-                # Use ThreadPoolExecutor for parallel fetching (10 concurrent threads)
-                with ThreadPoolExecutor(max_workers=10) as executor:
-                    futures = {executor.submit(fetch_variations_for_product, product): product for product in variable_products}
-                    
-                    completed = 0
-                    for future in as_completed(futures):
-                        variations = future.result()
-                        data_store.woo_products.extend(variations)
-                        variation_count += len(variations)
-                        
-                        completed += 1
-                        if completed % 10 == 0:  # Update progress every 10 products
-                            progress = int(completed / len(variable_products) * 100)
-                            data_store.set_loading(True, 40 + int(progress * 0.05), f"Fetching variations... {completed}/{len(variable_products)}")
-                        
-                self.log(f"Fetched {variation_count} product variations from {len(variable_products)} variable products (parallel mode)")
-            else:
-                self.log("Skipping product variations (checkbox not enabled)")
-                data_store.set_loading(True, 40, "Skipping variations...")
-            
-            # Fetch WooCommerce categories
-            data_store.set_loading(True, 45, "Fetching categories...")
-            data_store.woo_categories = self.woo_client.get_categories()
-            self.log(f"Fetched {len(data_store.woo_categories)} categories")
-            
-            # Fetch WooCommerce orders (last 90 days)
-            data_store.set_loading(True, 50, "Fetching orders...")
-            self.log("Fetching WooCommerce orders...")
-            
-            after_date = (datetime.now() - timedelta(days=90)).isoformat()
-            
-            def order_progress(progress, status):
-                data_store.set_loading(True, 50 + int(progress * 0.2), status)
-                
-            data_store.woo_orders = self.woo_client.get_all_orders(
-                after=after_date,
-                progress_callback=order_progress
-            )
-            self.log(f"Fetched {len(data_store.woo_orders)} orders")
-            
-            # Fetch Capital products
-            data_store.set_loading(True, 75, "Fetching Capital ERP products...")
-            self.log("Fetching Capital ERP products...")
+            # Notify data changed
+            data_store.notify_data_changed()
             
-            data_store.capital_products = self.capital_client.get_products()
-            self.log(f"Fetched {len(data_store.capital_products)} Capital products")
+        except JobCancelled:
+            raise   # Reported as cancelled by the job manager
             
-            # Match products
-            data_store.set_loading(True, 90, "Matching products...")
-            self.log("Matching products...")
+        except Exception as e:
+            error = str(e)
+            self.after(0, lambda: messagebox.showerror("Error", error))
+            
+    def load_warm_start(self):
+        """Load the last snapshot so data is usable before any fetch"""
+        start = time.perf_counter()
+        meta = self.snapshot.load(data_store)
+        if not meta:
+            return
             
-            matched, unmatched_woo, unmatched_capital = ProductMatcher.match_products(
-                data_store.woo_products,
-                data_store.capital_products
+        elapsed = time.perf_counter() - start
+        self.log(f"Loaded snapshot from {meta.get('saved_at')} in {elapsed:.2f}s "
+                 f"({len(data_store.matched_products)} matched products)")
+        data_store.notify_data_changed()
+        
+        if data_store.last_fetch_time:
+            since = data_store.last_fetch_time
+            self.jobs.submit(
+                "Delta refresh",
+                lambda cancel: self.delta_refresh_background(since, cancel),
+                priority=JobManager.BACKGROUND
             )
             
-            data_store.matched_products = matched
-            data_store.unmatched_woo = unmatched_woo
-            data_store.unmatched_capital = unmatched_capital
-            
-            self.log(f"Matched: {len(matched)}, Unmatched WOO: {len(unmatched_woo)}, Unmatched Capital: {len(unmatched_capital)}")
-            
-            # Update fetch time
-            data_store.last_fetch_time = datetime.now()
-            
-            data_store.set_loading(False, 100, "Data fetch complete!")
-            self.log("Data fetch complete!")
-            
-            # Notify data changed
+    def on_auto_refresh_changed(self, choice):
+        """Apply the auto refresh interval picked in the top bar"""
+        minutes = 0 if choice.endswith("Off") else int(choice.split(":")[1].split()[0])
+        self.scheduler.set_interval(minutes)
+        self.log(f"Auto refresh {'every ' + str(minutes) + ' min' if minutes else 'turned off'}")
+        
+    def on_fetch_variations_changed(self):
+        """Keep the plain copy of the variations checkbox that fetch jobs and the scheduler read"""
+        self.fetch_variations = bool(self.fetch_variations_var.get())
+        
+    def delta_refresh_background(self, since, cancel=None):
+        """
+        Background job to bring snapshot data up to date: WooCommerce
+        products modified since the last fetch, plus Capital prices/stock.
+        """
+        try:
+            self.sync.delta_refresh(since, cancel)
             data_store.notify_data_changed()
-            
-        except Exception as e:
-            data_store.set_loading(False, 0, f"Error: {str(e)}")
-            self.log(f"Error fetching data: {str(e)}")
-            self.after(0, lambda: messagebox.showerror("Error", str(e)))
-            
-        finally:
-            self.after(0, lambda: self.fetch_btn.configure(state="normal", text="📥 Fetch All Data"))
+        except JobCancelled:
+            raise   # Reported as cancelled by the job manager
+        except Exception:
+            pass  # Already logged; the snapshot data stays usable
             
     # ========================================================================
     # SELECTIVE REFRESH METHODS
@@ -2398,7 +1881,7 @@ class BridgeApp(ctk.CTk):
             skus.append(sku)
         
         self.log(f"Refreshing Capital prices for {len(skus)} products...")
-        threading.Thread(target=self.refresh_capital_prices_background, args=(skus,), daemon=True).start()
+        self.submit_capital_refresh(skus)
     
     def refresh_woo_prices_for_checked(self):
         """Refresh WooCommerce prices for checked products in Products tab"""
@@ -2422,7 +1905,7 @@ class BridgeApp(ctk.CTk):
                 })
         
         self.log(f"Refreshing WooCommerce prices for {len(products_to_refresh)} products...")
-        threading.Thread(target=self.refresh_woo_prices_background, args=(products_to_refresh,), daemon=True).start()
+        self.submit_woo_refresh(products_to_refresh)
     
     def refresh_capital_prices_for_checked_prices_tab(self):
         """Refresh Capital prices for checked products in Prices tab"""
@@ -2440,7 +1923,7 @@ class BridgeApp(ctk.CTk):
             skus.append(sku)
         
         self.log(f"Refreshing Capital prices for {len(skus)} products...")
-        threading.Thread(target=self.refresh_capital_prices_background, args=(skus,), daemon=True).start()
+        self.submit_capital_refresh(skus)
     
     def refresh_woo_prices_for_checked_prices_tab(self):
         """Refresh WooCommerce prices for checked products in Prices tab"""
@@ -2464,128 +1947,60 @@ class BridgeApp(ctk.CTk):
                 })
         
         self.log(f"Refreshing WooCommerce prices for {len(products_to_refresh)} products...")
-        threading.Thread(target=self.refresh_woo_prices_background, args=(products_to_refresh,), daemon=True).start()
+        self.submit_woo_refresh(products_to_refresh)
     
-    def refresh_capital_prices_background(self, skus):
-        """Background thread to refresh Capital prices for specific SKUs"""
+    def submit_capital_refresh(self, skus):
+        """Queue a Capital price refresh job for these SKUs"""
+        products = (data_store.get_product_by_sku(sku) for sku in skus)
+        self.jobs.submit(
+            f"Refresh Capital prices ({len(skus)} products)",
+            lambda cancel: self.refresh_capital_prices_background(skus, cancel),
+            resources=[product['woo_id'] for product in products if product]
+        )
+        
+    def submit_woo_refresh(self, products_to_refresh):
+        """Queue a WooCommerce price refresh job for these products"""
+        self.jobs.submit(
+            f"Refresh WooCommerce prices ({len(products_to_refresh)} products)",
+            lambda cancel: self.refresh_woo_prices_background(products_to_refresh, cancel),
+            resources=[product['id'] for product in products_to_refresh]
+        )
+        
+    def refresh_capital_prices_background(self, skus, cancel=None):
+        """Job to refresh Capital prices for specific SKUs"""
         try:
-            data_store.set_loading(True, 0, "Refreshing Capital prices...")
-            
-            # Build filter for Capital API to get only these SKUs
-            # Capital API filter format: "CODE IN ('SKU1','SKU2','SKU3')"
-            sku_list = "','".join(skus)
-            filters = f"CODE IN ('{sku_list}')"
-            
-            # Fetch from Capital
-            capital_products = self.capital_client.get_products(filters=filters)
-            self.log(f"Fetched {len(capital_products)} products from Capital")
-            
-            # Update matched products with new Capital prices
-            updated_count = 0
-            for cap_product in capital_products:
-                code = str(cap_product.get('CODE', '')).strip().upper()
-                for i, matched_product in enumerate(data_store.matched_products):
-                    if matched_product.get('sku', '').strip().upper() == code:
-                        # Update Capital fields
-                        data_store.matched_products[i]['capital_rtlprice'] = float(cap_product.get('RTLPRICE') or 0)
-                        data_store.matched_products[i]['capital_whsprice'] = float(cap_product.get('WHSPRICE') or 0)
-                        data_store.matched_products[i]['capital_discount'] = float(cap_product.get('DISCOUNT') or 0)
-                        data_store.matched_products[i]['capital_maxdiscount'] = float(cap_product.get('MAXDISCOUNT') or 0)
-                        data_store.matched_products[i]['capital_stock'] = float(cap_product.get('BALANCEQTY') or 0)
-                        
-                        # Recalculate price match
-                        woo_price = matched_product.get('woo_regular_price', 0)
-                        cap_price = float(cap_product.get('RTLPRICE') or 0)
-                        data_store.matched_products[i]['price_match'] = abs(woo_price - cap_price) < 0.01
-                        
-                        updated_count += 1
-                        self.log(f"Updated Capital price for {code}: €{cap_price:.2f}")
-                        break
-            
-            data_store.set_loading(False, 100, "Capital prices refreshed!")
-            self.log(f"Successfully refreshed {updated_count} Capital prices")
+            updated_count = self.sync.refresh_capital_prices(skus, cancel)
             
             # Notify data changed to refresh UI
             data_store.notify_data_changed()
             
             self.after(0, lambda: messagebox.showinfo("Success", f"Refreshed {updated_count} Capital prices"))
             
+        except JobCancelled:
+            data_store.set_loading(False, 0, "Refresh cancelled")
+            self.log("Capital price refresh cancelled")
+            raise
+            
         except Exception as e:
             data_store.set_loading(False, 0, "Refresh failed")
             self.log(f"Error refreshing Capital prices: {str(e)}")
             self.after(0, lambda: messagebox.showerror("Error", f"Failed to refresh Capital prices: {str(e)}"))
     
-    def refresh_woo_prices_background(self, products_to_refresh):
-        """Background thread to refresh WooCommerce prices for specific products"""
+    def refresh_woo_prices_background(self, products_to_refresh, cancel=None):
+        """Job to refresh WooCommerce prices for specific products"""
         try:
-            data_store.set_loading(True, 0, "Refreshing WooCommerce prices...")
-            
-            updated_count = 0
-            for i, product_info in enumerate(products_to_refresh):
-                try:
-                    product_id = product_info['id']
-                    parent_id = product_info.get('parent_id')
-                    sku = product_info['sku']
-                    
-                    # Determine correct endpoint
-                    if parent_id:
-                        url = f"{WOOCOMMERCE_CONFIG['store_url']}/wp-json/wc/v3/products/{parent_id}/variations/{product_id}"
-                    else:
-                        url = f"{WOOCOMMERCE_CONFIG['store_url']}/wp-json/wc/v3/products/{product_id}"
-                    
-                    # Fetch from WooCommerce
-                    response = requests.get(
-                        url,
-                        auth=HTTPBasicAuth(
-                            WOOCOMMERCE_CONFIG['consumer_key'],
-                            WOOCOMMERCE_CONFIG['consumer_secret']
-                        ),
-                        timeout=10
-                    )
-                    
-                    if response.status_code == 200:
-                        product_data = response.json()
-                        
-                        # Update matched product
-                        for j, matched_product in enumerate(data_store.matched_products):
-                            if matched_product.get('woo_id') == product_id:
-                                # Update WooCommerce fields
-                                regular_price = float(product_data.get('regular_price', 0) or 0)
-                                sale_price = float(product_data.get('sale_price', 0) or 0)
-                                
-                                data_store.matched_products[j]['woo_regular_price'] = regular_price
-                                data_store.matched_products[j]['woo_sale_price'] = sale_price
-                                
-                                # Recalculate discount
-                                if regular_price > 0 and sale_price > 0:
-                                    discount_percent = round((1 - sale_price / regular_price) * 100, 2)
-                                    data_store.matched_products[j]['woo_discount_percent'] = discount_percent
-                                else:
-                                    data_store.matched_products[j]['woo_discount_percent'] = 0
-                                
-                                # Recalculate price match
-                                cap_price = matched_product.get('capital_rtlprice', 0)
-                                data_store.matched_products[j]['price_match'] = abs(regular_price - cap_price) < 0.01
-                                
-                                updated_count += 1
-                                self.log(f"Updated WooCommerce price for {sku}: €{regular_price:.2f}")
-                                break
-                    
-                    # Update progress
-                    progress = int((i + 1) / len(products_to_refresh) * 100)
-                    data_store.set_loading(True, progress, f"Refreshed {i + 1}/{len(products_to_refresh)} products")
-                    
-                except Exception as e:
-                    self.log(f"Error refreshing {sku}: {str(e)}")
-            
-            data_store.set_loading(False, 100, "WooCommerce prices refreshed!")
-            self.log(f"Successfully refreshed {updated_count} WooCommerce prices")
+            updated_count = self.sync.refresh_woo_prices(products_to_refresh, cancel)
             
             # Notify data changed to refresh UI
             data_store.notify_data_changed()
             
             self.after(0, lambda: messagebox.showinfo("Success", f"Refreshed {updated_count} WooCommerce prices"))
             
+        except JobCancelled:
+            data_store.set_loading(False, 0, "Refresh cancelled")
+            self.log("WooCommerce price refresh cancelled")
+            raise
+            
         except Exception as e:
             data_store.set_loading(False, 0, "Refresh failed")
             self.log(f"Error refreshing WooCommerce prices: {str(e)}")
@@ -2606,35 +2021,70 @@ class BridgeApp(ctk.CTk):
     def update_loading_ui(self):
         """Update loading UI elements"""
         self.progress_bar.set(data_store.load_progress / 100)
-        self.status_label.configure(text=data_store.load_status)
+        status = data_store.load_status
+        if data_store.is_loading:
+            phases = data_store.progress.summary()
+            if phases:
+                status = f"{status}  [{phases}]"
+        self.status_label.configure(text=status)
         
+    @hot_path('refresh_all_ui')
     def refresh_all_ui(self):
         """Refresh all UI elements with current data"""
+        # Render one consistent state; skip it if it is already on screen
+        state = data_store.state
+        if state.version == self.rendered_version:
+            return
+        self.rendered_version = state.version
+        with perf.run('ui_refresh', self.db, count_requests=False):
+            self.render_state(state)
+        if self.tabview.get() == "⏱️ Performance":
+            self.refresh_performance_view()
+            
+    def render_state(self, state):
+        """Show one DataStore state in the cards, filters and tables (timed per part)"""
+        perf.begin('overview')
+        
         # Update counts
+        woo_count, capital_count = data_store.product_counts()
         self.counts_label.configure(
-            text=f"WOO: {len(data_store.woo_products)} | CAPITAL: {len(data_store.capital_products)} | MATCHED: {len(data_store.matched_products)}"
+            text=f"WOO: {woo_count} | CAPITAL: {capital_count} | MATCHED: {len(state.matched_products)}"
         )
         
-        # Update last fetch time
-        if data_store.last_fetch_time:
-            self.last_fetch_label.configure(
-                text=f"Last fetch: {data_store.last_fetch_time.strftime('%H:%M:%S')}"
-            )
+        # Update last fetch time (with its age when showing snapshot data)
+        if state.last_fetch_time:
+            if state.snapshot_info:
+                age_minutes = int((datetime.now() - state.last_fetch_time).total_seconds() // 60)
+                age = f"{age_minutes // 60}h {age_minutes % 60}m" if age_minutes >= 60 else f"{age_minutes}m"
+                self.last_fetch_label.configure(
+                    text=f"Last fetch: {state.last_fetch_time.strftime('%d/%m %H:%M')} ({age} ago)"
+                )
+            else:
+                self.last_fetch_label.configure(
+                    text=f"Last fetch: {state.last_fetch_time.strftime('%H:%M:%S')}"
+                )
             
         # Update overview cards
-        self.woo_card.value_label.configure(text=str(len(data_store.woo_products)))
-        self.capital_card.value_label.configure(text=str(len(data_store.capital_products)))
-        self.matched_card.value_label.configure(text=str(len(data_store.matched_products)))
+        self.woo_card.value_label.configure(text=str(woo_count))
+        self.capital_card.value_label.configure(text=str(capital_count))
+        self.matched_card.value_label.configure(text=str(len(state.matched_products)))
         
         # Count price mismatches
-        mismatches = sum(1 for p in data_store.matched_products if not p.get('price_match'))
+        mismatches = sum(1 for p in state.matched_products if not p.get('price_match'))
         self.mismatch_card.value_label.configure(text=str(mismatches))
+        perf.end('overview')
         
         # Update brand filter - extract unique brands from product names
+        perf.begin('brand_filter')
         # Brands are typically the first word/part of the product name (e.g., "3M", "ABICOR BINZEL")
         brands_set = set()
-        for product in data_store.woo_products:
-            name = product.get('name', '')
+        if state.woo_products:
+            names = [product.get('name', '') for product in state.woo_products]
+        else:
+            # Warm start: raw products aren't in the snapshot
+            names = [product.get('woo_name', '') for product in state.matched_products]
+            names += [product.get('name', '') for product in state.unmatched_woo]
+        for name in names:
             # Extract first part of name as brand (before first space or dash)
             if name:
                 # Try to extract brand from beginning of product name
@@ -2647,34 +2097,39 @@ class BridgeApp(ctk.CTk):
         
         brands = ["All Brands"] + sorted(brands_set)
         self.product_category_filter.configure(values=brands)
+        perf.end('brand_filter', len(brands))
         
         # Refresh products table
-        self.filter_products()
+        with perf.span('products_table'):
+            self.filter_products()
         
         # Refresh prices table
-        self.refresh_prices_table()
+        with perf.span('prices_table'):
+            self.refresh_prices_table()
         
         # Refresh unmatched products (now using tree views with search)
-        self.filter_unmatched_products()
+        with perf.span('unmatched_tables'):
+            self.filter_unmatched_products()
             
         # Update top sellers
-        self.update_top_sellers()
+        with perf.span('top_sellers'):
+            self.update_top_sellers()
         
     def update_top_sellers(self):
         """Update top sellers display"""
-        # Sort by total_sales
-        sorted_products = sorted(
-            data_store.matched_products,
-            key=lambda x: x.get('woo_total_sales', 0),
-            reverse=True
-        )[:20]
+        # Read from the sales aggregates, over the order window fetches ingest
+        days = SALES_CONFIG["order_window_days"]
+        top_sellers = self.db.get_top_sellers(limit=20, days=days)
         
         self.top_sellers_text.delete("1.0", "end")
         
-        text = "Top 20 Best Selling Products:\n\n"
-        for i, product in enumerate(sorted_products, 1):
-            text += f"{i}. {product.get('sku', 'N/A')} - {product.get('woo_name', 'N/A')[:40]}\n"
-            text += f"   Sales: {product.get('woo_total_sales', 0)} | Price: €{product.get('woo_regular_price', 0):.2f}\n\n"
+        text = f"Top 20 Best Selling Products (orders of the last {days} days):\n\n"
+        if not top_sellers:
+            text += "No orders from this period yet - fetch data to fill this list.\n"
+        for i, (sku, units, revenue) in enumerate(top_sellers, 1):
+            product = data_store.get_product_by_sku(sku) or {}
+            text += f"{i}. {sku} - {product.get('woo_name', 'N/A')[:40]}\n"
+            text += f"   Sales: {units} | Revenue: €{revenue:.2f} | Price: €{product.get('woo_regular_price', 0):.2f}\n\n"
             
         self.top_sellers_text.insert("1.0", text)
         
@@ -2711,10 +2166,11 @@ class BridgeApp(ctk.CTk):
         if messagebox.askyesno("Confirm", f"Update {len(mismatches)} products to Capital prices?"):
             updates = [{
                 "id": p['woo_id'],
-                "regular_price": str(p['capital_rtlprice'])
+                "parent_id": p.get('parent_id'),
+                "regular_price": f"{float(p['capital_rtlprice']):.2f}"
             } for p in mismatches]
             
-            threading.Thread(target=self.batch_update_prices, args=(updates,)).start()
+            self.submit_price_update(updates)
 
 
 # ============================================================================
@@ -2871,10 +2327,8 @@ class ProductEditorDialog(ctk.CTkToplevel):
             # Update WooCommerce using correct endpoint
             if parent_id:
                 # It's a variation - use variation endpoint
-                endpoint = f"products/{parent_id}/variations/{product_id}"
-                response = self.woo_client.wcapi.put(endpoint, data)
-                if response.status_code not in [200, 201]:
-                    raise Exception(f"WooCommerce API error: {response.status_code} - {response.text}")
+                self.woo_client.update_variation(parent_id, product_id, data)
+                self.db.invalidate_cached_variations([parent_id])
             else:
                 # Regular product
                 self.woo_client.update_product(product_id, data)
@@ -3033,15 +2487,6 @@ class PriceEditorDialog(ctk.CTkToplevel):
             messagebox.showerror("Error", f"Failed to update: {str(e)}")
 
 
-# ============================================================================
-# MAIN ENTRY POINT
-# ============================================================================
-
-if __name__ == "__main__":
-    app = BridgeApp()
-    app.mainloop()
-
-
 class UnmatchedWooEditorDialog(ctk.CTkToplevel):
     """Dialog for editing unmatched WooCommerce products"""
     
@@ -3286,18 +2731,22 @@ class UnmatchedCapitalEditorDialog(ctk.CTkToplevel):
     def save_changes(self):
         """Save changes to local database"""
         try:
-            # Update product data
-            self.product['CODE'] = self.code_entry.get().strip()
-            self.product['NAME'] = self.name_entry.get().strip()
-            self.product['DESCR'] = self.descr_text.get("1.0", "end").strip()
+            # Update product data (on a copy - published records are never modified)
+            product = self.product.copy()
+            product['CODE'] = self.code_entry.get().strip()
+            product['NAME'] = self.name_entry.get().strip()
+            product['DESCR'] = self.descr_text.get("1.0", "end").strip()
             
             rtlprice = self.rtlprice_entry.get().strip()
             if rtlprice:
-                self.product['RTLPRICE'] = float(rtlprice)
+                product['RTLPRICE'] = float(rtlprice)
                 
             whlprice = self.whlprice_entry.get().strip()
             if whlprice:
-                self.product['WHLPRICE'] = float(whlprice)
+                product['WHLPRICE'] = float(whlprice)
+                
+            data_store.replace_unmatched_capital(self.product, product)
+            self.product = product
             
             # Save to database (implement as needed)
             # self.db.update_capital_product(self.product)
@@ -3309,3 +2758,191 @@ class UnmatchedCapitalEditorDialog(ctk.CTkToplevel):
             messagebox.showerror("Error", f"Failed to update: {str(e)}")
 
 
+class HttpDiagnosticsDialog(ctk.CTkToplevel):
+    """Per-endpoint HTTP statistics (latency percentiles, sizes, statuses, retries, connection reuse)"""
+    
+    COLUMNS = ("Endpoint", "Host", "Requests", "p50", "p90", "p99", "Max", "Avg size", "Errors", "Retries", "Reuse")
+    
+    def __init__(self, parent):
+        super().__init__(parent)
+        
+        self.summaries = {}
+        
+        self.title("HTTP Diagnostics")
+        self.geometry("1100x600")
+        self.transient(parent)
+        
+        self.setup_ui()
+        self.refresh()
+        
+    def setup_ui(self):
+        """Setup diagnostics UI"""
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+        
+        controls_frame = ctk.CTkFrame(self)
+        controls_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=10)
+        
+        self.summary_label = ctk.CTkLabel(controls_frame, text="")
+        self.summary_label.pack(side="left", padx=10)
+        
+        for text, command in (("🔄 Refresh", self.refresh), ("💾 Export JSON", self.export_json),
+                              ("💾 Export CSV", self.export_csv), ("🗑️ Reset", self.reset)):
+            ctk.CTkButton(controls_frame, text=text, width=120, command=command).pack(side="right", padx=5)
+            
+        tree_frame = ctk.CTkFrame(self)
+        tree_frame.grid(row=1, column=0, sticky="nsew", padx=10, pady=5)
+        tree_frame.grid_columnconfigure(0, weight=1)
+        tree_frame.grid_rowconfigure(0, weight=1)
+        
+        self.tree = ttk.Treeview(tree_frame, columns=self.COLUMNS, show="headings", height=12)
+        for column, width in zip(self.COLUMNS, (260, 150, 80, 70, 70, 70, 70, 90, 60, 60, 60)):
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=width)
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        vsb.grid(row=0, column=1, sticky="ns")
+        self.tree.bind("<<TreeviewSelect>>", self.show_details)
+        
+        # Latency histogram and status codes of the selected endpoint
+        self.details_text = ctk.CTkTextbox(self, height=180, font=ctk.CTkFont(family="Courier"))
+        self.details_text.grid(row=2, column=0, sticky="nsew", padx=10, pady=10)
+        
+    def refresh(self):
+        """Reload the statistics collected since startup (or the last reset)"""
+        summaries = http_stats.summary()
+        self.summaries = {}
+        self.tree.delete(*self.tree.get_children())
+        for index, summary in enumerate(summaries):
+            item_id = str(index)
+            self.summaries[item_id] = summary
+            reuse = summary['connection_reuse']
+            self.tree.insert("", "end", iid=item_id, values=(
+                summary['endpoint'],
+                summary['host'],
+                summary['requests'],
+                f"{summary['p50_ms']:.0f}ms",
+                f"{summary['p90_ms']:.0f}ms",
+                f"{summary['p99_ms']:.0f}ms",
+                f"{summary['max_ms']:.0f}ms",
+                f"{summary['mean_bytes'] / 1000:.1f} KB",
+                summary['errors'],
+                summary['retries'],
+                f"{reuse:.0%}" if reuse is not None else "-"
+            ))
+        total = sum(summary['requests'] for summary in summaries)
+        self.summary_label.configure(
+            text=f"{total} requests to {len(summaries)} endpoints since {http_stats.started_at.strftime('%d/%m %H:%M:%S')}"
+        )
+        self.details_text.delete("1.0", "end")
+        
+    def show_details(self, event=None):
+        """Latency histogram and status codes of the selected endpoint"""
+        selection = self.tree.selection()
+        if not selection:
+            return
+        summary = self.summaries[selection[0]]
+        peak = max(summary['histogram'].values()) or 1
+        lines = [f"{summary['endpoint']}  ({summary['host']})", ""]
+        for label, count in summary['histogram'].items():
+            lines.append(f"{label:>10} {'█' * round(count / peak * 50):<50} {count}")
+        statuses = ", ".join(f"{status}: {count}" for status, count in summary['statuses'].items())
+        lines += ["", f"Status codes: {statuses}",
+                  f"Total time: {summary['total_seconds']:.1f}s, data: {summary['bytes'] / 1_000_000:.2f} MB "
+                  f"(largest response {summary['max_bytes'] / 1000:.1f} KB), new connections: {summary['new_connections']}"]
+        self.details_text.delete("1.0", "end")
+        self.details_text.insert("1.0", "\n".join(lines))
+        
+    def export_json(self):
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".json", filetypes=[("JSON", "*.json")],
+                                            initialfile="bridge_http_stats.json")
+        if path:
+            http_stats.export_json(path)
+            messagebox.showinfo("Export", f"HTTP statistics saved to {path}", parent=self)
+            
+    def export_csv(self):
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".csv", filetypes=[("CSV", "*.csv")],
+                                            initialfile="bridge_http_stats.csv")
+        if path:
+            http_stats.export_csv(path)
+            messagebox.showinfo("Export", f"HTTP statistics saved to {path}", parent=self)
+            
+    def reset(self):
+        http_stats.reset()
+        self.refresh()
+
+
+class MemoryReportDialog(ctk.CTkToplevel):
+    """Approximate memory use of the loaded data and tables (per collection, record type and field)"""
+    
+    def __init__(self, parent):
+        super().__init__(parent)
+        
+        self.parent = parent
+        self.report = None
+        
+        self.title("Memory Footprint")
+        self.geometry("900x650")
+        self.transient(parent)
+        
+        self.setup_ui()
+        self.refresh()
+        
+    def setup_ui(self):
+        """Setup report UI"""
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+        
+        controls_frame = ctk.CTkFrame(self)
+        controls_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=10)
+        
+        self.summary_label = ctk.CTkLabel(controls_frame, text="")
+        self.summary_label.pack(side="left", padx=10)
+        
+        for text, command in (("🔄 Refresh", self.refresh), ("💾 Export JSON", self.export_json)):
+            ctk.CTkButton(controls_frame, text=text, width=120, command=command).pack(side="right", padx=5)
+            
+        self.report_text = ctk.CTkTextbox(self, font=ctk.CTkFont(family="Courier"), wrap="none")
+        self.report_text.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
+        
+    def refresh(self):
+        """Size the data store in a job (table rows are read here, on the UI thread)"""
+        tables = self.parent.table_models()
+        self.summary_label.configure(text="Measuring...")
+        self.parent.jobs.submit(
+            "Memory report",
+            lambda cancel: memory_report(data_store, tables),
+            resources=(),
+            on_done=lambda job: self.after(0, lambda: self.show(job))
+        )
+        
+    def show(self, job):
+        if not self.winfo_exists():
+            return
+        if job.state != 'done':
+            self.summary_label.configure(text=f"Memory report {job.state}: {job.error or ''}")
+            return
+        self.report = job.result
+        self.summary_label.configure(text="Table sizes count the row values on the Python side; Tk keeps its own copy")
+        self.report_text.delete("1.0", "end")
+        self.report_text.insert("1.0", format_memory_report(self.report, fields=12))
+        
+    def export_json(self):
+        if not self.report:
+            return
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".json", filetypes=[("JSON", "*.json")],
+                                            initialfile="bridge_memory.json")
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.report, f, indent=2, ensure_ascii=False)
+            messagebox.showinfo("Export", f"Memory report saved to {path}", parent=self)
+
+
+# ============================================================================
+# MAIN ENTRY POINT
+# ============================================================================
+
+if __name__ == "__main__":
+    app = BridgeApp()
+    app.mainloop()
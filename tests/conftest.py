@@ -0,0 +1,52 @@
+"""Shared fixtures: a small catalog served by the in-process mock servers"""
+
+import pytest
+
+from bridge.core import WOOCOMMERCE_CONFIG, CAPITAL_CONFIG, DataStore, LocalDatabase, WooCommerceClient, CapitalClient
+from bridge.mock_servers import MockCatalog, MockWooCommerceServer, MockCapitalServer
+from bridge.sync import SyncEngine
+
+
+@pytest.fixture
+def catalog():
+    return MockCatalog.generate(products=120, capital=300, variable_share=0.1, orders=20, seed=7)
+
+
+@pytest.fixture
+def servers(catalog):
+    """Mock WooCommerce and Capital servers as (woo, capital)"""
+    with MockWooCommerceServer(catalog) as woo, MockCapitalServer(catalog) as capital:
+        yield woo, capital
+
+
+@pytest.fixture
+def db(tmp_path):
+    return LocalDatabase(str(tmp_path / "bridge.db"))
+
+
+@pytest.fixture
+def engine(servers, db):
+    """A quiet SyncEngine on the mock servers"""
+    woo, capital = servers
+    return SyncEngine(
+        WooCommerceClient({"store_url": woo.url, "consumer_key": "ck", "consumer_secret": "cs"}, log=lambda message: None),
+        CapitalClient({"base_url": capital.url, "username": "u", "password": "p",
+                       "company": 1, "fiscalyear": 2025, "branch": 1}),
+        db, store=DataStore(), log=lambda message: None
+    )
+
+
+@pytest.fixture
+def configured(servers, monkeypatch):
+    """Point the global client configs at the mock servers"""
+    woo, capital = servers
+    monkeypatch.setitem(WOOCOMMERCE_CONFIG, "store_url", woo.url)
+    monkeypatch.setitem(CAPITAL_CONFIG, "base_url", capital.url)
+    return servers
+
+
+@pytest.fixture
+def cli_paths(tmp_path):
+    """--db/--snapshot/--lock-file arguments in a temporary directory"""
+    return ["--db", str(tmp_path / "bridge.db"), "--snapshot", str(tmp_path / "snapshot.json.gz"),
+            "--lock-file", str(tmp_path / "sync.lock")]
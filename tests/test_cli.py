@@ -0,0 +1,41 @@
+"""python -m bridge sync: the JSON report on stdout"""
+
+import json
+
+from bridge.__main__ import main, EXIT_OK, EXIT_LOCKED
+from bridge.sync import SyncLock
+
+
+def test_sync_report_is_the_only_stdout(configured, cli_paths, capsys):
+    status = main(["sync", "--apply-capital-prices", *cli_paths])
+    out, err = capsys.readouterr()
+    
+    report = json.loads(out)
+    assert status == EXIT_OK
+    assert report['status'] == 'ok'
+    assert report['price_updates']['done'] > 0
+    assert "[DEBUG] Updating" in err
+
+
+def test_dry_run_plans_without_writing(configured, cli_paths, capsys, catalog):
+    before = {product_id: dict(product) for product_id, product in catalog.products.items()}
+    status = main(["sync", "--apply-capital-prices", "--dry-run", *cli_paths])
+    report = json.loads(capsys.readouterr().out)
+    
+    assert status == EXIT_OK
+    assert report['price_updates']['planned'] > 0
+    assert catalog.products == before
+
+
+def test_sync_refuses_while_the_app_holds_the_lock(configured, cli_paths, capsys, catalog):
+    before = {product_id: dict(product) for product_id, product in catalog.products.items()}
+    app_lock = SyncLock(cli_paths[cli_paths.index("--lock-file") + 1])
+    assert app_lock.acquire()
+    try:
+        status = main(["sync", "--apply-capital-prices", *cli_paths])
+    finally:
+        app_lock.release()
+    
+    assert status == EXIT_LOCKED
+    assert json.loads(capsys.readouterr().out)['status'] == 'locked'
+    assert catalog.products == before
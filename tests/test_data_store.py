@@ -0,0 +1,114 @@
+"""DataStore price diffing and delta merges"""
+
+from bridge.core import DataStore, WooProduct, CapitalItem, ProductMatcher
+
+
+def woo_product(product_id, sku, regular_price, sale_price='', **fields):
+    return {'id': product_id, 'sku': sku, 'type': 'simple', 'name': f"Product {sku}",
+            'regular_price': regular_price, 'sale_price': sale_price,
+            'date_modified': '2026-01-01T00:00:00', **fields}
+
+
+def capital_item(code, price, **fields):
+    return {'CODE': code, 'DESCR': f"Item {code}", 'RTLPRICE': price, 'WHSPRICE': price * 0.6,
+            'TRMODE': 1, 'DISCOUNT': 0, 'MAXDISCOUNT': 0, 'BALANCEQTY': 5, **fields}
+
+
+def loaded_store(woo, capital):
+    """A store as a full fetch leaves it"""
+    store = DataStore()
+    woo_products = [WooProduct.from_api(product) for product in woo]
+    capital_products = [CapitalItem.from_api(row) for row in capital]
+    matched, unmatched_woo, unmatched_capital = ProductMatcher.match_products(woo_products, capital_products)
+    store.publish(woo_products=woo_products, capital_products=capital_products, matched_products=matched,
+                  unmatched_woo=unmatched_woo, unmatched_capital=unmatched_capital)
+    return store
+
+
+def warm_started(store):
+    """The same data as a snapshot load leaves it (no raw catalogs)"""
+    state = store.state
+    warm = DataStore()
+    warm.publish(matched_products=state.matched_products, unmatched_woo=state.unmatched_woo,
+                 unmatched_capital=state.unmatched_capital)
+    return warm
+
+
+def test_unchanged_prices_are_dropped():
+    store = loaded_store([woo_product(1, 'A1', '10', '8')], [capital_item('A1', 10)])
+    to_send, skipped = store.drop_unchanged_prices([
+        {'id': 1, 'parent_id': None, 'regular_price': '10.00', 'sale_price': '8.00'}
+    ])
+    assert to_send == []
+    assert skipped == 2
+
+
+def test_price_changed_by_delta_is_sent_back():
+    # Cached 10, a delta refresh brings in 12; writing 10.00 must go out again
+    store = loaded_store([woo_product(1, 'A1', '10')], [capital_item('A1', 10)])
+    store.apply_woo_changes([woo_product(1, 'A1', '12', date_modified='2026-01-02T00:00:00')])
+    assert store.get_product_by_sku('A1')['price_match'] is False
+    
+    to_send, skipped = store.drop_unchanged_prices([
+        {'id': 1, 'parent_id': None, 'regular_price': '10.00', 'sale_price': ''}
+    ])
+    assert to_send == [{'id': 1, 'parent_id': None, 'regular_price': '10.00'}]
+    assert skipped == 1
+
+
+def test_price_diff_after_warm_start():
+    store = warm_started(loaded_store([woo_product(1, 'A1', '10'), woo_product(2, 'B2', '5')],
+                                      [capital_item('A1', 10), capital_item('B2', 7)]))
+    store.apply_woo_changes([woo_product(1, 'A1', '12', date_modified='2026-01-02T00:00:00')])
+    
+    to_send, _ = store.drop_unchanged_prices([
+        {'id': 1, 'parent_id': None, 'regular_price': '10.00', 'sale_price': ''},
+        {'id': 2, 'parent_id': None, 'regular_price': '5.00', 'sale_price': ''},
+    ])
+    assert [update['id'] for update in to_send] == [1]
+
+
+def test_delta_replaces_raw_woo_records():
+    store = loaded_store([woo_product(1, 'A1', '10')], [capital_item('A1', 10)])
+    store.apply_woo_changes([woo_product(1, 'A1', '12'), woo_product(2, 'B2', '5')])
+    assert {p['id']: p['regular_price'] for p in store.woo_products} == {1: '12', 2: '5'}
+
+
+def test_new_woo_product_matches_unmatched_capital_item():
+    store = loaded_store([woo_product(1, 'A1', '10')], [capital_item('A1', 10), capital_item('B2', 5)])
+    updated, newly_matched, removed = store.apply_woo_changes([woo_product(2, 'B2', '5')])
+    assert (updated, newly_matched, removed) == (0, 1, 0)
+    assert store.get_product_by_sku('B2')['capital_code'] == 'B2'
+    assert not store.unmatched_capital
+
+
+def test_trashed_woo_product_frees_its_capital_item():
+    store = warm_started(loaded_store([woo_product(1, 'A1', '10'), woo_product(2, 'B2', '5')],
+                                      [capital_item('A1', 10), capital_item('B2', 5)]))
+    assert store.apply_woo_changes([], removed_ids=[2]) == (0, 0, 1)
+    assert [p['sku'] for p in store.matched_products] == ['A1']
+    assert [p['CODE'] for p in store.unmatched_capital] == ['B2']
+
+
+def test_new_capital_code_matches_unmatched_woo_product():
+    store = loaded_store([woo_product(1, 'A1', '10'), woo_product(2, 'B2', '5')], [capital_item('A1', 10)])
+    rows = [capital_item('A1', 11), capital_item('B2', 5)]
+    assert store.new_capital_codes(rows) == ['B2']
+    
+    counts = store.apply_capital_catalog(rows, new_items=[capital_item('B2', 5)])
+    assert counts == {'updated': 1, 'added': 1, 'removed': 0, 'newly_matched': 1, 'unmatched': 0}
+    assert store.get_product_by_sku('A1')['capital_rtlprice'] == 11
+    assert store.get_product_by_sku('B2')['capital_descr'] == 'Item B2'
+    assert not store.unmatched_woo
+    assert len(store.capital_products) == 2
+
+
+def test_removed_capital_code_unmatches_after_warm_start():
+    store = warm_started(loaded_store([woo_product(1, 'A1', '10'), woo_product(2, 'B2', '5')],
+                                      [capital_item('A1', 10), capital_item('B2', 5), capital_item('C3', 1)]))
+    counts = store.apply_capital_catalog([capital_item('A1', 10)])
+    assert counts == {'updated': 0, 'added': 0, 'removed': 2, 'newly_matched': 0, 'unmatched': 1}
+    assert [p['sku'] for p in store.matched_products] == ['A1']
+    assert [(p['id'], p['sku'], p['regular_price']) for p in store.unmatched_woo] == [(2, 'B2', '5.00')]
+    assert not store.unmatched_capital
+    assert not store.capital_products
@@ -0,0 +1,95 @@
+"""JobManager ordering, preemption and cancellation"""
+
+import threading
+import time
+
+from bridge.jobs import JobManager, JobCancelled
+
+
+def wait_until_cancelled(cancel):
+    """A long job that stops at its next check once cancelled"""
+    while not cancel.cancelled:
+        time.sleep(0.01)
+    cancel.check()
+
+
+def test_jobs_on_the_same_products_run_in_order():
+    jobs = JobManager(max_workers=3)
+    order = []
+    release = threading.Event()
+    
+    jobs.submit("first", lambda cancel: (release.wait(5), order.append("first")), resources=[1])
+    second = jobs.submit("second", lambda cancel: order.append("second"), resources=[1, 2])
+    other = jobs.submit("other", lambda cancel: order.append("other"), resources=[3])
+    
+    assert other.wait(5)
+    assert second.state == 'queued'
+    release.set()
+    assert second.wait(5)
+    assert order == ["other", "first", "second"]
+
+
+def test_user_job_preempts_background_job_in_its_way():
+    jobs = JobManager(max_workers=2)
+    started = threading.Event()
+    
+    def background(cancel):
+        started.set()
+        wait_until_cancelled(cancel)
+        
+    refresh = jobs.submit("refresh", background, priority=JobManager.BACKGROUND)
+    assert started.wait(5)
+    update = jobs.submit("update", lambda cancel: "sent", resources=[7])
+    
+    assert update.wait(5) and refresh.wait(5)
+    assert refresh.state == 'cancelled'
+    assert (update.state, update.result) == ('done', "sent")
+
+
+def test_cancelled_jobs():
+    jobs = JobManager(max_workers=1)
+    started = threading.Event()
+    
+    def long_job(cancel):
+        started.set()
+        wait_until_cancelled(cancel)
+        
+    running = jobs.submit("running", long_job)
+    queued = jobs.submit("queued", lambda cancel: "ran")
+    assert started.wait(5)
+    jobs.cancel(queued.job_id)
+    jobs.cancel(running.job_id)
+    
+    assert running.wait(5) and queued.wait(5)
+    assert running.state == 'cancelled'
+    assert (queued.state, queued.result) == ('cancelled', None)
+
+
+def test_job_finishing_normally_after_cancel_is_done():
+    jobs = JobManager(max_workers=1)
+    started = threading.Event()
+    proceed = threading.Event()
+    
+    def ignores_cancel(cancel):
+        started.set()
+        proceed.wait(5)
+        return "finished"
+        
+    job = jobs.submit("writes", ignores_cancel)
+    assert started.wait(5)
+    jobs.cancel(job.job_id)
+    proceed.set()
+    
+    assert job.wait(5)
+    assert (job.state, job.result) == ('done', "finished")
+
+
+def test_job_raising_job_cancelled_is_cancelled():
+    jobs = JobManager(max_workers=1)
+    
+    def stops(cancel):
+        raise JobCancelled()
+        
+    job = jobs.submit("stops", stops)
+    assert job.wait(5)
+    assert job.state == 'cancelled'
@@ -0,0 +1,60 @@
+"""PerfRecorder attribution of requests to concurrent runs"""
+
+import asyncio
+import threading
+
+from bridge.core import PerfRecorder, ContextThreadPool, RequestTrace
+
+
+def trace():
+    return RequestTrace('GET', 'http://shop.test/wp-json/wc/v3/products', 'shop.test', 'GET /products',
+                        200, 0.01, 100, 0, None, None)
+
+
+def test_pool_requests_count_towards_the_run_that_made_them():
+    recorder = PerfRecorder()
+    both_running = threading.Barrier(2)
+    runs = {}
+    
+    def job(kind, requests):
+        with recorder.run(kind) as run:
+            runs[kind] = run
+            both_running.wait(5)
+            with ContextThreadPool(max_workers=4) as pool:
+                for _ in range(requests):
+                    pool.submit(recorder.add_request, trace())
+            both_running.wait(5)
+            
+    threads = [threading.Thread(target=job, args=('full_fetch', 3)),
+               threading.Thread(target=job, args=('woo_refresh', 5))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (runs['full_fetch'].total.requests, runs['woo_refresh'].total.requests) == (3, 5)
+
+
+def test_io_loop_requests_count_towards_the_awaiting_run():
+    recorder = PerfRecorder()
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    
+    async def request():
+        recorder.add_request(trace())
+        
+    try:
+        with recorder.run('capital_refresh') as run:
+            asyncio.run_coroutine_threadsafe(request(), loop).result(5)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+    assert run.total.requests == 1
+
+
+def test_requests_outside_any_run_are_not_counted():
+    recorder = PerfRecorder()
+    with recorder.run('delta_refresh') as run:
+        other = threading.Thread(target=recorder.add_request, args=(trace(),))
+        other.start()
+        other.join()
+    assert run.total.requests == 0
@@ -0,0 +1,167 @@
+"""Price update outbox: claim/ack, leases, resume after a crash, pause, expiry and idempotent re-apply"""
+
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from bridge.jobs import CancelToken
+
+
+def price_update(product_id, price):
+    return {'id': product_id, 'parent_id': None, 'regular_price': f"{price:.2f}", 'sale_price': ''}
+
+
+def statuses(db, job_id):
+    conn = sqlite3.connect(db.db_path)
+    rows = dict(conn.execute('SELECT woo_id, status FROM price_update_items WHERE job_id = ?', (job_id,)))
+    conn.close()
+    return rows
+
+
+def set_lease(db, job_id, pid, age_seconds):
+    """Hand a job's lease to process pid, last renewed age_seconds ago"""
+    conn = sqlite3.connect(db.db_path)
+    conn.execute("UPDATE price_update_jobs SET owner_pid = ?, claimed_at = datetime('now', ?) WHERE job_id = ?",
+                 (pid, f'-{age_seconds} seconds', job_id))
+    conn.commit()
+    conn.close()
+
+
+def crash(db, job_id):
+    """The process sending the job died: its lease stops being renewed"""
+    set_lease(db, job_id, os.getpid() + 1, 3600)
+
+
+def simple_ids(catalog, count):
+    return [product_id for product_id, product in catalog.products.items() if product['type'] == 'simple'][:count]
+
+
+def test_claim_and_ack(db):
+    job_id = db.create_price_job([price_update(1, 10), price_update(2, 20), price_update(3, 30)])
+    
+    batch = db.claim_price_items(job_id, 2)
+    assert [update['id'] for update in batch] == [1, 2]
+    assert statuses(db, job_id) == {1: 'claimed', 2: 'claimed', 3: 'pending'}
+    
+    db.ack_price_items(job_id, done_ids=[1], retry_ids=[2])
+    db.ack_price_items(job_id, done_ids=[1], retry_ids=[2])  # a second ack changes nothing
+    assert statuses(db, job_id) == {1: 'done', 2: 'pending', 3: 'pending'}
+    
+    assert [update['id'] for update in db.claim_price_items(job_id, 10)] == [2, 3]
+    db.ack_price_items(job_id, done_ids=[2], failed={3: "Invalid ID"})
+    assert db.finish_price_job(job_id) == {'done': 2, 'failed': 1}
+    assert db.get_unfinished_price_jobs() == []
+
+
+def test_claimed_items_go_back_to_pending_after_a_crash(db):
+    job_id = db.create_price_job([price_update(1, 10), price_update(2, 20)])
+    db.claim_price_items(job_id, 1)
+    crash(db, job_id)
+    
+    [(unfinished_id, remaining, age_hours)] = db.get_unfinished_price_jobs()
+    assert (unfinished_id, remaining) == (job_id, 2)
+    assert age_hours < 1
+    assert statuses(db, job_id) == {1: 'pending', 2: 'pending'}
+
+
+def test_resume_sends_the_remaining_items(engine, db, catalog):
+    ids = simple_ids(catalog, 3)
+    job_id = db.create_price_job([price_update(product_id, 99.5) for product_id in ids])
+    db.claim_price_items(job_id, 1)  # interrupted while sending the first batch
+    crash(db, job_id)
+    
+    [result] = engine.resume_price_jobs()
+    assert (result['job_id'], result['done'], result['pending'], result['interrupted']) == (job_id, 3, 0, False)
+    assert all(catalog.products[product_id]['regular_price'] == "99.50" for product_id in ids)
+
+
+def test_resume_skips_prices_already_applied(engine, db, catalog, servers):
+    engine.full_fetch()
+    
+    # The batch went out but the process died before it was acknowledged
+    ids = simple_ids(catalog, 3)
+    updates = [price_update(product_id, 42) for product_id in ids]
+    job_id = db.create_price_job(updates)
+    batch = db.claim_price_items(job_id, 2)
+    engine.woo_client.batch_update_products(batch)
+    crash(db, job_id)
+    woo, _ = servers
+    
+    [(resumed_id, remaining)] = engine.interrupted_price_jobs()
+    assert (resumed_id, remaining) == (job_id, 1)
+    assert statuses(db, job_id) == {ids[0]: 'skipped', ids[1]: 'skipped', ids[2]: 'pending'}
+    
+    engine.resume_price_jobs()
+    assert db.finish_price_job(job_id) == {'done': 1, 'skipped': 2}
+    
+    # Applying the same updates again writes nothing
+    requests_before = woo.requests
+    result = engine.apply_price_updates(updates)
+    assert (result['job_id'], result['skipped']) == (None, 3)
+    assert woo.requests == requests_before
+
+
+def test_old_jobs_expire_unsent(engine, db, catalog):
+    product_id = simple_ids(catalog, 1)[0]
+    before = catalog.products[product_id]['regular_price']
+    job_id = db.create_price_job([price_update(product_id, 1)])
+    conn = sqlite3.connect(db.db_path)
+    conn.execute("UPDATE price_update_jobs SET created_at = datetime('now', '-3 days') WHERE job_id = ?", (job_id,))
+    conn.commit()
+    conn.close()
+    crash(db, job_id)
+    
+    assert engine.resume_price_jobs(max_age_hours=24) == []
+    assert catalog.products[product_id]['regular_price'] == before
+    assert statuses(db, job_id) == {product_id: 'expired'}
+    assert db.get_unfinished_price_jobs() == []
+
+
+def test_cancelled_jobs_are_not_resumed(engine, db, catalog):
+    product_id = simple_ids(catalog, 1)[0]
+    job_id = db.create_price_job([price_update(product_id, 1)])
+    engine.cancel_price_job(job_id)
+    
+    assert engine.resume_price_jobs() == []
+    assert statuses(db, job_id) == {product_id: 'cancelled'}
+
+
+def test_jobs_of_a_live_process_are_left_alone(engine, db, catalog):
+    product_id = simple_ids(catalog, 1)[0]
+    before = catalog.products[product_id]['regular_price']
+    job_id = db.create_price_job([price_update(product_id, 1)])
+    db.claim_price_items(job_id, 1)
+    set_lease(db, job_id, os.getpid() + 1, 10)  # another process, renewed 10 seconds ago
+    
+    assert db.get_unfinished_price_jobs() == []
+    assert statuses(db, job_id) == {product_id: 'claimed'}
+    assert not db.lease_price_job(job_id)
+    assert engine.resume_price_jobs() == []
+    assert catalog.products[product_id]['regular_price'] == before
+
+
+def test_concurrent_claims_do_not_overlap(db):
+    job_id = db.create_price_job([price_update(product_id, 10) for product_id in range(1, 201)])
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        batches = list(pool.map(lambda _: db.claim_price_items(job_id, 10), range(20)))
+    claimed = [update['id'] for batch in batches for update in batch]
+    assert sorted(claimed) == list(range(1, 201))
+
+
+def test_cancelled_update_is_paused_until_the_user_resumes_it(engine, db, catalog):
+    engine.full_fetch()
+    ids = simple_ids(catalog, 3)
+    before = {product_id: catalog.products[product_id]['regular_price'] for product_id in ids}
+    cancel = CancelToken()
+    cancel.cancel()
+    
+    result = engine.apply_price_updates([price_update(product_id, 77) for product_id in ids], cancel)
+    assert (result['paused'], result['pending']) == (True, 3)
+    
+    # Unattended runs (the CLI) never send it
+    assert engine.resume_price_jobs() == []
+    assert {product_id: catalog.products[product_id]['regular_price'] for product_id in ids} == before
+    
+    [resumed] = engine.resume_price_jobs(include_paused=True)
+    assert (resumed['job_id'], resumed['done'], resumed['paused']) == (result['job_id'], 3, False)
+    assert all(catalog.products[product_id]['regular_price'] == "77.00" for product_id in ids)
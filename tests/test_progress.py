@@ -0,0 +1,31 @@
+"""ProgressChannel phases of concurrent tasks"""
+
+import threading
+
+from bridge.core import DataStore
+
+
+def test_finishing_a_task_keeps_the_phases_of_others():
+    store = DataStore()
+    started = threading.Event()
+    finish = threading.Event()
+    
+    def other_job():
+        with store.progress.task("woo_refresh"):
+            store.progress.begin("Products", 10)
+            store.progress.advance("Products", 4)
+            started.set()
+            finish.wait(5)
+            
+    thread = threading.Thread(target=other_job)
+    thread.start()
+    started.wait(5)
+    with store.progress.task("capital_refresh"):
+        store.progress.begin("Products", 3)
+        assert "woo_refresh: Products 4/10" in store.progress.summary()
+        store.set_loading(False, 100, "Capital prices refreshed!")
+        
+    assert [(p['task'], p['phase'], p['done']) for p in store.progress.phases()] == [('woo_refresh', 'Products', 4)]
+    finish.set()
+    thread.join()
+    assert store.progress.phases() == []
@@ -0,0 +1,61 @@
+"""Per-endpoint request statistics: templates, statuses, connection reuse and export"""
+
+import csv
+import json
+
+import requests
+
+from bridge.core import TrafficController, RequestStats, EndpointStats
+from bridge.mock_servers import MockWooCommerceServer, MockCapitalServer
+
+
+def by_endpoint(stats):
+    return {summary['endpoint']: summary for summary in stats.summary()}
+
+
+def test_requests_are_grouped_by_endpoint_template(catalog, tmp_path):
+    controller = TrafficController(requests_per_second=1000)
+    stats = RequestStats()
+    controller.add_observer(stats.record)
+    parents = list(catalog.variations)[:3]
+    
+    with MockWooCommerceServer(catalog) as woo, MockCapitalServer(catalog) as capital, requests.Session() as session:
+        for parent_id in parents:
+            url = f"{woo.url}/wp-json/wc/v3/products/{parent_id}/variations"
+            assert controller.request('GET', url, session=session).status_code == 200
+        assert controller.request('GET', f"{woo.url}/wp-json/wc/v3/products/999999", session=session).status_code == 404
+        
+        login = controller.request('POST', capital.url, session=session, json={'service': 'login', 'username': 'u'})
+        for _ in range(2):
+            controller.request('POST', capital.url, session=session, json={
+                'service': 'getdata', 'tablename': 'STOCKITEMS', 'sessionid': login.json()['sessionid']
+            })
+    endpoints = by_endpoint(stats)
+    
+    assert set(endpoints) == {'GET /products/{id}/variations', 'GET /products/{id}', 'login', 'getdata STOCKITEMS'}
+    variations = endpoints['GET /products/{id}/variations']
+    assert (variations['requests'], variations['errors'], variations['statuses']) == (3, 0, {'200': 3})
+    assert endpoints['GET /products/{id}']['statuses'] == {'404': 1}
+    assert endpoints['GET /products/{id}']['errors'] == 1
+    assert endpoints['getdata STOCKITEMS']['requests'] == 2
+    
+    # One keep-alive connection per host: only each host's first request opens one
+    assert (variations['new_connections'], variations['connection_reuse']) == (1, 0.667)
+    assert (endpoints['login']['new_connections'], endpoints['getdata STOCKITEMS']['connection_reuse']) == (1, 1.0)
+    
+    assert variations['p50_ms'] <= variations['p90_ms'] <= variations['p99_ms'] <= variations['max_ms']
+    assert sum(variations['histogram'].values()) == 3
+    
+    csv_path = tmp_path / "http_stats.csv"
+    stats.export_csv(str(csv_path))
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = {row['endpoint']: row for row in csv.DictReader(f)}
+    assert set(rows) == set(endpoints)
+    assert rows['GET /products/{id}/variations']['statuses'] == '200=3'
+    assert rows['getdata STOCKITEMS']['requests'] == '2'
+    assert sum(int(rows['GET /products/{id}/variations'][label]) for label in EndpointStats.bucket_labels()) == 3
+    
+    json_path = tmp_path / "http_stats.json"
+    stats.export_json(str(json_path))
+    with open(json_path, encoding='utf-8') as f:
+        assert json.load(f)['endpoints'] == stats.summary()
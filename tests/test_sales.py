@@ -0,0 +1,41 @@
+"""Sales aggregates: re-ingesting orders applies only what changed"""
+
+from datetime import datetime, timedelta
+
+
+def order(order_id, status, lines, days_ago=1):
+    day = (datetime.now() - timedelta(days=days_ago)).strftime('%Y-%m-%dT%H:%M:%S')
+    return {
+        'id': order_id,
+        'status': status,
+        'date_created': day,
+        'line_items': [
+            {'id': line_id, 'sku': sku, 'quantity': quantity, 'total': f"{total:.2f}"}
+            for line_id, sku, quantity, total in lines
+        ],
+    }
+
+
+def test_reingesting_an_order_applies_only_the_difference(db):
+    lines = [(11, 'sku-a', 3, 30.0), (12, 'SKU-B', 1, 15.0)]
+    assert db.ingest_order_lines([order(1, 'processing', lines), order(2, 'completed', [(21, 'SKU-A', 2, 20.0)])]) == 3
+    assert db.get_top_sellers(days=90) == [('SKU-A', 5, 50.0), ('SKU-B', 1, 15.0)]
+    
+    # Unchanged orders change nothing
+    assert db.ingest_order_lines([order(1, 'processing', lines)]) == 0
+    assert db.get_top_sellers(days=90) == [('SKU-A', 5, 50.0), ('SKU-B', 1, 15.0)]
+    
+    # A quantity edit moves only its own line
+    assert db.ingest_order_lines([order(1, 'processing', [(11, 'SKU-A', 4, 40.0), (12, 'SKU-B', 1, 15.0)])]) == 1
+    assert db.get_sales_summary('sku-a')[7] == {'units': 6, 'revenue': 60.0, 'velocity': 6 / 7}
+    
+    # Cancelling the order takes all of its lines back out
+    assert db.ingest_order_lines([order(1, 'cancelled', lines)]) == 2
+    assert db.get_top_sellers(days=90) == [('SKU-A', 2, 20.0)]
+    assert db.get_top_sellers() == [('SKU-A', 2, 20.0)]
+
+
+def test_top_sellers_window_leaves_out_older_orders(db):
+    db.ingest_order_lines([order(1, 'completed', [(11, 'OLD', 9, 90.0)], days_ago=200),
+                           order(2, 'completed', [(21, 'NEW', 1, 10.0)])])
+    assert db.get_top_sellers(days=90) == [('NEW', 1, 10.0)]
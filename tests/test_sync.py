@@ -0,0 +1,130 @@
+"""SyncEngine against the mock servers"""
+
+import os
+import threading
+from datetime import timedelta
+
+import pytest
+
+from bridge.core import DataStore, traffic
+from bridge.jobs import CancelToken, JobCancelled
+from bridge.sync import SyncEngine, SyncLock
+
+
+def catalog_state(store):
+    """Matched pairs and unmatched products, leaving out variations (a delta does not refetch them)"""
+    return ({(p['woo_id'], p['capital_code']) for p in store.matched_products if not p.get('parent_id')},
+            {p['id'] for p in store.unmatched_woo if not p.get('parent_id')})
+
+
+def test_delta_refresh_matches_a_full_fetch(engine, catalog):
+    engine.full_fetch()
+    since = engine.store.last_fetch_time
+    changes = catalog.evolve(churn=0.1, added=0.05, removed=0.05, modified_at=since + timedelta(seconds=1))
+    assert changes['removed'] and changes['capital_added'] and changes['capital_removed']
+    
+    summary = engine.delta_refresh(since)
+    assert summary['woo_removed'] and summary['capital_added'] and summary['capital_removed']
+    
+    fresh = SyncEngine(engine.woo_client, engine.capital_client, engine.db, store=DataStore(),
+                       log=lambda message: None)
+    fresh.full_fetch()
+    assert catalog_state(engine.store) == catalog_state(fresh.store)
+    assert {p['id'] for p in engine.store.woo_products} == {p['id'] for p in fresh.store.woo_products}
+
+
+def variable_parent(catalog):
+    """A variable product of the mock catalog and its first variation with an SKU"""
+    for parent_id, variations in catalog.variations.items():
+        for variation in variations.values():
+            if variation.get('sku'):
+                return catalog.products[parent_id], variation
+    raise AssertionError("catalog has no variations")
+
+
+def test_parent_listed_without_variations_leaves_the_index(db):
+    db.index_variations({1: [{'id': 11, 'sku': 'V-11'}, {'id': 12, 'sku': 'V-12'}]})
+    db.index_variations({1: []})
+    assert db.get_parent_variations(1) == []
+    assert db.find_variation_by_sku('V-11') is None
+
+
+def test_delta_refresh_updates_indexed_variations(engine, catalog):
+    engine.full_fetch(fetch_variations=True)
+    since = engine.store.last_fetch_time
+    parent, variation = variable_parent(catalog)
+    stamp = (since + timedelta(seconds=1)).isoformat(timespec='seconds')
+    with catalog.lock:
+        variation.update(regular_price='999.00', date_modified=stamp)
+        parent['date_modified'] = stamp
+        
+    engine.delta_refresh(since)
+    assert engine.store.get_product_by_sku(variation['sku'])['woo_regular_price'] == 999
+
+
+def test_new_capital_code_matches_an_indexed_variation(engine, catalog):
+    engine.full_fetch(fetch_variations=True)
+    _, variation = variable_parent(catalog)
+    code = variation['sku'].strip().upper()
+    with catalog.lock:
+        row = next(row for row in catalog.capital if str(row['CODE']).strip().upper() == code)
+        catalog.capital.remove(row)
+    engine.full_fetch(fetch_variations=False)
+    since = engine.store.last_fetch_time
+    assert engine.store.get_product_by_sku(code) is None
+    
+    with catalog.lock:
+        catalog.capital.append(row)
+    summary = engine.delta_refresh(since)
+    matched = engine.store.get_product_by_sku(code)
+    assert matched['woo_id'] == variation['id'] and matched['parent_id']
+    assert summary['newly_matched'] == 1
+
+
+def test_parent_without_variations_is_cached(engine, catalog):
+    parent, _ = variable_parent(catalog)
+    with catalog.lock:
+        catalog.variations[parent['id']] = {}
+    engine.full_fetch(fetch_variations=True)
+    assert engine.db.get_cached_variations({parent['id']: parent['date_modified']}) == {parent['id']: []}
+
+
+def test_failed_variation_listing_is_not_cached(engine, catalog, monkeypatch):
+    engine.full_fetch(fetch_variations=True)
+    parent, variation = variable_parent(catalog)
+    with catalog.lock:
+        parent['date_modified'] = (engine.store.last_fetch_time + timedelta(seconds=1)).isoformat(timespec='seconds')
+    request = traffic.request
+    
+    def failing_request(method, url, **kwargs):
+        if url.endswith(f"/products/{parent['id']}/variations"):
+            raise ConnectionError("connection reset")
+        return request(method, url, **kwargs)
+    monkeypatch.setattr(traffic, 'request', failing_request)
+    engine.full_fetch(fetch_variations=True)
+    assert engine.db.get_cached_variations({parent['id']: parent['date_modified']}) == {}
+    assert engine.db.get_parent_variations(parent['id'])
+    
+    monkeypatch.setattr(traffic, 'request', request)
+    engine.full_fetch(fetch_variations=True)
+    assert engine.store.get_product_by_sku(variation['sku'])
+
+
+def test_fetch_waits_while_another_process_holds_the_run_lock(engine, tmp_path):
+    path = str(tmp_path / "sync.lock")
+    other = SyncLock(path)  # a CLI run
+    assert other.acquire()
+    engine.run_lock = SyncLock(path)
+    engine.run_lock.POLL_SECONDS = 0.01
+    cancel = CancelToken()
+    threading.Timer(0.2, cancel.cancel).start()
+    with pytest.raises(JobCancelled):
+        engine.full_fetch(cancel=cancel)
+    assert not engine.store.woo_products
+    
+    other.release()
+    assert engine.run_lock.acquire()  # an overlapping job of the same app shares the lock
+    engine.full_fetch()
+    assert engine.store.woo_products and os.path.exists(path)
+    engine.run_lock.release()
+    assert not os.path.exists(path)
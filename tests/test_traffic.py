@@ -0,0 +1,143 @@
+"""TrafficController: AIMD window, retries, Retry-After, rate budget and async gating"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from bridge.core import TrafficController
+from bridge.mock_servers import Faults, MockWooCommerceServer
+
+
+def test_acquire_async_waits_for_release():
+    controller = TrafficController(requests_per_second=1000, initial_concurrency=1)
+    limiter = controller.host("http://shop.test/wp-json/wc/v3/products")
+    controller.acquire(limiter)
+    
+    attempts = []
+    try_acquire = controller._try_acquire
+    controller._try_acquire = lambda limiter: attempts.append(1) or try_acquire(limiter)
+    
+    async def wait_for_slot():
+        start = time.perf_counter()
+        await controller.acquire_async(limiter)
+        return time.perf_counter() - start
+        
+    threading.Timer(0.3, controller.release, args=(limiter, 0.01), kwargs={'status': 200}).start()
+    waited = asyncio.run(wait_for_slot())
+    
+    assert 0.25 < waited < 0.9
+    assert len(attempts) == 2      # Once before waiting, once when woken
+    assert limiter.in_flight == 1
+
+
+def products_url(server):
+    return f"{server.url}/wp-json/wc/v3/products"
+
+
+def attempts(controller):
+    """Observer collecting (attempt, status) of every request attempt"""
+    seen = []
+    controller.add_observer(lambda trace: seen.append((trace.attempt, trace.status)))
+    return seen
+
+
+def test_window_grows_on_healthy_responses(catalog):
+    controller = TrafficController(requests_per_second=1000, initial_concurrency=4)
+    with MockWooCommerceServer(catalog) as woo:
+        for _ in range(20):
+            assert controller.request('GET', products_url(woo)).status_code == 200
+    limiter = controller.host(products_url(woo))
+    
+    # About one request more per window's worth of healthy responses
+    assert 7 < limiter.limit < 9
+    assert (limiter.requests, limiter.errors, limiter.throttled) == (20, 0, 0)
+
+
+def test_429_waits_for_retry_after_and_halves_the_window(catalog):
+    controller = TrafficController(requests_per_second=1000, initial_concurrency=8)
+    seen = attempts(controller)
+    with MockWooCommerceServer(catalog, Faults(rate_429=1.0, retry_after=1)) as woo:
+        # Only the first attempt is throttled
+        controller.add_observer(lambda trace: setattr(woo.faults, 'rate_429', 0.0))
+        start = time.perf_counter()
+        response = controller.request('GET', products_url(woo))
+        waited = time.perf_counter() - start
+    limiter = controller.host(products_url(woo))
+    
+    assert response.status_code == 200
+    assert seen == [(0, 429), (1, 200)]
+    assert 1.0 <= waited < 2.0
+    assert limiter.throttled == 1
+    assert 4 <= limiter.limit < 5      # Halved from 8, then grown by the success
+
+
+def test_persistent_503_gives_up_after_max_retries(catalog):
+    controller = TrafficController(requests_per_second=1000, initial_concurrency=8, max_retries=2)
+    controller._retry_after = lambda value, attempt: 0.0   # No back-off pauses in the test
+    seen = attempts(controller)
+    with MockWooCommerceServer(catalog, Faults(rate_5xx=1.0)) as woo:
+        response = controller.request('GET', products_url(woo))
+    limiter = controller.host(products_url(woo))
+    
+    assert response.status_code == 503
+    assert seen == [(0, 503), (1, 503), (2, 503)]
+    assert woo.requests == 3
+    assert (limiter.errors, limiter.throttled) == (3, 3)
+    assert limiter.limit == 4       # Halved at most once per second
+
+
+def test_random_503s_are_retried(catalog):
+    controller = TrafficController(requests_per_second=1000, initial_concurrency=4, max_retries=5)
+    controller._retry_after = lambda value, attempt: 0.0
+    seen = attempts(controller)
+    with MockWooCommerceServer(catalog, Faults(rate_5xx=0.2, seed=3)) as woo:
+        statuses = [controller.request('GET', products_url(woo)).status_code for _ in range(30)]
+    limiter = controller.host(products_url(woo))
+    
+    failures = sum(1 for _, status in seen if status == 503)
+    assert statuses == [200] * 30
+    assert failures and len(seen) == woo.requests == 30 + failures
+    assert sum(1 for attempt, _ in seen if attempt > 0) == failures
+    assert limiter.errors == failures
+
+
+def test_slow_responses_halve_the_window():
+    controller = TrafficController(requests_per_second=1000, initial_concurrency=8)
+    limiter = controller.host("http://shop.test/wp-json/wc/v3/products")
+    for _ in range(5):
+        controller.acquire(limiter)
+        controller.release(limiter, 0.01, status=200)
+    grown = limiter.limit
+    
+    controller.acquire(limiter)
+    controller.release(limiter, 6.0, status=200)   # Latency average jumps above SLOW_MINIMUM
+    assert limiter.limit == grown / 2
+    assert limiter.errors == 1
+
+
+def test_retry_after_header():
+    retry_after = TrafficController._retry_after
+    assert retry_after("3", 0) == 3.0
+    assert retry_after("-1", 0) == 0.0
+    in_ten_seconds = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=10), usegmt=True)
+    assert 8 < retry_after(in_ten_seconds, 0) <= 10
+    assert retry_after("Wed, 21 Oct 2015 07:28:00 GMT", 0) == 0.0
+    
+    # Missing or unreadable: exponential back-off by attempt
+    assert retry_after(None, 0) == 1.0
+    assert retry_after("soon", 3) == 8.0
+
+
+def test_token_bucket_caps_the_request_rate():
+    controller = TrafficController(requests_per_second=50, initial_concurrency=32)
+    limiter = controller.host("http://shop.test/wp-json/wc/v3/products")
+    start = time.perf_counter()
+    for _ in range(100):
+        controller.acquire(limiter)
+        controller.release(limiter, 0.001, status=200)
+    elapsed = time.perf_counter() - start
+    
+    # A full bucket covers the first 50; the rest come at 50 per second
+    assert 0.9 < elapsed < 1.5
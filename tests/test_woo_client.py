@@ -0,0 +1,55 @@
+"""WooCommerceClient listings"""
+
+import pytest
+
+from bridge.core import WooCommerceClient
+
+
+class PageCheckpoint:
+    """In-memory stand-in for a FetchCheckpoint phase"""
+    
+    def __init__(self):
+        self.pages = {}
+        
+    def get(self, part):
+        return self.pages.get(part)
+        
+    def put(self, part, data):
+        self.pages[part] = data
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def client(servers):
+    woo, _ = servers
+    return WooCommerceClient({"store_url": woo.url, "consumer_key": "ck", "consumer_secret": "cs"},
+                             log=lambda message: None)
+
+
+def test_resumed_listing_sees_products_created_meanwhile(client, catalog):
+    checkpoint = PageCheckpoint()
+    
+    def interrupt(progress, status, fetched=0, total=None):
+        raise Interrupted()
+        
+    with pytest.raises(Interrupted):
+        client.get_all_products(progress_callback=interrupt, checkpoint=checkpoint)
+    assert list(checkpoint.pages) == [1]
+    
+    # A product created before the fetch resumes lists first by date; by id it goes last
+    with catalog.lock:
+        new_id = max(catalog.products) + 1000
+        catalog.products[new_id] = dict(next(iter(catalog.products.values())), id=new_id, sku="NEW-1",
+                                        date_created="2099-01-01T00:00:00")
+        
+    ids = [product['id'] for product in client.get_all_products(checkpoint=checkpoint)]
+    assert len(ids) == len(set(ids))
+    assert set(ids) == set(catalog.products)
+
+
+def test_merged_pages_are_deduplicated_by_id():
+    items = [{'id': 1, 'v': 'old'}, {'id': 2}, {'id': 1, 'v': 'new'}]
+    assert WooCommerceClient._unique_by_id(items) == [{'id': 1, 'v': 'new'}, {'id': 2}]